@@ -12,6 +12,8 @@ import sys
 import os
 from firebase_admin import firestore
 
+from latest_pointer import LATEST_ANIMAL_FORTUNE, set_latest
+
 # animal_fortuneモジュールをインポート
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'animal_fortune'))
 from animal_fortune import animal_fortune, calculate_animal_number, load_calendar_data, load_animal_data
@@ -77,10 +79,12 @@ class AnimalFortuneService:
             "created_at": firestore.SERVER_TIMESTAMP
         }
 
-        # Firestoreに保存 (animal-fortunes コレクション)
+        # Firestoreに保存 (animal-fortunes コレクション + users/{user_id}/latest/animal-fortune を1回のバッチで書き込む)
         try:
-            doc_ref = self.db.collection('animal-fortunes').document(fortune_id)
-            doc_ref.set(fortune_data)
+            batch = self.db.batch()
+            batch.set(self.db.collection('animal-fortunes').document(fortune_id), fortune_data)
+            set_latest(batch, self.db, user_id, LATEST_ANIMAL_FORTUNE, fortune_data)
+            batch.commit()
             print(f"[AnimalFortune] Saved fortune {fortune_id} for user {user_id}: {animal_info['character']}")
         except Exception as e:
             print(f"[AnimalFortune] Error saving fortune: {e}")
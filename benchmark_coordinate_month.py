@@ -0,0 +1,168 @@
+"""
+Coordinate Month Query Benchmark (Firestore Emulator)
+
+/api/coordinate/list の月表示について、旧実装（ユーザーの全ドキュメントを取得して Python で絞り込み）と
+AsyncFirebaseRepository.get_coordinates_by_month（date の範囲クエリ + フィールド射影）を比較します。
+ユーザーごとに 1k / 10k 件のコーディネート（items を埋め込んだ実データ相当のサイズ）を投入し、
+読み取りドキュメント数（= 課金対象の読み取り数）、転送量の概算、レイテンシを出力します。
+
+Firestore Emulator が必要です（本番のデータには接続しません）:
+    firebase emulators:start --only firestore --project demo-irodori
+    FIRESTORE_EMULATOR_HOST=localhost:8080 python benchmark_coordinate_month.py
+
+    # 件数・繰り返し回数を指定
+    FIRESTORE_EMULATOR_HOST=localhost:8080 python benchmark_coordinate_month.py --docs 1000 --docs 10000 --iterations 20
+"""
+
+import argparse
+import asyncio
+import os
+import sys
+import time
+import uuid
+from datetime import date, timedelta
+from typing import Callable, Dict, List
+
+from google.cloud import firestore
+
+from firebase_async_repository import AsyncFirebaseRepository
+from firebase_service import FirebaseService
+
+PROJECT_ID = "demo-irodori"
+
+
+def make_coordinate(user_id: str, day: date) -> Dict:
+    """save_coordinate と同じ形のドキュメント"""
+    coordinate_id = str(uuid.uuid4())
+    return {
+        'id': coordinate_id,
+        'user_id': user_id,
+        'date': day.strftime('%Y/%m/%d'),
+        'coordinate_image_path': f"https://storage.googleapis.com/{PROJECT_ID}/coordinates/{coordinate_id}.jpg",
+        'ai_catchphrase': "都会の風を纏う旅人",
+        'ai_review_comment': "**シルエット** ゆったりとしたトップスに細身のボトムスを合わせ、メリハリのある印象です。" * 3,
+        'tags': ["カジュアル", "都会の風を纏う旅人", "モノトーン", "リラックス", "デート", "白 Tシャツ", "黒 スキニーパンツ"],
+        'items': [
+            {'id': str(uuid.uuid4()), 'item_type': item_type, 'category': "Tシャツ", 'color': "白",
+             'description': "白 Tシャツ", 'item_image_path': f"https://storage.googleapis.com/{PROJECT_ID}/items/{uuid.uuid4()}.jpg"}
+            for item_type in ("トップス", "ボトムス", "シューズ")
+        ],
+        'item_types': ["トップス", "ボトムス", "シューズ"],
+        'created_at': firestore.SERVER_TIMESTAMP,
+        'updated_at': firestore.SERVER_TIMESTAMP
+    }
+
+
+def seed_user(db: firestore.Client, user_id: str, count: int) -> date:
+    """1日1件、今日から過去 count 日分を投入し、最新日を返す"""
+    today = date.today()
+    batch = db.batch()
+    for i in range(count):
+        data = make_coordinate(user_id, today - timedelta(days=i))
+        batch.set(db.collection('fashion-review').document(data['id']), data)
+        if (i + 1) % 500 == 0:
+            batch.commit()
+            batch = db.batch()
+    batch.commit()
+    return today
+
+
+def legacy_month(db: firestore.Client, user_id: str, year: int, month: int) -> List[Dict]:
+    """旧実装: ユーザーの全ドキュメントを取得して接頭辞で絞り込む"""
+    target_prefix = f"{year:04d}/{month:02d}/"
+    coordinates = []
+    for doc in db.collection('fashion-review').where('user_id', '==', user_id).stream():
+        data = doc.to_dict()
+        if data.get('date', '').startswith(target_prefix):
+            coordinates.append(data)
+    return coordinates
+
+
+def count_reads(db: firestore.Client, run: Callable[[], List[Dict]]) -> Dict:
+    """読み取りドキュメント数と転送量（to_dict の文字数）を計測"""
+    reads = 0
+    payload = 0
+    original_stream = firestore.Query.stream
+    original_async_get = firestore.AsyncQuery.get
+
+    def count(doc):
+        nonlocal reads, payload
+        reads += 1
+        payload += len(repr(doc.to_dict()))
+
+    def counting_stream(query, *args, **kwargs):
+        for doc in original_stream(query, *args, **kwargs):
+            count(doc)
+            yield doc
+
+    async def counting_async_get(query, *args, **kwargs):
+        docs = await original_async_get(query, *args, **kwargs)
+        for doc in docs:
+            count(doc)
+        return docs
+
+    firestore.Query.stream = counting_stream
+    firestore.AsyncQuery.get = counting_async_get
+    try:
+        result = run()
+    finally:
+        firestore.Query.stream = original_stream
+        firestore.AsyncQuery.get = original_async_get
+    return {"reads": max(reads, 1), "payload_kb": payload / 1024, "results": len(result)}
+
+
+def measure(run: Callable[[], List[Dict]], iterations: int) -> Dict:
+    latencies = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        run()
+        latencies.append(time.perf_counter() - start)
+    latencies.sort()
+    return {
+        "p50_ms": latencies[len(latencies) // 2] * 1000,
+        "p95_ms": latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))] * 1000
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the coordinate month query on the Firestore emulator")
+    parser.add_argument("--docs", type=int, action="append", help="Coordinates per user (repeatable, default: 1000, 10000)")
+    parser.add_argument("--iterations", type=int, default=10)
+    args = parser.parse_args()
+
+    if not os.getenv("FIRESTORE_EMULATOR_HOST"):
+        print("FIRESTORE_EMULATOR_HOST is not set. Start the Firestore emulator first (see module docstring).")
+        sys.exit(1)
+
+    db = firestore.Client(project=PROJECT_ID)
+    # FirebaseService の初期化（認証情報・Storage）を行わず、エミュレータのクライアントを使う
+    FirebaseService._initialized = True
+    FirebaseService._db = db
+    repository = AsyncFirebaseRepository(firebase_service=FirebaseService())
+    repository._db = firestore.AsyncClient(project=PROJECT_ID)
+    # AsyncClient はイベントループに紐づくため、同じループで繰り返し実行する
+    loop = asyncio.new_event_loop()
+
+    for count in args.docs or [1000, 10000]:
+        user_id = f"bench-{count}-{uuid.uuid4().hex[:8]}"
+        print(f"Seeding {count} coordinates for {user_id} ...")
+        latest = seed_user(db, user_id, count)
+        year, month = latest.year, latest.month
+
+        variants = {
+            "legacy scan": lambda: legacy_month(db, user_id, year, month),
+            "range+select": lambda: loop.run_until_complete(repository.get_coordinates_by_month(user_id, year, month)),
+        }
+        print(f"--- {count} docs, month {year}/{month:02d} " + "-" * 40)
+        for name, run in variants.items():
+            reads = count_reads(db, run)
+            timing = measure(run, args.iterations)
+            print(f"{name:<13} reads {reads['reads']:6d}  payload {reads['payload_kb']:8.1f}KB  "
+                  f"results {reads['results']:3d}  p50 {timing['p50_ms']:8.1f}ms  p95 {timing['p95_ms']:8.1f}ms")
+
+    loop.run_until_complete(repository.close())
+    loop.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,117 @@
+"""
+Fashion Review Mode Benchmark
+
+/api/fashion_review の Gemini 呼び出し方式を、擬似バックエンド（FakeGeminiClient）で比較します。
+    parallel: レビュー・タグ・アイテム抽出の3並列（画像を3回送信）
+    combined: 1回の呼び出しでまとめて生成（画像は1回）
+
+各方式について、処理全体のレイテンシ（p50 / p99）、入力・出力トークン数、概算コスト、
+画像の送信量を出力します。擬似バックエンドのレイテンシは「分布からのサンプル + 出力トークン数 × 生成時間」です。
+
+本番環境での比較は GEMINI_REVIEW_MODE=ab（GEMINI_REVIEW_COMBINED_RATIO で振り分け）で行い、
+/health/llm-metrics の operations（fashion_review の parallel / combined）と calls のトークン数を確認してください。
+
+使用方法:
+    python benchmark_fashion_review_modes.py
+    python benchmark_fashion_review_modes.py --requests 500 --concurrency 20 --latency lognormal:800:0.6 --error-rate 0.02
+"""
+
+import argparse
+import asyncio
+import os
+import time
+from typing import Dict, List
+
+# 同じ画像を繰り返し送るため、画像解析キャッシュは無効にする
+os.environ['GEMINI_IMAGE_CACHE_ENABLED'] = '0'
+
+from benchmark_image_pipeline import make_phone_photo  # noqa: E402
+from gemini_fake_backend import FakeGeminiClient, FakeGeminiEngine  # noqa: E402
+from gemini_service import GeminiService  # noqa: E402
+from llm_metrics import get_llm_metrics  # noqa: E402
+
+MODE_METHODS = {
+    "parallel": ("generate_review_parallel", "generate_tags_parallel", "extract_items_parallel"),
+    "combined": ("generate_fashion_review_combined",),
+}
+
+
+def percentile(values: List[float], q: float) -> float:
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * q))]
+
+
+async def run_mode(service: GeminiService, image, mode: str, requests: int, concurrency: int) -> List[float]:
+    """1つの方式で requests 件を concurrency 並列で実行し、各リクエストの秒数を返す"""
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies = []
+
+    async def one():
+        async with semaphore:
+            start = time.perf_counter()
+            await service.generate_fashion_review_async(image, mode=mode)
+            latencies.append(time.perf_counter() - start)
+
+    await asyncio.gather(*(one() for _ in range(requests)))
+    return latencies
+
+
+def token_usage(mode: str) -> Dict[str, float]:
+    """LLMMetrics から方式ごとの入力・出力トークンの合計を集計"""
+    prompt_tokens = output_tokens = calls = 0
+    for call in get_llm_metrics().summary()["calls"]:
+        if call["method"] not in MODE_METHODS[mode]:
+            continue
+        ok = call["outcomes"].get("ok", 0)
+        calls += call["calls"]
+        prompt_tokens += (call["tokens"]["prompt_avg"] or 0) * ok
+        output_tokens += (call["tokens"]["output_avg"] or 0) * ok
+    return {"calls": calls, "prompt_tokens": prompt_tokens, "output_tokens": output_tokens}
+
+
+async def main_async(args):
+    engine = FakeGeminiEngine(
+        latency=args.latency,
+        error_rate=args.error_rate,
+        ms_per_output_token=args.ms_per_token,
+        seed=args.seed
+    )
+    service = GeminiService(client=FakeGeminiClient(engine))
+    if args.image:
+        with open(args.image, "rb") as f:
+            image_data = f.read()
+    else:
+        image_data = make_phone_photo()
+    image = service.prepare_image(image_data, GeminiService.FASHION_REVIEW_IMAGE_SCALE)
+
+    print(f"Requests: {args.requests}, concurrency: {args.concurrency}, latency: {args.latency}, "
+          f"{args.ms_per_token}ms/output token, error rate: {args.error_rate}")
+    print(f"Image payload: {len(image.gemini_bytes) / 1024:.1f}KB {image.gemini_size}")
+    print("-" * 100)
+
+    for mode in MODE_METHODS:
+        latencies = await run_mode(service, image, mode, args.requests, args.concurrency)
+        usage = token_usage(mode)
+        cost = (usage["prompt_tokens"] * args.input_price + usage["output_tokens"] * args.output_price) / 1_000_000
+        upload_mb = usage["calls"] * len(image.gemini_bytes) / 1024 / 1024
+        print(f"{mode:<9} p50 {percentile(latencies, 0.5) * 1000:7.1f}ms  p99 {percentile(latencies, 0.99) * 1000:7.1f}ms  "
+              f"calls {usage['calls']:5d}  tokens in/out {usage['prompt_tokens'] / args.requests:6.0f}/{usage['output_tokens'] / args.requests:5.0f} per review  "
+              f"cost ${cost / args.requests * 1000:.4f}/1k reviews  upload {upload_mb:.1f}MB")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare parallel vs combined fashion review on the fake Gemini backend")
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=10)
+    parser.add_argument("--latency", default="lognormal:600:0.5", help="GEMINI_FAKE_LATENCY format")
+    parser.add_argument("--ms-per-token", type=float, default=3.0, help="Generation time per output token (ms)")
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--image", help="JPEG to send (default: synthetic 12MP photo)")
+    parser.add_argument("--input-price", type=float, default=0.10, help="USD per 1M input tokens")
+    parser.add_argument("--output-price", type=float, default=0.40, help="USD per 1M output tokens")
+    asyncio.run(main_async(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,131 @@
+"""
+Image Preprocessing Benchmark
+
+12MP のスマートフォン写真を想定し、/api/fashion_review の画像前処理について
+旧実装（base64 → フルデコード → LANCZOS → 再エンコード → base64）と ImagePipeline を比較します。
+各方式は別プロセスで実行し、1リクエストあたりの CPU 時間とピークメモリ（ru_maxrss の増分）を計測します。
+
+使用方法:
+    # 合成した 12MP (4032x3024) JPEG で計測
+    python benchmark_image_pipeline.py
+
+    # 実際の写真で計測
+    python benchmark_image_pipeline.py --image photo1.jpg --image photo2.jpg --iterations 10
+"""
+
+import argparse
+import base64
+import multiprocessing
+import os
+import resource
+import tempfile
+import time
+from io import BytesIO
+from typing import Dict, List
+
+from PIL import Image
+
+from image_pipeline import ImagePipeline
+
+
+def make_phone_photo(width: int = 4032, height: int = 3024) -> bytes:
+    """12MP のテスト用 JPEG を生成（EXIF Orientation=6: 縦持ち撮影）"""
+    gradient = Image.linear_gradient("L").resize((width, height))
+    noise = Image.effect_noise((width, height), 64)
+    image = Image.merge("RGB", (gradient, noise, gradient.transpose(Image.Transpose.FLIP_LEFT_RIGHT)))
+    exif = Image.Exif()
+    exif[0x0112] = 6
+    buffer = BytesIO()
+    image.save(buffer, format="JPEG", quality=92, exif=exif)
+    return buffer.getvalue()
+
+
+def legacy_preprocess(image_data: bytes, scale: float) -> int:
+    """旧実装: main.py で base64 化 → GeminiService.resize_image_base64"""
+    image_base64 = base64.b64encode(image_data).decode('utf-8')
+    image = Image.open(BytesIO(base64.b64decode(image_base64)))
+    resized = image.resize((int(image.width * scale), int(image.height * scale)), Image.Resampling.LANCZOS)
+    buffer = BytesIO()
+    resized.save(buffer, format=image.format or 'JPEG', quality=85)
+    resized_base64 = base64.b64encode(buffer.getvalue()).decode('utf-8')
+    return len(resized_base64)
+
+
+def pipeline_preprocess(image_data: bytes, scale: float) -> int:
+    """ImagePipeline: 生のバイト列から一度だけデコード"""
+    prepared = ImagePipeline().prepare(image_data, scale)
+    return len(prepared.gemini_bytes)
+
+
+VARIANTS = {
+    "legacy": legacy_preprocess,
+    "pipeline": pipeline_preprocess,
+}
+
+
+def _run_variant(name: str, image_paths: List[str], scale: float, iterations: int, queue):
+    func = VARIANTS[name]
+    images = []
+    for path in image_paths:
+        with open(path, "rb") as f:
+            images.append(f.read())
+    baseline_kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+    cpu_times = []
+    for _ in range(iterations):
+        for image_data in images:
+            start = time.process_time()
+            func(image_data, scale)
+            cpu_times.append(time.process_time() - start)
+
+    peak_kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    queue.put({"cpu_times": cpu_times, "peak_mb": peak_kb / 1024, "peak_delta_mb": (peak_kb - baseline_kb) / 1024})
+
+
+def run_variant(name: str, image_paths: List[str], scale: float, iterations: int) -> Dict:
+    """別プロセスで計測（ピークメモリを方式ごとに分離するため）"""
+    ctx = multiprocessing.get_context("spawn")
+    queue = ctx.Queue()
+    process = ctx.Process(target=_run_variant, args=(name, image_paths, scale, iterations, queue))
+    process.start()
+    result = queue.get()
+    process.join()
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark image preprocessing for Gemini requests")
+    parser.add_argument("--image", action="append", help="JPEG to benchmark (repeatable, default: synthetic 12MP photo)")
+    parser.add_argument("--scale", type=float, default=0.3, help="Scale factor (0.3 = fashion review, 0.5 = chat)")
+    parser.add_argument("--iterations", type=int, default=5)
+    args = parser.parse_args()
+
+    image_paths = args.image
+    if not image_paths:
+        photo_path = os.path.join(tempfile.mkdtemp(), "phone_12mp.jpg")
+        with open(photo_path, "wb") as f:
+            f.write(make_phone_photo())
+        image_paths = [photo_path]
+
+    sizes = ", ".join(f"{os.path.getsize(path) / 1024 / 1024:.1f}MB" for path in image_paths)
+    print(f"Images: {len(image_paths)} ({sizes}), "
+          f"scale: {args.scale}, iterations: {args.iterations}")
+    print("-" * 60)
+
+    results = {}
+    for name in VARIANTS:
+        result = run_variant(name, image_paths, args.scale, args.iterations)
+        cpu_times = sorted(result["cpu_times"])
+        results[name] = result
+        print(f"{name:<10} CPU/request: avg {sum(cpu_times) / len(cpu_times) * 1000:7.1f}ms  "
+              f"p95 {cpu_times[min(len(cpu_times) - 1, int(len(cpu_times) * 0.95))] * 1000:7.1f}ms  "
+              f"peak RSS: {result['peak_mb']:.1f}MB (+{result['peak_delta_mb']:.1f}MB)")
+
+    legacy_avg = sum(results["legacy"]["cpu_times"]) / len(results["legacy"]["cpu_times"])
+    pipeline_avg = sum(results["pipeline"]["cpu_times"]) / len(results["pipeline"]["cpu_times"])
+    print("-" * 60)
+    print(f"CPU time: {legacy_avg / pipeline_avg:.1f}x faster")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,14 +1,31 @@
 import csv
+import os
 import random
 import asyncio
-from typing import List, Dict
+from typing import List, Dict, Tuple
 from collections import defaultdict
 from models import CoordinateItem, Gender, AffiliateProduct
 from yahoo_shopping import YahooShoppingClient
-from gemini_service import GeminiService
+from gemini_service import get_gemini_service
+from recommend_reasons_cache import get_recommend_reasons_cache
+from gemini_bulkhead import PRIORITY_BATCH
 
 
 class CoordinateService:
+    # 事前に選んだコーディネートの組み合わせ（gender -> [(coordinates 内の位置, ジャンル別件数)]）
+    # RECOMMEND_TRIPLE_POOL_SIZE > 0 の場合のみ使用。組み合わせが限られるため recommend_reasons のキャッシュが効く
+    _triple_pools: Dict[Gender, List[Tuple[Tuple[int, ...], Dict[str, int]]]] = {}
+
+    @staticmethod
+    def triple_pool_size() -> int:
+        return int(os.getenv('RECOMMEND_TRIPLE_POOL_SIZE', '0') or 0)
+
+    @staticmethod
+    def get_file_paths(gender: Gender) -> List[str]:
+        if gender == Gender.other:
+            return ["data/analysis-coordinate/men/coordinates.csv", "data/analysis-coordinate/women/coordinates.csv"]
+        return [f"data/analysis-coordinate/{gender.value}/coordinates.csv"]
+
     @staticmethod
     def get_coordinates_by_gender(gender: Gender) -> List[CoordinateItem]:
         coordinates = []
@@ -93,22 +110,93 @@ class CoordinateService:
             'genres': genre_counts
         }
     
+    @classmethod
+    def _get_triple_pool(cls, gender: Gender, coordinates: List[CoordinateItem]) -> List[Tuple[Tuple[int, ...], Dict[str, int]]]:
+        """
+        コーディネートの組み合わせプールを取得（初回のみ生成）
+
+        group_by_genre_and_select_random と同じく全コーディネートから一様に3件を選ぶため、
+        ジャンルの組み合わせは出現頻度の高いものほど多く含まれます。
+        """
+        pool = cls._triple_pools.get(gender)
+        if pool is not None:
+            return pool
+
+        # coordinates は CSV の行順で読み込まれているため、行の位置でジャンルを対応付ける
+        genres = []
+        for file_path in cls.get_file_paths(gender):
+            try:
+                with open(file_path, 'r', encoding='utf-8') as file:
+                    genres.extend(row['genre'] for row in csv.DictReader(file))
+            except Exception as e:
+                print(f"Error reading CSV file {file_path} for triple pool: {e}")
+                return []
+        if len(genres) != len(coordinates) or len(coordinates) < 3:
+            return []
+
+        pool = []
+        for _ in range(cls.triple_pool_size()):
+            positions = tuple(random.sample(range(len(coordinates)), 3))
+            genre_counts = {}
+            for position in positions:
+                genre_counts[genres[position]] = genre_counts.get(genres[position], 0) + 1
+            pool.append((positions, genre_counts))
+
+        cls._triple_pools[gender] = pool
+        print(f"[CoordinateService] Built recommend triple pool for {gender.value}: {len(pool)} combinations")
+        return pool
+
+    @classmethod
+    def select_coordinates(cls, gender: Gender, coordinates: List[CoordinateItem]) -> Dict:
+        """
+        レコメンドするコーディネート3件を選択
+
+        RECOMMEND_TRIPLE_POOL_SIZE が設定されていればプールから、そうでなければ全件からランダムに選ぶ。
+        """
+        if cls.triple_pool_size() > 0:
+            pool = cls._get_triple_pool(gender, coordinates)
+            if pool:
+                positions, genre_counts = random.choice(pool)
+                return {
+                    'coordinates': [coordinates[position] for position in positions],
+                    'genres': dict(genre_counts)
+                }
+
+        return cls.group_by_genre_and_select_random(coordinates, cls.get_file_paths(gender))
+
+    @classmethod
+    async def warm_recommend_reasons(cls, concurrency: int = 4):
+        """
+        プール内の全組み合わせについて recommend_reasons を事前生成（起動時にバックグラウンドで実行）
+        """
+        if cls.triple_pool_size() <= 0:
+            return
+
+        gemini_service = get_gemini_service()
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def generate(triple: List[CoordinateItem]):
+            async with semaphore:
+                await gemini_service.generate_recommend_reasons_async(triple, PRIORITY_BATCH)
+
+        for gender in Gender:
+            coordinates = await asyncio.to_thread(cls.get_coordinates_by_gender, gender)
+            pool = await asyncio.to_thread(cls._get_triple_pool, gender, coordinates)
+            cache = get_recommend_reasons_cache()
+            triples = [[coordinates[position] for position in positions] for positions, _ in pool]
+            pending = [triple for triple in triples if not cache.contains(triple)]
+            await asyncio.gather(*(generate(triple) for triple in pending))
+            print(f"[CoordinateService] Warmed recommend reasons for {gender.value}: {len(pending)} generated, {len(triples) - len(pending)} cached")
+
     @staticmethod
     def recommend_coordinates(gender: Gender) -> Dict:
         # 1. genderに基づいてCSVファイルを読み込み
         coordinates = CoordinateService.get_coordinates_by_gender(gender)
         
-        # 2. ファイルパスを決定
-        file_paths = []
-        if gender == Gender.other:
-            file_paths = ["data/analysis-coordinate/men/coordinates.csv", "data/analysis-coordinate/women/coordinates.csv"]
-        else:
-            file_paths = [f"data/analysis-coordinate/{gender.value}/coordinates.csv"]
-        
-        # 3. genreでグループ化してランダム選択
-        result = CoordinateService.group_by_genre_and_select_random(coordinates, file_paths)
+        # 2. genreでグループ化してランダム選択（プール有効時はプールから選択）
+        result = CoordinateService.select_coordinates(gender, coordinates)
         
-        # 4. Yahoo商品検索を追加
+        # 3. Yahoo商品検索を追加
         yahoo_client = YahooShoppingClient()
         gender_jp = "メンズ" if gender.value == "men" else "レディース" if gender.value == "women" else "メンズ"
         
@@ -126,7 +214,7 @@ class CoordinateService:
                 coord.affiliate_bottoms = [AffiliateProduct(**product) for product in bottoms_products]
 
         # Gemini APIを使ってrecommend_reasonsを生成
-        gemini_service = GeminiService()
+        gemini_service = get_gemini_service()
         recommend_reasons = gemini_service.generate_recommend_reasons(result['coordinates'])
         result['recommend_reasons'] = recommend_reasons
 
@@ -137,17 +225,10 @@ class CoordinateService:
         # 1. genderに基づいてCSVファイルを読み込み
         coordinates = CoordinateService.get_coordinates_by_gender(gender)
         
-        # 2. ファイルパスを決定
-        file_paths = []
-        if gender == Gender.other:
-            file_paths = ["data/analysis-coordinate/men/coordinates.csv", "data/analysis-coordinate/women/coordinates.csv"]
-        else:
-            file_paths = [f"data/analysis-coordinate/{gender.value}/coordinates.csv"]
-        
-        # 3. genreでグループ化してランダム選択
-        result = CoordinateService.group_by_genre_and_select_random(coordinates, file_paths)
+        # 2. genreでグループ化してランダム選択（プール有効時はプールから選択）
+        result = CoordinateService.select_coordinates(gender, coordinates)
         
-        # 4. Yahoo商品検索を並行処理で追加
+        # 3. Yahoo商品検索を並行処理で追加
         yahoo_client = YahooShoppingClient()
         gender_jp = "メンズ" if gender.value == "men" else "レディース" if gender.value == "women" else "メンズ"
         
@@ -183,7 +264,7 @@ class CoordinateService:
                         coord.affiliate_bottoms = [AffiliateProduct(**product) for product in results[i]]
 
         # Gemini APIを使ってrecommend_reasonsを生成
-        gemini_service = GeminiService()
+        gemini_service = get_gemini_service()
         recommend_reasons = await gemini_service.generate_recommend_reasons_async(result['coordinates'])
         result['recommend_reasons'] = recommend_reasons
 
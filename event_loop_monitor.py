@@ -0,0 +1,124 @@
+"""
+Event Loop Lag Monitor
+
+イベントループがブロックされた時間を計測し、閾値を超えた場合にログを出力します。
+
+環境変数:
+    EVENT_LOOP_LAG_THRESHOLD_MS: ログを出力する遅延の閾値（デフォルト: 100ms）
+    EVENT_LOOP_LAG_INTERVAL_MS: 計測間隔（デフォルト: 250ms）
+    EVENT_LOOP_MONITOR_ENABLED: "0" で無効化（デフォルト: 有効）
+"""
+
+import asyncio
+import os
+import time
+from collections import deque
+from typing import Dict, Optional
+
+
+class EventLoopMonitor:
+    """イベントループの遅延を監視するクラス"""
+
+    def __init__(self, threshold_ms: Optional[float] = None, interval_ms: Optional[float] = None):
+        """
+        Initialize Event Loop Monitor
+
+        Args:
+            threshold_ms: ログ出力する遅延の閾値（ミリ秒）
+            interval_ms: 計測間隔（ミリ秒）
+        """
+        self.threshold_ms = threshold_ms if threshold_ms is not None else float(os.getenv('EVENT_LOOP_LAG_THRESHOLD_MS', '100'))
+        self.interval_ms = interval_ms if interval_ms is not None else float(os.getenv('EVENT_LOOP_LAG_INTERVAL_MS', '250'))
+        self._task: Optional[asyncio.Task] = None
+        # 実行中のリクエスト（id -> (method path, 開始時刻)）
+        self._in_flight: Dict[int, tuple] = {}
+        # 直近に完了したリクエスト（label, 開始時刻, 終了時刻）
+        self._recently_finished = deque(maxlen=50)
+        self.max_lag_ms = 0.0
+        self.lag_events = 0
+
+    def start(self):
+        """監視タスクを開始（イベントループ上で呼び出すこと）"""
+        if self._task is None or self._task.done():
+            self._task = asyncio.get_running_loop().create_task(self._run())
+            print(f"[EventLoopMonitor] Started (threshold: {self.threshold_ms:.0f}ms, interval: {self.interval_ms:.0f}ms)")
+
+    async def stop(self):
+        """監視タスクを停止"""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def request_started(self, key: int, label: str):
+        """リクエスト開始を記録（ブロック元の特定用）"""
+        self._in_flight[key] = (label, time.perf_counter())
+
+    def request_finished(self, key: int):
+        """リクエスト終了を記録"""
+        entry = self._in_flight.pop(key, None)
+        if entry is not None:
+            label, started = entry
+            self._recently_finished.append((label, started, time.perf_counter()))
+
+    async def _run(self):
+        interval = self.interval_ms / 1000
+        while True:
+            expected = time.perf_counter() + interval
+            await asyncio.sleep(interval)
+            now = time.perf_counter()
+            lag_ms = (now - expected) * 1000
+
+            if lag_ms > self.max_lag_ms:
+                self.max_lag_ms = lag_ms
+
+            if lag_ms >= self.threshold_ms:
+                self.lag_events += 1
+                # ブロック中に実行されていたハンドラー（実行中 + 計測区間内に完了したもの）
+                window_start = expected - interval
+                suspects = [
+                    f"{label} ({(now - started) * 1000:.0f}ms, running)"
+                    for label, started in self._in_flight.values()
+                ]
+                suspects.extend(
+                    f"{label} ({(finished - started) * 1000:.0f}ms)"
+                    for label, started, finished in self._recently_finished
+                    if finished >= window_start
+                )
+                handlers = ", ".join(suspects) or "unknown"
+                print(f"[EventLoopMonitor] Event loop blocked for {lag_ms:.0f}ms (handlers: {handlers})")
+
+    def stats(self) -> Dict:
+        """監視統計を取得"""
+        return {
+            "threshold_ms": self.threshold_ms,
+            "interval_ms": self.interval_ms,
+            "max_lag_ms": round(self.max_lag_ms, 2),
+            "lag_events": self.lag_events,
+            "in_flight_requests": len(self._in_flight)
+        }
+
+
+# グローバルインスタンス（シングルトンパターン）
+_event_loop_monitor = None
+
+
+def get_event_loop_monitor() -> EventLoopMonitor:
+    """
+    EventLoopMonitorのグローバルインスタンスを取得
+
+    Returns:
+        EventLoopMonitor: 監視インスタンス
+    """
+    global _event_loop_monitor
+    if _event_loop_monitor is None:
+        _event_loop_monitor = EventLoopMonitor()
+    return _event_loop_monitor
+
+
+def is_event_loop_monitor_enabled() -> bool:
+    """監視が有効かどうか"""
+    return os.getenv('EVENT_LOOP_MONITOR_ENABLED', '1') != '0'
@@ -0,0 +1,210 @@
+"""
+Fake Yahoo Shopping itemSearch Server
+
+オフラインでの負荷試験・レイテンシ計測用に、Yahoo Shopping API (V3 itemSearch) の
+代わりとなるローカルサーバーです。クエリごとに決定的な `hits` を返します。
+
+使用方法:
+    # 擬似サーバーを起動
+    python fake_yahoo_server.py --port 8090 --latency lognormal:80:0.5 --error-rate 0.02
+
+    # APIサーバーを擬似サーバーに向けて起動
+    YAHOO_SHOPPING_BASE_URL=http://localhost:8090/ShoppingWebService/V3/itemSearch uvicorn main:app
+
+    # 計測
+    python test_performance.py --requests 50 --concurrency 10
+
+環境変数（CLI引数で上書き可能）:
+    FAKE_YAHOO_LATENCY: レイテンシ分布
+        "fixed:<ms>" / "uniform:<min_ms>:<max_ms>" / "lognormal:<median_ms>:<sigma>"（デフォルト: fixed:0）
+    FAKE_YAHOO_ERROR_RATE: 500エラーを返す割合（0.0-1.0）
+    FAKE_YAHOO_THROTTLE_RATE: 429を返す割合（0.0-1.0）
+    FAKE_YAHOO_TIMEOUT_RATE: 応答を FAKE_YAHOO_TIMEOUT_SECONDS 秒遅延させる割合（0.0-1.0）
+    FAKE_YAHOO_TIMEOUT_SECONDS: タイムアウト時の遅延秒数（デフォルト: 30）
+    FAKE_YAHOO_SEED: 乱数シード（レイテンシ・エラー注入の再現用）
+"""
+
+import argparse
+import asyncio
+import hashlib
+import math
+import os
+import random
+from typing import Dict, List
+
+from fastapi import FastAPI
+from fastapi.responses import JSONResponse
+
+
+class FakeYahooConfig:
+    """擬似サーバーの挙動設定"""
+
+    def __init__(self):
+        self.latency = os.getenv('FAKE_YAHOO_LATENCY', 'fixed:0')
+        self.error_rate = float(os.getenv('FAKE_YAHOO_ERROR_RATE', '0'))
+        self.throttle_rate = float(os.getenv('FAKE_YAHOO_THROTTLE_RATE', '0'))
+        self.timeout_rate = float(os.getenv('FAKE_YAHOO_TIMEOUT_RATE', '0'))
+        self.timeout_seconds = float(os.getenv('FAKE_YAHOO_TIMEOUT_SECONDS', '30'))
+        seed = os.getenv('FAKE_YAHOO_SEED')
+        self.random = random.Random(int(seed)) if seed else random.Random()
+
+    def sample_latency(self) -> float:
+        """
+        レイテンシ分布からサンプリング
+
+        Returns:
+            float: 遅延秒数
+        """
+        kind, *args = self.latency.split(':')
+        values = [float(v) for v in args]
+        if kind == 'fixed':
+            ms = values[0] if values else 0.0
+        elif kind == 'uniform':
+            ms = self.random.uniform(values[0], values[1])
+        elif kind == 'lognormal':
+            median_ms, sigma = values[0], values[1] if len(values) > 1 else 0.5
+            ms = self.random.lognormvariate(math.log(median_ms), sigma)
+        else:
+            raise ValueError(f"Unknown latency distribution: {self.latency}")
+        return max(0.0, ms) / 1000
+
+
+config = FakeYahooConfig()
+app = FastAPI()
+
+_COLORS = ["ブラック", "ホワイト", "ネイビー", "グレー", "ベージュ", "ブラウン", "カーキ", "ブルー"]
+_STORES = ["URBAN STYLE", "ファッション通販 COCO", "セレクトショップ MIX", "カジュアル館", "daily wear store"]
+
+
+def _build_hits(query: str, results: int) -> List[Dict]:
+    """クエリから決定的な商品リストを生成（同じクエリには同じ結果を返す）"""
+    seed = int(hashlib.md5(query.encode('utf-8')).hexdigest()[:8], 16)
+    rng = random.Random(seed)
+    keywords = query.split()
+    base_name = " ".join(keywords[:3]) if keywords else "アイテム"
+
+    hits = []
+    for i in range(results):
+        code = f"store{rng.randint(1, 50):02d}_{seed % 100000:05d}{i:03d}"
+        seller_id = f"fakestore{rng.randint(1, 50):02d}"
+        price = rng.randrange(1980, 19800, 100)
+        color = rng.choice(_COLORS)
+        hits.append({
+            "index": i + 1,
+            "name": f"{base_name} {color} 春夏 新作 {i + 1}",
+            "description": f"{base_name}の{color}カラー。シンプルで合わせやすいデザインです。",
+            "headLine": "送料無料 当日発送",
+            "inStock": True,
+            "url": f"https://store.shopping.yahoo.co.jp/{seller_id}/{code}.html",
+            "code": f"{seller_id}_{code}",
+            "condition": "new",
+            "imageId": f"{seller_id}_{code}",
+            "image": {
+                "small": f"https://item-shopping.c.yimg.jp/i/c/{seller_id}_{code}",
+                "medium": f"https://item-shopping.c.yimg.jp/i/g/{seller_id}_{code}"
+            },
+            "review": {
+                "rate": round(rng.uniform(3.0, 5.0), 2),
+                "count": rng.randint(0, 500),
+                "url": f"https://shopping.yahoo.co.jp/review/item/list?store_id={seller_id}&page_key={code}"
+            },
+            "price": price,
+            "premiumPrice": price,
+            "premiumPriceStatus": False,
+            "premiumDiscountRate": None,
+            "premiumDiscountType": None,
+            "priceLabel": {
+                "taxable": True,
+                "defaultPrice": price,
+                "discountedPrice": None,
+                "fixedPrice": None,
+                "premiumPrice": None,
+                "periodStart": None,
+                "periodEnd": None
+            },
+            "point": {"amount": price // 100, "times": 1, "bonusAmount": 0, "bonusTimes": 0},
+            "shipping": {"code": 2, "name": "送料無料"},
+            "genreCategory": {"id": 2494, "name": "ファッション", "depth": 1},
+            "parentGenreCategories": [{"depth": 1, "id": 2494, "name": "ファッション"}],
+            "brand": {"id": rng.randint(1000, 9999), "name": "", "parentBrands": []},
+            "parentBrands": [],
+            "janCode": "",
+            "payment": "1 2 4 8 16",
+            "releaseDate": None,
+            "seller": {
+                "sellerId": seller_id,
+                "name": rng.choice(_STORES),
+                "url": f"https://store.shopping.yahoo.co.jp/{seller_id}/",
+                "isBestSeller": rng.random() < 0.2,
+                "review": {"rate": round(rng.uniform(4.0, 5.0), 2), "count": rng.randint(10, 5000)},
+                "imageId": seller_id
+            },
+            "delivery": {"area": "13", "deadLine": 14, "day": 1}
+        })
+    return hits
+
+
+@app.get("/ShoppingWebService/V3/itemSearch")
+async def item_search(query: str = "", results: int = 20, start: int = 1):
+    """Yahoo Shopping V3 itemSearch 互換エンドポイント"""
+    await asyncio.sleep(config.sample_latency())
+
+    roll = config.random.random()
+    if roll < config.timeout_rate:
+        await asyncio.sleep(config.timeout_seconds)
+    elif roll < config.timeout_rate + config.error_rate:
+        return JSONResponse(status_code=500, content={"Error": {"Message": "Internal Server Error"}})
+    elif roll < config.timeout_rate + config.error_rate + config.throttle_rate:
+        return JSONResponse(status_code=429, content={"Error": {"Message": "Too Many Requests"}})
+
+    results = max(1, min(results, 100))
+    hits = _build_hits(query, results)
+    return {
+        "totalResultsAvailable": 1000,
+        "totalResultsReturned": len(hits),
+        "firstResultsPosition": start,
+        "request": {"query": query},
+        "hits": hits
+    }
+
+
+@app.get("/health")
+async def health():
+    return {
+        "status": "ok",
+        "latency": config.latency,
+        "error_rate": config.error_rate,
+        "throttle_rate": config.throttle_rate,
+        "timeout_rate": config.timeout_rate
+    }
+
+
+if __name__ == "__main__":
+    import uvicorn
+
+    parser = argparse.ArgumentParser(description="Fake Yahoo Shopping itemSearch server")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8090)
+    parser.add_argument("--latency", help="fixed:<ms> / uniform:<min>:<max> / lognormal:<median>:<sigma>")
+    parser.add_argument("--error-rate", type=float)
+    parser.add_argument("--throttle-rate", type=float)
+    parser.add_argument("--timeout-rate", type=float)
+    parser.add_argument("--timeout-seconds", type=float)
+    parser.add_argument("--seed", type=int)
+    args = parser.parse_args()
+
+    if args.latency:
+        config.latency = args.latency
+    if args.error_rate is not None:
+        config.error_rate = args.error_rate
+    if args.throttle_rate is not None:
+        config.throttle_rate = args.throttle_rate
+    if args.timeout_rate is not None:
+        config.timeout_rate = args.timeout_rate
+    if args.timeout_seconds is not None:
+        config.timeout_seconds = args.timeout_seconds
+    if args.seed is not None:
+        config.random = random.Random(args.seed)
+
+    config.sample_latency()  # 設定値の検証
+    uvicorn.run(app, host=args.host, port=args.port)
@@ -2,6 +2,7 @@
 Fashion Type Diagnosis Service
 
 16タイプ診断ロジックとFirestore連携を提供します。
+マスターデータ（タイプ・グループ・質問・軸）は MasterDataStore のスナップショット（master_data.py）から参照します。
 """
 
 from datetime import datetime
@@ -9,6 +10,9 @@ from typing import Dict
 import uuid
 from firebase_admin import firestore
 
+from latest_pointer import LATEST_FASHION_TYPE, set_latest
+from master_data import get_master_data_store
+
 
 class FashionTypeService:
     """ファッションタイプ診断サービス"""
@@ -21,7 +25,11 @@ class FashionTypeService:
             db: Firestore client instance
         """
         self.db = db
-        self._master_cache = {}  # マスターデータのキャッシュ
+
+    @property
+    def master(self):
+        """マスターデータのスナップショット（プロセス全体で共有）"""
+        return get_master_data_store().get(self.db)
 
     def calculate_scores(self, answers: Dict[str, int]) -> Dict[str, float]:
         """
@@ -102,15 +110,8 @@ class FashionTypeService:
             str: タイプ名
         """
         try:
-            # キャッシュをチェック
-            if type_code in self._master_cache:
-                return self._master_cache[type_code].get('type_name', '未定義タイプ')
-
-            # Firestoreから取得
-            doc = self.db.collection('fashion-type-master').document(type_code).get()
-            if doc.exists:
-                data = doc.to_dict()
-                self._master_cache[type_code] = data
+            data = self.master.fashion_types.get(type_code)
+            if data is not None:
                 return data.get('type_name', '未定義タイプ')
             else:
                 print(f"[Warning] Type code {type_code} not found in fashion-type-master")
@@ -130,15 +131,8 @@ class FashionTypeService:
             dict: マスターデータ（type_name, description, core_stance, group等）
         """
         try:
-            # キャッシュをチェック
-            if type_code in self._master_cache:
-                return self._master_cache[type_code]
-
-            # Firestoreから取得
-            doc = self.db.collection('fashion-type-master').document(type_code).get()
-            if doc.exists:
-                data = doc.to_dict()
-                self._master_cache[type_code] = data
+            data = self.master.fashion_types.get(type_code)
+            if data is not None:
                 return data
             else:
                 print(f"[Warning] Type code {type_code} not found in fashion-type-master")
@@ -158,9 +152,9 @@ class FashionTypeService:
             dict: グループ情報（group_name, color, color_nuance, types等）
         """
         try:
-            doc = self.db.collection('fashion-type-groups').document(group_code).get()
-            if doc.exists:
-                return doc.to_dict()
+            data = self.master.groups.get(group_code)
+            if data is not None:
+                return data
             else:
                 print(f"[Warning] Group code {group_code} not found in fashion-type-groups")
                 return {}
@@ -176,15 +170,8 @@ class FashionTypeService:
             list: 質問データのリスト（order順にソート済み）
         """
         try:
-            docs = self.db.collection('fashion-type-questions').stream()
-            questions = []
-            for doc in docs:
-                data = doc.to_dict()
-                questions.append(data)
-
-            # order フィールドでソート
-            questions.sort(key=lambda x: x.get('order', 0))
-            return questions
+            # order 順にソート済み
+            return self.master.questions
         except Exception as e:
             print(f"[Error] Failed to get questions: {e}")
             return []
@@ -197,12 +184,7 @@ class FashionTypeService:
             list: 軸データのリスト
         """
         try:
-            docs = self.db.collection('fashion-type-axes').stream()
-            axes = []
-            for doc in docs:
-                data = doc.to_dict()
-                axes.append(data)
-            return axes
+            return self.master.axes
         except Exception as e:
             print(f"[Error] Failed to get axes info: {e}")
             return []
@@ -243,10 +225,12 @@ class FashionTypeService:
             "created_at": firestore.SERVER_TIMESTAMP
         }
 
-        # Firestoreに保存 (fashion-types コレクション)
+        # Firestoreに保存 (fashion-types コレクション + users/{user_id}/latest/fashion-type を1回のバッチで書き込む)
         try:
-            doc_ref = self.db.collection('fashion-types').document(diagnosis_id)
-            doc_ref.set(diagnosis_data)
+            batch = self.db.batch()
+            batch.set(self.db.collection('fashion-types').document(diagnosis_id), diagnosis_data)
+            set_latest(batch, self.db, user_id, LATEST_FASHION_TYPE, diagnosis_data)
+            batch.commit()
             print(f"[FashionType] Saved diagnosis {diagnosis_id} for user {user_id}: {type_code} - {type_name}")
         except Exception as e:
             print(f"[FashionType] Error saving diagnosis: {e}")
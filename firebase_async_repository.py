@@ -0,0 +1,466 @@
+"""
+Async Firebase Repository
+
+FastAPI のハンドラーから await するための Firestore / Storage のデータアクセス層です。
+FirebaseService のメソッドはブロッキングの gRPC / HTTP 呼び出しのため、async def のルートから直接呼び出すと
+その往復の間イベントループ全体が止まります（1件の遅いクエリが他のリクエストをすべて待たせる）。
+
+- 読み取り（ホーム・クローゼット・カレンダー・日付指定など）: google.cloud.firestore.AsyncClient
+  （firebase_admin.firestore_async）で実行する（FirebaseService には読み取りのメソッドを置かない）
+- Storage と書き込み: FirebaseService のメソッドを上限付きのスレッドプールで実行する
+  （ホームキャッシュの無効化やバッチ書き込みの処理を共有するため）
+
+AsyncClient の gRPC チャネルはイベントループに紐づくため、ループ上で最初に使われた時点で作成します。
+
+環境変数:
+    FIREBASE_BLOCKING_WORKERS: Storage / 書き込み用スレッドプールのスレッド数（デフォルト: 16）
+"""
+
+import asyncio
+import functools
+import os
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from typing import Any, Callable, Dict, List, Optional
+
+from firebase_admin import firestore_async
+from google.api_core.exceptions import FailedPrecondition
+from google.cloud.firestore import AsyncClient, AsyncQuery
+
+from firebase_service import FirebaseService
+from home_cache import get_home_cache
+
+
+class AsyncFirebaseRepository:
+    """Firestore（AsyncClient）/ Storage（スレッドプール）の非同期リポジトリ"""
+
+    def __init__(self, firebase_service: Optional[FirebaseService] = None, max_workers: Optional[int] = None):
+        """
+        Initialize Async Firebase Repository
+
+        Args:
+            firebase_service: ブロッキング処理を委譲する FirebaseService（None の場合は作成する）
+            max_workers: Storage / 書き込み用スレッドプールのスレッド数
+        """
+        # firebase_admin の初期化（認証情報・バケット）は FirebaseService に任せる
+        self.firebase = firebase_service or FirebaseService()
+        max_workers = max_workers if max_workers is not None else int(os.getenv('FIREBASE_BLOCKING_WORKERS', '16'))
+        self._executor = ThreadPoolExecutor(max_workers=max(max_workers, 1), thread_name_prefix="firebase-blocking")
+        self._db: Optional[AsyncClient] = None
+
+    @property
+    def db(self) -> AsyncClient:
+        """Get Firestore AsyncClient."""
+        if self._db is None:
+            self._db = firestore_async.client()
+        return self._db
+
+    async def run_blocking(self, func: Callable, *args, **kwargs) -> Any:
+        """ブロッキングの処理をスレッドプールで実行"""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, functools.partial(func, *args, **kwargs))
+
+    async def close(self):
+        """AsyncClient とスレッドプールを閉じる"""
+        if self._db is not None:
+            self._db.close()
+            self._db = None
+        self._executor.shutdown(wait=False)
+
+    # ---- Firestore reads (AsyncClient) ----
+
+    async def get_home_data(self, user_id: str) -> Dict[str, Any]:
+        """
+        Get data for home screen (recent coordinates and aggregated tags).
+
+        HomeCache を使い、書き込み時は FirebaseService が無効化します。
+
+        Args:
+            user_id: User ID
+
+        Returns:
+            dict: {"recent_coordinates": [...], "tags": [...]}
+        """
+        try:
+            home_cache = get_home_cache()
+            if home_cache is None:
+                return await self._load_home_data(user_id)
+            return await home_cache.get_or_load_async(user_id, lambda: self._load_home_data(user_id))
+        except Exception as e:
+            print(f"Error getting home data: {e}")
+            return {
+                "recent_coordinates": [],
+                "tags": []
+            }
+
+    async def _load_home_data(self, user_id: str) -> Dict[str, Any]:
+        """Firestore からホーム画面のデータを読み込む（エラーは呼び出し元に伝播し、キャッシュしない）"""
+        print(f"[Debug] Fetching home data for user: {user_id}")
+
+        # Try 'fashion-review' collection first
+        try:
+            docs = await (
+                self.db.collection('fashion-review')
+                .where('user_id', '==', user_id)
+                .order_by('created_at', direction=AsyncQuery.DESCENDING)
+                .limit(30)
+                .get()
+            )
+        except Exception as e:
+            print(f"[Warning] Query failed (likely missing index): {e}")
+            print("[Info] Retrying without order_by...")
+            docs = await (
+                self.db.collection('fashion-review')
+                .where('user_id', '==', user_id)
+                .limit(30)
+                .get()
+            )
+            # Sort in memory
+            docs.sort(key=lambda x: x.to_dict().get('created_at', ''), reverse=True)
+
+        print(f"[Debug] Found {len(docs)} docs in 'fashion-review'")
+
+        # If no docs found, try legacy 'coordinates' collection
+        if not docs:
+            print(f"[Debug] 'fashion-review' empty, trying 'coordinates' collection")
+            try:
+                docs = await (
+                    self.db.collection('coordinates')
+                    .where('user_id', '==', user_id)
+                    .order_by('created_at', direction=AsyncQuery.DESCENDING)
+                    .limit(30)
+                    .get()
+                )
+            except Exception as e:
+                print(f"[Warning] Legacy query failed: {e}")
+                docs = await (
+                    self.db.collection('coordinates')
+                    .where('user_id', '==', user_id)
+                    .limit(30)
+                    .get()
+                )
+
+            print(f"[Debug] Found {len(docs)} docs in 'coordinates'")
+
+        return self._home_payload(docs)
+
+    async def get_user_items(
+        self,
+        user_id: str,
+        item_type: Optional[str] = None,
+        limit: int = 50
+    ) -> List[Dict[str, Any]]:
+        """
+        Get items from user's closet.
+
+        Args:
+            user_id: User ID
+            item_type: Optional filter by item type
+            limit: Max items to fetch
+
+        Returns:
+            list: List of item data
+        """
+        try:
+            query = self.db.collection('users').document(user_id).collection('items')
+
+            if item_type:
+                query = query.where('item_type', '==', item_type)
+
+            # Order by created_at desc
+            docs = await query.order_by('created_at', direction=AsyncQuery.DESCENDING).limit(limit).get()
+
+            return [self._format_timestamps(doc.to_dict(), ('created_at',)) for doc in docs]
+        except Exception as e:
+            print(f"Error getting user items: {e}")
+            return []
+
+    async def get_user_coordinates(
+        self,
+        user_id: str,
+        limit: int = 10
+    ) -> List[Dict[str, Any]]:
+        """
+        Get user's recent coordinates from Firestore.
+
+        Args:
+            user_id: User ID
+            limit: Maximum number of coordinates to retrieve
+
+        Returns:
+            list: List of coordinate data
+        """
+        try:
+            docs = await (
+                self.db.collection('fashion-review')
+                .where('user_id', '==', user_id)
+                .order_by('created_at', direction=AsyncQuery.DESCENDING)
+                .limit(limit)
+                .get()
+            )
+            return [self._format_timestamps(doc.to_dict(), ('created_at', 'updated_at')) for doc in docs]
+        except Exception as e:
+            print(f"Error getting user coordinates: {e}")
+            return []
+
+    async def get_recent_coordinates_with_tags(
+        self,
+        user_id: str,
+        target_days: int = 7,
+        limit: int = 3
+    ) -> List[List[str]]:
+        """
+        Get tags from user's recent coordinates within target_days period.
+
+        Args:
+            user_id: User ID
+            target_days: Number of days to look back (default: 7)
+            limit: Maximum number of coordinates to retrieve (default: 3)
+
+        Returns:
+            list: List of tag lists from recent coordinates
+        """
+        try:
+            cutoff_date = datetime.now() - timedelta(days=target_days)
+            docs = await (
+                self.db.collection('fashion-review')
+                .where('user_id', '==', user_id)
+                .where('created_at', '>=', cutoff_date)
+                .order_by('created_at', direction=AsyncQuery.DESCENDING)
+                .limit(limit)
+                .get()
+            )
+            tags_list = self._tags_lists(docs)
+            print(f"[Firebase] Found {len(tags_list)} coordinates with tags within {target_days} days")
+            return tags_list
+
+        except Exception as e:
+            print(f"Error getting recent coordinates with tags: {e}")
+            # Fallback: try without date filter
+            try:
+                docs = await (
+                    self.db.collection('fashion-review')
+                    .where('user_id', '==', user_id)
+                    .limit(limit)
+                    .get()
+                )
+                tags_list = self._tags_lists(docs)
+                print(f"[Firebase] Fallback: Found {len(tags_list)} coordinates with tags")
+                return tags_list
+            except Exception as fallback_error:
+                print(f"Fallback error getting coordinates: {fallback_error}")
+                return []
+
+    async def get_coordinates_by_month(
+        self,
+        user_id: str,
+        year: int,
+        month: int
+    ) -> List[Dict[str, Any]]:
+        """
+        Get all coordinates for a specific month.
+
+        date（"YYYY/MM/DD" 形式の文字列）の範囲クエリで対象月のドキュメントのみを読み込み、
+        フィールドは MONTH_VIEW_FIELDS（id, date, coordinate_image_path）のみ取得します（items 等は転送しない）。
+        複合インデックス fashion-review (user_id ASC, date ASC) が必要で、
+        未作成の場合はユーザーの全ドキュメントを読み込んで絞り込みます。
+
+        Args:
+            user_id: User ID
+            year: Target year
+            month: Target month (1-12)
+
+        Returns:
+            list: List of coordinate data for the month (id, date, coordinate_image_path)
+        """
+        target_prefix = f"{year:04d}/{month:02d}/"
+        try:
+            try:
+                docs = await (
+                    self.db.collection('fashion-review')
+                    .where('user_id', '==', user_id)
+                    .where('date', '>=', target_prefix)
+                    .where('date', '<', target_prefix + '\uf8ff')
+                    .select(self.MONTH_VIEW_FIELDS)
+                    .get()
+                )
+                coordinates = [doc.to_dict() for doc in docs]
+            except FailedPrecondition as e:
+                print(f"[Firebase] Index (user_id, date) for fashion-review is missing, scanning all coordinates: {e}")
+                docs = await (
+                    self.db.collection('fashion-review')
+                    .where('user_id', '==', user_id)
+                    .select(self.MONTH_VIEW_FIELDS)
+                    .get()
+                )
+                coordinates = self._filter_by_date_prefix(docs, target_prefix)
+
+            print(f"[Firebase] Found {len(coordinates)} coordinates for {year}/{month:02d}")
+            return coordinates
+
+        except Exception as e:
+            print(f"Error getting coordinates by month: {e}")
+            import traceback
+            traceback.print_exc()
+            return []
+
+    async def get_coordinate_by_date(
+        self,
+        user_id: str,
+        target_date: str
+    ) -> Optional[Dict[str, Any]]:
+        """
+        Get coordinate for a specific date.
+
+        Args:
+            user_id: User ID
+            target_date: Date string in YYYY-MM-DD format
+
+        Returns:
+            dict or None: Coordinate data
+        """
+        try:
+            # Convert YYYY-MM-DD to YYYY/MM/DD to match Firestore format
+            firestore_date = target_date.replace('-', '/')
+            docs = await (
+                self.db.collection('fashion-review')
+                .where('user_id', '==', user_id)
+                .where('date', '==', firestore_date)
+                .limit(1)
+                .get()
+            )
+            return docs[0].to_dict() if docs else None
+
+        except Exception as e:
+            print(f"Error getting coordinate by date: {e}")
+            return None
+
+    # ---- Document formatting ----
+
+    @staticmethod
+    def _format_timestamps(data: Dict[str, Any], fields: tuple) -> Dict[str, Any]:
+        """Timestamp のフィールドを ISO 形式の文字列に変換"""
+        for field in fields:
+            if field in data and data[field]:
+                data[field] = data[field].isoformat() if hasattr(data[field], 'isoformat') else str(data[field])
+        return data
+
+    @staticmethod
+    def _home_payload(docs: List[Any]) -> Dict[str, Any]:
+        """ホーム画面のペイロード（最近のコーディネート7件と集計したタグ）を作成"""
+        all_coordinates = []
+        tags_set = set()
+
+        for doc in docs:
+            data = doc.to_dict()
+            
+            # Format date
+            date_str = data.get('date', '')
+            if not date_str and 'created_at' in data and data['created_at']:
+                # Fallback to created_at if date field is missing
+                try:
+                    ts = data['created_at']
+                    if hasattr(ts, 'date'):
+                        date_str = ts.date().strftime('%Y/%m/%d')
+                    elif hasattr(ts, 'strftime'):
+                        date_str = ts.strftime('%Y/%m/%d')
+                except Exception:
+                    pass
+
+            image_url = data.get('coordinate_image_path', '')
+            # Fallback for old data structure
+            if not image_url:
+                image_url = data.get('image_path', '')
+
+            all_coordinates.append({
+                'id': data.get('id', doc.id),
+                'image_url': image_url,
+                'date': date_str
+            })
+
+            # Aggregate tags
+            if 'tags' in data and isinstance(data['tags'], list):
+                for tag in data['tags']:
+                    if tag:
+                        tags_set.add(tag)
+
+        # Get top 7 for display
+        recent_coordinates = all_coordinates[:7]
+        
+        # Convert tags set to list
+        tags = list(tags_set)
+        
+        print(f"[Debug] Returning {len(recent_coordinates)} coords and {len(tags)} tags")
+
+        return {
+            "recent_coordinates": recent_coordinates,
+            "tags": tags
+        }
+
+    @staticmethod
+    def _tags_lists(docs: List[Any]) -> List[List[str]]:
+        """コーディネートごとのタグのリストを作成（タグのないコーディネートは除く）"""
+        tags_list = []
+        for doc in docs:
+            tags = doc.to_dict().get('tags', [])
+            if tags:
+                tags_list.append(tags)
+        return tags_list
+
+    # カレンダー表示（/api/coordinate/list）に必要なフィールド
+    MONTH_VIEW_FIELDS = ['id', 'date', 'coordinate_image_path']
+
+    @staticmethod
+    def _filter_by_date_prefix(docs: List[Any], target_prefix: str) -> List[Dict[str, Any]]:
+        coordinates = []
+        for doc in docs:
+            data = doc.to_dict()
+            # Check if date starts with "YYYY/MM/"
+            if data.get('date', '').startswith(target_prefix):
+                coordinates.append(data)
+        return coordinates
+
+    # ---- Storage and writes (FirebaseService on the bounded executor) ----
+
+    async def upload_image(self, image_data: bytes, folder: str = "coordinates") -> str:
+        return await self.run_blocking(self.firebase.upload_image, image_data, folder)
+
+    async def delete_images(self, image_urls: List[str]) -> Dict[str, bool]:
+        return await self.run_blocking(self.firebase.delete_images, image_urls)
+
+    async def save_coordinate_with_items(self, **kwargs) -> Dict[str, Any]:
+        return await self.run_blocking(self.firebase.save_coordinate_with_items, **kwargs)
+
+    async def save_user_closet_item(self, **kwargs) -> Dict[str, Any]:
+        return await self.run_blocking(self.firebase.save_user_closet_item, **kwargs)
+
+    async def register_items_batch(self, items_data: List[Dict[str, Any]]) -> Dict[str, Any]:
+        return await self.run_blocking(self.firebase.register_items_batch, items_data)
+
+    async def delete_coordinate(self, user_id: str, coordinate_id: str) -> dict:
+        return await self.run_blocking(self.firebase.delete_coordinate, user_id, coordinate_id)
+
+
+# グローバルインスタンス（シングルトンパターン）
+_firebase_repository = None
+
+
+def get_firebase_repository() -> AsyncFirebaseRepository:
+    """
+    AsyncFirebaseRepositoryのグローバルインスタンスを取得
+
+    Returns:
+        AsyncFirebaseRepository: シングルトンインスタンス
+    """
+    global _firebase_repository
+    if _firebase_repository is None:
+        _firebase_repository = AsyncFirebaseRepository()
+    return _firebase_repository
+
+
+async def close_firebase_repository():
+    """シャットダウン時に AsyncClient とスレッドプールを閉じる"""
+    global _firebase_repository
+    if _firebase_repository is not None:
+        await _firebase_repository.close()
+        _firebase_repository = None
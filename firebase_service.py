@@ -50,8 +50,12 @@ Firebase Service for handling storage and Firestore operations.
    - FIREBASE_STORAGE_BUCKET: Storageバケット名
    - GOOGLE_GENAI_API_KEY: Gemini APIキー
 
-### 7. Firestoreのインデックスを作成（optional, クエリ実行時にエラーが出た場合のみ）
-   エラーメッセージに表示されるURLからインデックスを自動作成できます
+### 7. Firestoreのインデックスを作成
+   以下の複合インデックスを作成してください（/api/coordinate/list の月範囲クエリで使用）
+   - fashion-review: user_id (Ascending), date (Ascending)
+   - fashion-review: user_id (Ascending), created_at (Descending)（最近のコーディネート・インサイト用のレビュー）
+   - user-insights: user_id (Ascending), generated_at (Descending)（/api/user-insight/history で使用）
+   その他、クエリ実行時にエラーが出た場合はエラーメッセージに表示されるURLからインデックスを自動作成できます
 
 ### 8. Storage セキュリティルールの設定（本番環境用）
    Firebase Console → Storage → ルールタブで以下を設定:
@@ -100,19 +104,29 @@ Firebase Service for handling storage and Firestore operations.
 """
 
 import os
+import time
+import urllib.parse
 import uuid
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 from typing import List, Optional, Dict, Any
 import firebase_admin
 from firebase_admin import credentials, storage, firestore
+from google.api_core.exceptions import NotFound
 from io import BytesIO
 
+from home_cache import get_home_cache
+from item_image_manifest import get_item_image_manifest
+
 
 class FirebaseService:
     _initialized = False
     _db = None
     _bucket = None
 
+    # Firestore の1バッチあたりの書き込み上限
+    BATCH_WRITE_LIMIT = 500
+
     def __init__(self):
         """
         Initialize Firebase Admin SDK if not already initialized.
@@ -161,6 +175,13 @@ class FirebaseService:
             FirebaseService._bucket = storage.bucket()
         return FirebaseService._bucket
 
+    @staticmethod
+    def _invalidate_home(user_id: str):
+        """ユーザーのホーム画面キャッシュを無効化（書き込み後に呼び出す）"""
+        home_cache = get_home_cache()
+        if home_cache is not None:
+            home_cache.invalidate(user_id)
+
     def upload_image(self, image_data: bytes, folder: str = "coordinates") -> str:
         """
         Upload image to Firebase Storage.
@@ -217,29 +238,132 @@ class FirebaseService:
             dict: Saved coordinate data
         """
         try:
-            coordinate_data = {
-                'id': coordinate_id,
-                'user_id': user_id,
-                'date': datetime.now().strftime('%Y/%m/%d'),
-                'coordinate_image_path': image_path,
-                'ai_catchphrase': ai_catchphrase,
-                'ai_review_comment': ai_review_comment,
-                'tags': tags or [],
-                'items': items or [],
-                'item_types': item_types or [],
-                'created_at': firestore.SERVER_TIMESTAMP,
-                'updated_at': firestore.SERVER_TIMESTAMP
-            }
+            coordinate_data = self._coordinate_document(
+                user_id, coordinate_id, image_path, ai_catchphrase, ai_review_comment, tags, items, item_types
+            )
 
             # Save to Firestore
             doc_ref = self.db.collection('fashion-review').document(coordinate_id)
             doc_ref.set(coordinate_data)
+            self._invalidate_home(user_id)
 
             return coordinate_data
         except Exception as e:
             print(f"Error saving coordinate: {e}")
             raise
 
+    def save_coordinate_with_items(
+        self,
+        user_id: str,
+        coordinate_id: str,
+        image_path: str,
+        ai_catchphrase: str,
+        ai_review_comment: str,
+        tags: Optional[List[str]] = None,
+        items: Optional[List[Dict[str, Any]]] = None,
+        item_types: Optional[List[str]] = None,
+        date: Optional[str] = None
+    ) -> Dict[str, Any]:
+        """
+        Save coordinate and its items to the user's closet in a single batch write.
+
+        save_coordinate + save_user_item（アイテムごと）と同じドキュメントを1回のコミットで書き込みます。
+        コーディネートとクローゼットのアイテムは all-or-nothing で保存されます。
+
+        Args:
+            user_id: User ID
+            coordinate_id: Coordinate ID
+            image_path: Firebase Storage image URL
+            ai_catchphrase: AI generated catchphrase
+            ai_review_comment: AI generated review comment
+            tags: Optional tags list
+            items: Optional items list (embedded in coordinate document and saved to users/{user_id}/items)
+            item_types: Optional list of found item types (e.g., ["アウター", "トップス", "ボトムス"])
+            date: Coordinate date "YYYY/MM/DD"（write-behind で遅れて書き込む場合にレビュー時の日付を使う, デフォルト: 今日）
+
+        Returns:
+            dict: Saved coordinate data
+        """
+        try:
+            coordinate_data = self._coordinate_document(
+                user_id, coordinate_id, image_path, ai_catchphrase, ai_review_comment, tags, items, item_types, date
+            )
+
+            batch = self.db.batch()
+            batch.set(self.db.collection('fashion-review').document(coordinate_id), coordinate_data)
+            items_ref = self.db.collection('users').document(user_id).collection('items')
+            for item in items or []:
+                item_data = self._user_item_document(
+                    user_id=user_id,
+                    item_id=item['id'],
+                    coordinate_id=coordinate_id,
+                    item_type=item['item_type'],
+                    category=item.get('category'),
+                    color=item.get('color'),
+                    image_url=item.get('item_image_path', image_path),  # Use individual image if available
+                    description=item.get('description')
+                )
+                batch.set(items_ref.document(item['id']), item_data)
+            batch.commit()
+            self._invalidate_home(user_id)
+
+            print(f"[Firestore] Saved coordinate {coordinate_id} with {len(items or [])} closet items in one batch")
+            return coordinate_data
+        except Exception as e:
+            print(f"Error saving coordinate with items: {e}")
+            raise
+
+    @staticmethod
+    def _coordinate_document(
+        user_id: str,
+        coordinate_id: str,
+        image_path: str,
+        ai_catchphrase: str,
+        ai_review_comment: str,
+        tags: Optional[List[str]],
+        items: Optional[List[Dict[str, Any]]],
+        item_types: Optional[List[str]],
+        date: Optional[str] = None
+    ) -> Dict[str, Any]:
+        """fashion-review コレクションのドキュメントを作成"""
+        return {
+            'id': coordinate_id,
+            'user_id': user_id,
+            'date': date or datetime.now().strftime('%Y/%m/%d'),
+            'coordinate_image_path': image_path,
+            'ai_catchphrase': ai_catchphrase,
+            'ai_review_comment': ai_review_comment,
+            'tags': tags or [],
+            'items': items or [],
+            'item_types': item_types or [],
+            'created_at': firestore.SERVER_TIMESTAMP,
+            'updated_at': firestore.SERVER_TIMESTAMP
+        }
+
+    @staticmethod
+    def _user_item_document(
+        user_id: str,
+        item_id: str,
+        coordinate_id: str,
+        item_type: str,
+        category: Optional[str],
+        color: Optional[str],
+        image_url: Optional[str],
+        description: Optional[str]
+    ) -> Dict[str, Any]:
+        """users/{user_id}/items のドキュメントを作成"""
+        return {
+            'id': item_id,
+            'user_id': user_id,
+            'coordinate_id': coordinate_id,
+            'item_type': item_type,
+            'category': category,
+            'color': color,
+            'image_url': image_url,
+            'description': description,
+            'created_at': firestore.SERVER_TIMESTAMP
+        }
+
     def save_item(
         self,
         item_id: str,
@@ -291,46 +415,6 @@ class FirebaseService:
             print(f"Error saving item: {e}")
             raise
 
-    def get_user_coordinates(
-        self,
-        user_id: str,
-        limit: int = 10
-    ) -> List[Dict[str, Any]]:
-        """
-        Get user's recent coordinates from Firestore.
-
-        Args:
-            user_id: User ID
-            limit: Maximum number of coordinates to retrieve
-
-        Returns:
-            list: List of coordinate data
-        """
-        try:
-            # Query coordinates by user_id, ordered by date
-            docs = (
-                self.db.collection('fashion-review')
-                .where('user_id', '==', user_id)
-                .order_by('created_at', direction=firestore.Query.DESCENDING)
-                .limit(limit)
-                .stream()
-            )
-
-            coordinates = []
-            for doc in docs:
-                data = doc.to_dict()
-                # Convert Timestamp to string if exists
-                if 'created_at' in data and data['created_at']:
-                    data['created_at'] = data['created_at'].isoformat() if hasattr(data['created_at'], 'isoformat') else str(data['created_at'])
-                if 'updated_at' in data and data['updated_at']:
-                    data['updated_at'] = data['updated_at'].isoformat() if hasattr(data['updated_at'], 'isoformat') else str(data['updated_at'])
-                coordinates.append(data)
-
-            return coordinates
-        except Exception as e:
-            print(f"Error getting user coordinates: {e}")
-            return []
-
     def get_coordinate_items(self, coordinate_id: str) -> List[Dict[str, Any]]:
         """
         Get items for a specific coordinate.
@@ -393,166 +477,25 @@ class FirebaseService:
         Returns:
             List of public image URLs (empty list if no images found)
         """
-        try:
-            prefix = f"items/{item_id}/"
-            blobs = self.bucket.list_blobs(prefix=prefix)
-
-            image_urls = []
-            for blob in blobs:
-                # Skip directories
-                if blob.name.endswith('/'):
-                    continue
-
-                # Make public if not already
-                blob.make_public()
-
-                image_urls.append(blob.public_url)
-
-            return image_urls
-
-        except Exception as e:
-            print(f"Error getting images for item {item_id}: {e}")
-            return []
+        return self.get_item_images_batch([item_id]).get(item_id, [])
 
     def get_item_images_batch(self, item_ids: List[str]) -> Dict[str, List[str]]:
         """
         Get image URLs for multiple items in batch.
 
+        ItemImageManifest（item_image_manifest.py）から返し、マニフェストにないアイテムのみ並列に一覧取得します。
+
         Args:
             item_ids: List of item IDs
 
         Returns:
             Dictionary mapping item_id -> list of image URLs
         """
-        result = {}
-
-        for item_id in item_ids:
-            if not item_id or item_id.strip() == "":
-                continue
-            result[item_id] = self.get_item_images(item_id)
-
-        return result
-
-    def get_home_data(self, user_id: str) -> Dict[str, Any]:
-        """
-        Get data for home screen (recent coordinates and aggregated tags).
-        
-        Args:
-            user_id: User ID
-            
-        Returns:
-            dict: {
-                "recent_coordinates": [...],
-                "tags": [...]
-            }
-        """
         try:
-            print(f"[Debug] Fetching home data for user: {user_id}")
-            
-            # Try 'fashion-review' collection first
-            try:
-                docs_stream = (
-                    self.db.collection('fashion-review')
-                    .where('user_id', '==', user_id)
-                    .order_by('created_at', direction=firestore.Query.DESCENDING)
-                    .limit(30)
-                    .stream()
-                )
-                docs = list(docs_stream)
-            except Exception as e:
-                print(f"[Warning] Query failed (likely missing index): {e}")
-                print("[Info] Retrying without order_by...")
-                docs_stream = (
-                    self.db.collection('fashion-review')
-                    .where('user_id', '==', user_id)
-                    .limit(30)
-                    .stream()
-                )
-                docs = list(docs_stream)
-                # Sort in memory
-                docs.sort(key=lambda x: x.to_dict().get('created_at', ''), reverse=True)
-            
-            print(f"[Debug] Found {len(docs)} docs in 'fashion-review'")
-
-            # If no docs found, try legacy 'coordinates' collection
-            if not docs:
-                print(f"[Debug] 'fashion-review' empty, trying 'coordinates' collection")
-                try:
-                    docs_stream = (
-                        self.db.collection('coordinates')
-                        .where('user_id', '==', user_id)
-                        .order_by('created_at', direction=firestore.Query.DESCENDING)
-                        .limit(30)
-                        .stream()
-                    )
-                    docs = list(docs_stream)
-                except Exception as e:
-                    print(f"[Warning] Legacy query failed: {e}")
-                    docs_stream = (
-                        self.db.collection('coordinates')
-                        .where('user_id', '==', user_id)
-                        .limit(30)
-                        .stream()
-                    )
-                    docs = list(docs_stream)
-                
-                print(f"[Debug] Found {len(docs)} docs in 'coordinates'")
-
-            all_coordinates = []
-            tags_set = set()
-
-            for doc in docs:
-                data = doc.to_dict()
-                
-                # Format date
-                date_str = data.get('date', '')
-                if not date_str and 'created_at' in data and data['created_at']:
-                    # Fallback to created_at if date field is missing
-                    try:
-                        ts = data['created_at']
-                        if hasattr(ts, 'date'):
-                            date_str = ts.date().strftime('%Y/%m/%d')
-                        elif hasattr(ts, 'strftime'):
-                            date_str = ts.strftime('%Y/%m/%d')
-                    except Exception:
-                        pass
-
-                image_url = data.get('coordinate_image_path', '')
-                # Fallback for old data structure
-                if not image_url:
-                    image_url = data.get('image_path', '')
-
-                all_coordinates.append({
-                    'id': data.get('id', doc.id),
-                    'image_url': image_url,
-                    'date': date_str
-                })
-
-                # Aggregate tags
-                if 'tags' in data and isinstance(data['tags'], list):
-                    for tag in data['tags']:
-                        if tag:
-                            tags_set.add(tag)
-
-            # Get top 7 for display
-            recent_coordinates = all_coordinates[:7]
-            
-            # Convert tags set to list
-            tags = list(tags_set)
-            
-            print(f"[Debug] Returning {len(recent_coordinates)} coords and {len(tags)} tags")
-
-            return {
-                "recent_coordinates": recent_coordinates,
-                "tags": tags
-            }
-
+            return get_item_image_manifest(self.bucket).get_many(item_ids)
         except Exception as e:
-            print(f"Error getting home data: {e}")
-            return {
-                "recent_coordinates": [],
-                "tags": []
-            }
+            print(f"Error getting item images: {e}")
+            return {item_id: [] for item_id in item_ids if item_id and item_id.strip()}
 
     def save_user_item(
         self,
@@ -582,68 +525,20 @@ class FirebaseService:
             dict: Saved item data
         """
         try:
-            item_data = {
-                'id': item_id,
-                'user_id': user_id,
-                'coordinate_id': coordinate_id,
-                'item_type': item_type,
-                'category': category,
-                'color': color,
-                'image_url': image_url,
-                'description': description,
-                'created_at': firestore.SERVER_TIMESTAMP
-            }
+            item_data = self._user_item_document(
+                user_id, item_id, coordinate_id, item_type, category, color, image_url, description
+            )
 
             # Save to users/{user_id}/items/{item_id}
             doc_ref = self.db.collection('users').document(user_id).collection('items').document(item_id)
             doc_ref.set(item_data)
+            self._invalidate_home(user_id)
 
             return item_data
         except Exception as e:
             print(f"Error saving user item: {e}")
             raise
 
-    def get_user_items(
-        self,
-        user_id: str,
-        item_type: Optional[str] = None,
-        limit: int = 50
-    ) -> List[Dict[str, Any]]:
-        """
-        Get items from user's closet.
-
-        Args:
-            user_id: User ID
-            item_type: Optional filter by item type
-            limit: Max items to fetch
-
-        Returns:
-            list: List of item data
-        """
-        try:
-            query = self.db.collection('users').document(user_id).collection('items')
-
-            if item_type:
-                query = query.where('item_type', '==', item_type)
-
-            # Order by created_at desc
-            query = query.order_by('created_at', direction=firestore.Query.DESCENDING).limit(limit)
-
-            docs = query.stream()
-
-            items = []
-            for doc in docs:
-                data = doc.to_dict()
-                # Format timestamps
-                if 'created_at' in data and data['created_at']:
-                    data['created_at'] = data['created_at'].isoformat() if hasattr(data['created_at'], 'isoformat') else str(data['created_at'])
-                items.append(data)
-
-            return items
-        except Exception as e:
-            print(f"Error getting user items: {e}")
-            return []
-
     def save_standard_item(
         self,
         item_id: str,
@@ -740,6 +635,7 @@ class FirebaseService:
 
             doc_ref = self.db.collection('users').document(user_id).collection('items').document(item_id)
             doc_ref.set(item_data)
+            self._invalidate_home(user_id)
 
             print(f"[UserClosetItem] Saved user item: {item_id} for user: {user_id}")
             return item_data
@@ -766,12 +662,14 @@ class FirebaseService:
         """
         try:
             batch = self.db.batch()
+            user_ids = set()
 
             for item in items_data:
                 if item['collection'].startswith('users/'):
                     # users/{user_id}/items pattern
                     parts = item['collection'].split('/')
                     user_id = parts[1]
+                    user_ids.add(user_id)
                     doc_ref = self.db.collection('users').document(user_id).collection('items').document(item['document_id'])
                 else:
                     # items collection
@@ -780,6 +678,8 @@ class FirebaseService:
                 batch.set(doc_ref, item['data'])
 
             batch.commit()
+            for user_id in user_ids:
+                self._invalidate_home(user_id)
 
             print(f"[BatchRegistration] Successfully registered {len(items_data)} items")
             return {
@@ -795,202 +695,84 @@ class FirebaseService:
                 "error": str(e)
             }
 
-    def get_recent_coordinates_with_tags(
-        self,
-        user_id: str,
-        target_days: int = 7,
-        limit: int = 3
-    ) -> List[List[str]]:
+    @staticmethod
+    def _storage_path_from_url(image_url: str) -> Optional[str]:
         """
-        Get tags from user's recent coordinates within target_days period.
-
-        Args:
-            user_id: User ID
-            target_days: Number of days to look back (default: 7)
-            limit: Maximum number of coordinates to retrieve (default: 3)
+        Storage の URL からオブジェクトのパスを取得
 
-        Returns:
-            list: List of tag lists from recent coordinates
+        URL format: https://firebasestorage.googleapis.com/v0/b/{bucket}/o/{encoded_path}?...
+        or https://storage.googleapis.com/{bucket}/{encoded_path}（upload_image の public_url）
         """
-        try:
-            from datetime import datetime, timedelta
-
-            # Calculate the cutoff date
-            cutoff_date = datetime.now() - timedelta(days=target_days)
-
-            # Query coordinates by user_id, ordered by created_at
-            docs = (
-                self.db.collection('fashion-review')
-                .where('user_id', '==', user_id)
-                .where('created_at', '>=', cutoff_date)
-                .order_by('created_at', direction=firestore.Query.DESCENDING)
-                .limit(limit)
-                .stream()
-            )
-
-            tags_list = []
-            for doc in docs:
-                data = doc.to_dict()
-                tags = data.get('tags', [])
-                if tags:
-                    tags_list.append(tags)
-
-            print(f"[Firebase] Found {len(tags_list)} coordinates with tags within {target_days} days")
-            return tags_list
-
-        except Exception as e:
-            print(f"Error getting recent coordinates with tags: {e}")
-            # Fallback: try without date filter
-            try:
-                docs = (
-                    self.db.collection('fashion-review')
-                    .where('user_id', '==', user_id)
-                    .limit(limit)
-                    .stream()
-                )
-
-                tags_list = []
-                for doc in docs:
-                    data = doc.to_dict()
-                    tags = data.get('tags', [])
-                    if tags:
-                        tags_list.append(tags)
-
-                print(f"[Firebase] Fallback: Found {len(tags_list)} coordinates with tags")
-                return tags_list
-            except Exception as fallback_error:
-                print(f"Fallback error getting coordinates: {fallback_error}")
-                return []
-
-    def get_coordinates_by_month(
-        self,
-        user_id: str,
-        year: int,
-        month: int
-    ) -> List[Dict[str, Any]]:
-        """
-        Get all coordinates for a specific month.
-
-        Args:
-            user_id: User ID
-            year: Target year
-            month: Target month (1-12)
-
-        Returns:
-            list: List of coordinate data for the month
-        """
-        try:
-            # Get all coordinates for the user
-            # Note: Using date range query (>= and <=) requires composite index in Firestore
-            # Instead, we fetch all user coordinates and filter in memory
-            docs = (
-                self.db.collection('fashion-review')
-                .where('user_id', '==', user_id)
-                .stream()
-            )
-
-            # Filter by year/month in memory
-            target_prefix = f"{year:04d}/{month:02d}/"
-            coordinates = []
-            for doc in docs:
-                data = doc.to_dict()
-                date_str = data.get('date', '')
-                # Check if date starts with "YYYY/MM/"
-                if date_str.startswith(target_prefix):
-                    coordinates.append(data)
-
-            print(f"[Firebase] Found {len(coordinates)} coordinates for {year}/{month:02d}")
-            return coordinates
-
-        except Exception as e:
-            print(f"Error getting coordinates by month: {e}")
-            import traceback
-            traceback.print_exc()
-            return []
-
-    def get_coordinate_by_date(
-        self,
-        user_id: str,
-        target_date: str
-    ) -> Optional[Dict[str, Any]]:
-        """
-        Get coordinate for a specific date.
-
-        Args:
-            user_id: User ID
-            target_date: Date string in YYYY-MM-DD format
-
-        Returns:
-            dict or None: Coordinate data
-        """
-        try:
-            # Convert YYYY-MM-DD to YYYY/MM/DD to match Firestore format
-            firestore_date = target_date.replace('-', '/')
-
-            docs = (
-                self.db.collection('fashion-review')
-                .where('user_id', '==', user_id)
-                .where('date', '==', firestore_date)
-                .limit(1)
-                .stream()
-            )
-
-            for doc in docs:
-                return doc.to_dict()
-
-            return None
-
-        except Exception as e:
-            print(f"Error getting coordinate by date: {e}")
+        if 'storage.googleapis.com' not in image_url and 'firebasestorage.googleapis.com' not in image_url:
             return None
+        parts = image_url.split('/o/')
+        if len(parts) > 1:
+            encoded_path = parts[1].split('?')[0]
+        else:
+            # https://storage.googleapis.com/{bucket}/{path}
+            path_parts = urllib.parse.urlsplit(image_url).path.lstrip('/').split('/', 1)
+            if len(path_parts) < 2:
+                return None
+            encoded_path = path_parts[1]
+        return urllib.parse.unquote(encoded_path) or None
 
     def delete_image_from_url(self, image_url: str) -> bool:
         """
         Delete image from Firebase Storage using its URL.
 
+        存在確認（blob.exists）は行わず、削除のみ行います（1往復）。既に存在しない場合も成功とみなします。
+
         Args:
             image_url: Full Firebase Storage URL
 
         Returns:
-            bool: True if deleted successfully, False otherwise
+            bool: True if deleted successfully (or already missing), False otherwise
         """
         try:
             if not image_url:
                 return False
 
-            # Extract path from URL
-            # URL format: https://storage.googleapis.com/{bucket}/o/{encoded_path}?...
-            # or https://firebasestorage.googleapis.com/v0/b/{bucket}/o/{encoded_path}?...
-            import urllib.parse
-
-            if 'storage.googleapis.com' in image_url or 'firebasestorage.googleapis.com' in image_url:
-                # Extract the path from URL
-                parts = image_url.split('/o/')
-                if len(parts) > 1:
-                    # Get the encoded path and decode it
-                    encoded_path = parts[1].split('?')[0]
-                    file_path = urllib.parse.unquote(encoded_path)
-
-                    # Delete from Storage
-                    blob = self.bucket.blob(file_path)
-                    if blob.exists():
-                        blob.delete()
-                        print(f"[Storage] Deleted image: {file_path}")
-                        return True
-                    else:
-                        print(f"[Storage] Image not found: {file_path}")
-                        return False
+            file_path = self._storage_path_from_url(image_url)
+            if file_path is None:
+                return False
 
-            return False
+            try:
+                self.bucket.blob(file_path).delete()
+                print(f"[Storage] Deleted image: {file_path}")
+            except NotFound:
+                print(f"[Storage] Image not found (already deleted): {file_path}")
+            return True
 
         except Exception as e:
             print(f"Error deleting image from URL {image_url}: {e}")
             return False
 
+    def delete_images(self, image_urls: List[str]) -> Dict[str, bool]:
+        """
+        Delete multiple images from Firebase Storage concurrently.
+
+        重複する URL は1回だけ削除します。同時実行数は STORAGE_DELETE_CONCURRENCY（デフォルト: 8）です。
+
+        Args:
+            image_urls: Storage URLs
+
+        Returns:
+            dict: URL -> 削除に成功したか
+        """
+        unique_urls = list(dict.fromkeys(url for url in image_urls if url))
+        if not unique_urls:
+            return {}
+        max_workers = min(int(os.getenv('STORAGE_DELETE_CONCURRENCY', '8')), len(unique_urls))
+        with ThreadPoolExecutor(max_workers=max(max_workers, 1)) as executor:
+            return dict(zip(unique_urls, executor.map(self.delete_image_from_url, unique_urls)))
+
     def delete_coordinate(self, user_id: str, coordinate_id: str) -> dict:
         """
         Delete coordinate and related items from Firestore and Storage.
 
+        Firestore のドキュメント（コーディネート + クローゼットのアイテム）をバッチで削除した後、
+        Storage の画像を並列に削除します（ブロッキング, イベントループからは asyncio.to_thread で呼び出す）。
+
         Args:
             user_id: User ID
             coordinate_id: Coordinate ID to delete
@@ -1003,6 +785,8 @@ class FirebaseService:
             }
         """
         try:
+            start_time = time.time()
+
             # Get coordinate data before deleting
             coordinate_ref = self.db.collection('fashion-review').document(coordinate_id)
             coordinate_doc = coordinate_ref.get()
@@ -1024,39 +808,40 @@ class FirebaseService:
                     "deleted_items_count": 0
                 }
 
-            # Delete coordinate image from Storage
+            # Coordinate image and embedded item images
             coordinate_image_path = coordinate_data.get('coordinate_image_path')
-            if coordinate_image_path:
-                self.delete_image_from_url(coordinate_image_path)
+            image_urls = [coordinate_image_path]
+            image_urls.extend(item.get('item_image_path') for item in coordinate_data.get('items', []))
 
-            # Get embedded items for image deletion
-            embedded_items = coordinate_data.get('items', [])
-            for item in embedded_items:
-                item_image_path = item.get('item_image_path')
-                if item_image_path:
-                    self.delete_image_from_url(item_image_path)
-
-            # Delete items from user's closet (users/{user_id}/items)
+            # Items in user's closet (users/{user_id}/items); only the image URL is needed
             items_ref = self.db.collection('users').document(user_id).collection('items')
-            items_query = items_ref.where('coordinate_id', '==', coordinate_id).stream()
-
-            deleted_items_count = 0
-            for item_doc in items_query:
-                item_data = item_doc.to_dict()
-
-                # Delete item image from Storage if different from coordinate image
-                item_image_url = item_data.get('image_url')
-                if item_image_url and item_image_url != coordinate_image_path:
-                    self.delete_image_from_url(item_image_url)
-
-                # Delete item document
-                item_doc.reference.delete()
-                deleted_items_count += 1
-                print(f"[Firestore] Deleted item: {item_doc.id}")
-
-            # Delete coordinate from Firestore
-            coordinate_ref.delete()
-            print(f"[Firestore] Deleted coordinate: {coordinate_id}")
+            item_docs = list(items_ref.where('coordinate_id', '==', coordinate_id).select(['image_url']).stream())
+            image_urls.extend((item_doc.to_dict() or {}).get('image_url') for item_doc in item_docs)
+
+            # Delete Firestore documents first (in batches of up to 500 writes),
+            # so a Storage failure leaves orphaned images rather than documents pointing to missing images
+            references = [item_doc.reference for item_doc in item_docs] + [coordinate_ref]
+            commits = 0
+            for offset in range(0, len(references), self.BATCH_WRITE_LIMIT):
+                batch = self.db.batch()
+                for reference in references[offset:offset + self.BATCH_WRITE_LIMIT]:
+                    batch.delete(reference)
+                batch.commit()
+                commits += 1
+            deleted_items_count = len(item_docs)
+            self._invalidate_home(user_id)
+            print(f"[Firestore] Deleted coordinate {coordinate_id} and {deleted_items_count} items in {commits} batch commit(s)")
+
+            # Delete images from Storage concurrently
+            image_results = self.delete_images(image_urls)
+
+            # Round trips: previously 1 get + (exists + delete) per image reference + 1 query + 1 delete per document
+            image_refs = len([url for url in image_urls if url])
+            sequential_round_trips = 1 + 2 * image_refs + 1 + len(references)
+            round_trips = 1 + 1 + commits + len(image_results)
+            print(f"[DeleteCoordinate] {coordinate_id}: {round_trips} round trips "
+                  f"({len(image_results)} Storage deletes in parallel, {commits} Firestore commit(s)), "
+                  f"previously {sequential_round_trips} sequential; {time.time() - start_time:.2f}s")
 
             return {
                 "success": True,
@@ -0,0 +1,375 @@
+"""
+Gemini Bulkhead
+
+Gemini API 呼び出しの同時実行数をモデルごとに制限し（バルクヘッド）、
+混雑時は優先度の高いリクエスト（チャットなど対話的なもの）から順に実行します。
+
+- モデルごとの同時実行数・待ち行列の上限
+- 優先度レーン（INTERACTIVE > DEFAULT > BATCH）
+- 429 / 503 を受けた場合は指数バックオフ（ジッター付き）で再試行し、
+  Retry-After の間はモデル単位で新規の呼び出しを止める（クールダウン）
+- 待ち行列が一杯・待機タイムアウト・クールダウンが長すぎる場合は即座に GeminiOverloadedError を送出
+  （呼び出し側は既存のフォールバックを返す）
+
+同期呼び出し（スレッド）と非同期呼び出し（イベントループ）で同じ枠を共有します。
+
+環境変数:
+    GEMINI_MAX_CONCURRENCY: モデルごとの最大同時実行数（デフォルト: 8）
+    GEMINI_MAX_CONCURRENCY_OVERRIDES: モデル別の上限（例: "gemini-2.5-pro=2,gemini-2.5-flash-lite=16"）
+    GEMINI_MAX_QUEUE: モデルごとの最大待ち数（デフォルト: 32）
+    GEMINI_QUEUE_TIMEOUT: 待ち行列での最大待機秒数（デフォルト: 10）
+    GEMINI_MAX_RETRIES: 429 / 503 の最大再試行回数（デフォルト: 3）
+    GEMINI_BACKOFF_BASE: バックオフの基準秒数（デフォルト: 0.5）
+    GEMINI_BACKOFF_MAX: バックオフの最大秒数（デフォルト: 8）
+"""
+
+import asyncio
+import heapq
+import itertools
+import os
+import random
+import threading
+import time
+from collections import deque
+from typing import Any, Callable, Dict, Optional
+
+from google.genai import errors
+
+PRIORITY_INTERACTIVE = 0
+PRIORITY_DEFAULT = 1
+PRIORITY_BATCH = 2
+
+_PRIORITY_NAMES = {
+    PRIORITY_INTERACTIVE: "interactive",
+    PRIORITY_DEFAULT: "default",
+    PRIORITY_BATCH: "batch",
+}
+
+RETRYABLE_STATUS_CODES = (429, 503)
+
+
+class GeminiOverloadedError(Exception):
+    """バルクヘッドが呼び出しを受け付けなかった（待ち行列が一杯・タイムアウト・クールダウン中）"""
+
+    def __init__(self, model: str, reason: str):
+        super().__init__(f"Gemini bulkhead rejected request for {model}: {reason}")
+        self.model = model
+        self.reason = reason
+
+
+class _Waiter:
+    """待ち行列のエントリ（スレッドの Event またはイベントループの Future）"""
+
+    def __init__(self, loop: Optional[asyncio.AbstractEventLoop] = None):
+        self.loop = loop
+        self.future = loop.create_future() if loop is not None else None
+        self.event = threading.Event() if loop is None else None
+        self.granted = False
+        self.abandoned = False
+
+    def wake(self):
+        if self.loop is not None:
+            self.loop.call_soon_threadsafe(self._resolve)
+        else:
+            self.event.set()
+
+    def _resolve(self):
+        if not self.future.done():
+            self.future.set_result(True)
+
+
+class ModelBulkhead:
+    """1モデル分のバルクヘッド（優先度付きセマフォ + 統計）"""
+
+    def __init__(self, model: str, max_concurrency: int, max_queue: int, queue_timeout: float):
+        self.model = model
+        self.max_concurrency = max_concurrency
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self.cooldown_until = 0.0
+
+        self._lock = threading.Lock()
+        self._in_flight = 0
+        self._waiters = []  # heap of (priority, seq, _Waiter)
+        self._queued = 0
+        self._seq = itertools.count()
+
+        # 統計
+        self.admitted = 0
+        self.rejected: Dict[str, int] = {"queue_full": 0, "timeout": 0, "cooldown": 0}
+        self.retries = 0
+        self.throttled = 0
+        self.max_queue_depth = 0
+        self._queue_waits = {name: deque(maxlen=500) for name in _PRIORITY_NAMES.values()}
+
+    # --- 枠の取得・解放 ---
+
+    def _try_enter(self, priority: int, waiter: _Waiter) -> bool:
+        """枠が空いていれば取得、空いていなければ待ち行列に追加（ロック内で呼ぶ）"""
+        if self._in_flight < self.max_concurrency and not self._queued:
+            self._in_flight += 1
+            return True
+        if self._queued >= self.max_queue:
+            self.rejected["queue_full"] += 1
+            raise GeminiOverloadedError(self.model, f"queue full ({self._queued} waiting)")
+        heapq.heappush(self._waiters, (priority, next(self._seq), waiter))
+        self._queued += 1
+        self.max_queue_depth = max(self.max_queue_depth, self._queued)
+        return False
+
+    def _abandon(self, waiter: _Waiter) -> bool:
+        """
+        待機をやめる（タイムアウト・キャンセル時）
+
+        Returns:
+            bool: 既に枠を譲り受けていた場合 True（呼び出し側で解放が必要）
+        """
+        with self._lock:
+            if waiter.granted:
+                return True
+            waiter.abandoned = True
+            self._queued -= 1
+            return False
+
+    def release(self):
+        """枠を解放し、最も優先度の高い待機者に譲る"""
+        with self._lock:
+            while self._waiters:
+                _, _, waiter = heapq.heappop(self._waiters)
+                if waiter.abandoned:
+                    continue
+                waiter.granted = True
+                self._queued -= 1
+                waiter.wake()
+                return
+            self._in_flight -= 1
+
+    def _check_cooldown(self, deadline: float) -> float:
+        """クールダウン中なら待機秒数を返す（待機期限を超える場合は拒否）"""
+        remaining = self.cooldown_until - time.monotonic()
+        if remaining <= 0:
+            return 0.0
+        if time.monotonic() + remaining > deadline:
+            with self._lock:
+                self.rejected["cooldown"] += 1
+            raise GeminiOverloadedError(self.model, f"cooling down after throttling ({remaining:.1f}s left)")
+        return remaining
+
+    def _record_wait(self, priority: int, started: float):
+        with self._lock:
+            self.admitted += 1
+            self._queue_waits[_PRIORITY_NAMES.get(priority, "default")].append(time.monotonic() - started)
+
+    def _timeout(self):
+        with self._lock:
+            self.rejected["timeout"] += 1
+        raise GeminiOverloadedError(self.model, f"queue wait exceeded {self.queue_timeout:.0f}s")
+
+    def acquire(self, priority: int = PRIORITY_DEFAULT):
+        """枠を取得（スレッドをブロック）"""
+        started = time.monotonic()
+        deadline = started + self.queue_timeout
+        cooldown = self._check_cooldown(deadline)
+        if cooldown:
+            time.sleep(cooldown)
+
+        waiter = _Waiter()
+        with self._lock:
+            entered = self._try_enter(priority, waiter)
+        if not entered and not waiter.event.wait(max(0.0, deadline - time.monotonic())):
+            if not self._abandon(waiter):
+                self._timeout()
+        self._record_wait(priority, started)
+
+    async def acquire_async(self, priority: int = PRIORITY_DEFAULT):
+        """枠を取得（イベントループをブロックしない）"""
+        started = time.monotonic()
+        deadline = started + self.queue_timeout
+        cooldown = self._check_cooldown(deadline)
+        if cooldown:
+            await asyncio.sleep(cooldown)
+
+        waiter = _Waiter(asyncio.get_running_loop())
+        with self._lock:
+            entered = self._try_enter(priority, waiter)
+        if not entered:
+            try:
+                await asyncio.wait_for(asyncio.shield(waiter.future), max(0.0, deadline - time.monotonic()))
+            except asyncio.TimeoutError:
+                if not self._abandon(waiter):
+                    self._timeout()
+            except asyncio.CancelledError:
+                if self._abandon(waiter):
+                    self.release()
+                raise
+        self._record_wait(priority, started)
+
+    # --- 429 / 503 ---
+
+    def note_throttled(self, retry_after: Optional[float]):
+        """上流から 429 / 503 を受けた（Retry-After があればその間は新規呼び出しを止める）"""
+        with self._lock:
+            self.throttled += 1
+            if retry_after:
+                self.cooldown_until = max(self.cooldown_until, time.monotonic() + retry_after)
+
+    def note_retry(self):
+        with self._lock:
+            self.retries += 1
+
+    def stats(self) -> Dict:
+        """統計を取得"""
+        with self._lock:
+            queue_wait_ms = {}
+            for name, waits in self._queue_waits.items():
+                if not waits:
+                    continue
+                ordered = sorted(waits)
+                queue_wait_ms[name] = {
+                    "count": len(ordered),
+                    "p50": round(ordered[len(ordered) // 2] * 1000, 1),
+                    "p95": round(ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))] * 1000, 1),
+                    "max": round(ordered[-1] * 1000, 1)
+                }
+            return {
+                "max_concurrency": self.max_concurrency,
+                "max_queue": self.max_queue,
+                "in_flight": self._in_flight,
+                "queued": self._queued,
+                "max_queue_depth": self.max_queue_depth,
+                "admitted": self.admitted,
+                "rejected": dict(self.rejected),
+                "throttled": self.throttled,
+                "retries": self.retries,
+                "cooldown_remaining_s": round(max(0.0, self.cooldown_until - time.monotonic()), 2),
+                "queue_wait_ms": queue_wait_ms
+            }
+
+
+class GeminiBulkhead:
+    """モデルごとのバルクヘッドと、429 / 503 の再試行を管理"""
+
+    def __init__(self):
+        self.max_concurrency = int(os.getenv('GEMINI_MAX_CONCURRENCY', '8'))
+        self.max_queue = int(os.getenv('GEMINI_MAX_QUEUE', '32'))
+        self.queue_timeout = float(os.getenv('GEMINI_QUEUE_TIMEOUT', '10'))
+        self.max_retries = int(os.getenv('GEMINI_MAX_RETRIES', '3'))
+        self.backoff_base = float(os.getenv('GEMINI_BACKOFF_BASE', '0.5'))
+        self.backoff_max = float(os.getenv('GEMINI_BACKOFF_MAX', '8'))
+        self.overrides = {}
+        for entry in os.getenv('GEMINI_MAX_CONCURRENCY_OVERRIDES', '').split(','):
+            if '=' in entry:
+                model, limit = entry.split('=', 1)
+                self.overrides[model.strip()] = int(limit)
+        self._models: Dict[str, ModelBulkhead] = {}
+        self._lock = threading.Lock()
+
+    def for_model(self, model: str) -> ModelBulkhead:
+        with self._lock:
+            bulkhead = self._models.get(model)
+            if bulkhead is None:
+                bulkhead = ModelBulkhead(
+                    model,
+                    self.overrides.get(model, self.max_concurrency),
+                    self.max_queue,
+                    self.queue_timeout
+                )
+                self._models[model] = bulkhead
+            return bulkhead
+
+    @staticmethod
+    def _retry_after(error: errors.APIError) -> Optional[float]:
+        response = getattr(error, "response", None)
+        headers = getattr(response, "headers", None)
+        if not headers:
+            return None
+        try:
+            return float(headers.get("retry-after"))
+        except (TypeError, ValueError):
+            return None
+
+    def _backoff(self, attempt: int, retry_after: Optional[float]) -> float:
+        # Full jitter: [0, min(max, base * 2^attempt)]、Retry-After があればそれ以上待つ
+        delay = random.uniform(0, min(self.backoff_max, self.backoff_base * (2 ** attempt)))
+        return max(delay, retry_after or 0.0)
+
+    def _should_retry(self, bulkhead: ModelBulkhead, error: Exception, attempt: int) -> Optional[float]:
+        """再試行する場合は待機秒数を返す"""
+        if not isinstance(error, errors.APIError) or error.code not in RETRYABLE_STATUS_CODES:
+            return None
+        retry_after = self._retry_after(error)
+        bulkhead.note_throttled(retry_after)
+        if attempt >= self.max_retries:
+            return None
+        bulkhead.note_retry()
+        delay = self._backoff(attempt, retry_after)
+        print(f"[GeminiBulkhead] {bulkhead.model} returned {error.code}, retrying in {delay:.2f}s (attempt {attempt + 1}/{self.max_retries})")
+        return delay
+
+    def call(self, model: str, func: Callable[[], Any], priority: int = PRIORITY_DEFAULT) -> Any:
+        """
+        バルクヘッド内で同期呼び出しを実行（429 / 503 は再試行）
+
+        Raises:
+            GeminiOverloadedError: 枠を取得できなかった場合
+        """
+        bulkhead = self.for_model(model)
+        attempt = 0
+        while True:
+            bulkhead.acquire(priority)
+            try:
+                return func()
+            except Exception as e:
+                delay = self._should_retry(bulkhead, e, attempt)
+                if delay is None:
+                    raise
+            finally:
+                bulkhead.release()
+            # バックオフ中は枠を解放しておく
+            time.sleep(delay)
+            attempt += 1
+
+    async def call_async(self, model: str, func: Callable[[], Any], priority: int = PRIORITY_DEFAULT) -> Any:
+        """
+        バルクヘッド内で非同期呼び出しを実行（func はコルーチンを返す関数）
+
+        Raises:
+            GeminiOverloadedError: 枠を取得できなかった場合
+        """
+        bulkhead = self.for_model(model)
+        attempt = 0
+        while True:
+            await bulkhead.acquire_async(priority)
+            try:
+                return await func()
+            except Exception as e:
+                delay = self._should_retry(bulkhead, e, attempt)
+                if delay is None:
+                    raise
+            finally:
+                bulkhead.release()
+            await asyncio.sleep(delay)
+            attempt += 1
+
+    def stats(self) -> Dict:
+        """全モデルの統計を取得"""
+        with self._lock:
+            models = list(self._models.values())
+        return {bulkhead.model: bulkhead.stats() for bulkhead in models}
+
+
+# グローバルインスタンス（シングルトンパターン）
+_gemini_bulkhead = None
+
+
+def get_gemini_bulkhead() -> GeminiBulkhead:
+    """
+    GeminiBulkheadのグローバルインスタンスを取得
+
+    Returns:
+        GeminiBulkhead: バルクヘッドインスタンス
+    """
+    global _gemini_bulkhead
+    if _gemini_bulkhead is None:
+        _gemini_bulkhead = GeminiBulkhead()
+    return _gemini_bulkhead
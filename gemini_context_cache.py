@@ -0,0 +1,226 @@
+"""
+Gemini Context Cache Registry
+
+prompts/*.txt の静的なプロンプト（指示文）を Gemini の Context Caching (cached content) に登録し、
+リクエストではプロンプト本文の代わりにハンドル（cachedContents/...）を参照します。
+
+- (モデル, プロンプト名, プロンプトのバージョン) ごとに1つのキャッシュを登録
+- TTL の期限が近づいたら（GEMINI_CONTEXT_CACHE_REFRESH_MARGIN 秒前）TTL を延長
+- 登録に失敗した場合（トークン数が最小値未満・権限なし等）はしばらく再試行せず、
+  呼び出し側はプロンプトをインラインで送信する（get_handle が None を返す）
+
+クライアントは client.caches / client.aio.caches（create, update）を持つオブジェクトであればよく、
+ローカルの擬似クライアントでもテストできます。
+
+環境変数:
+    GEMINI_CONTEXT_CACHE: "1" で有効化（デフォルト: 無効）
+    GEMINI_CONTEXT_CACHE_TTL: キャッシュの TTL（秒, デフォルト: 3600）
+    GEMINI_CONTEXT_CACHE_REFRESH_MARGIN: TTL 延長を行う残り秒数（デフォルト: 300）
+    GEMINI_CONTEXT_CACHE_RETRY_AFTER: 登録失敗後に再試行するまでの秒数（デフォルト: 600）
+"""
+
+import os
+import threading
+import time
+from typing import Dict, Optional, Tuple
+
+from google.genai import types
+
+from prompt_loader import get_prompt_loader
+
+
+def is_context_cache_enabled() -> bool:
+    """Context Caching が有効かどうか"""
+    return os.getenv('GEMINI_CONTEXT_CACHE', '0') == '1'
+
+
+class ContextCacheRegistry:
+    """静的プロンプトの cached content を管理するクラス"""
+
+    def __init__(
+        self,
+        client,
+        ttl_seconds: Optional[float] = None,
+        refresh_margin_seconds: Optional[float] = None,
+        retry_after_seconds: Optional[float] = None
+    ):
+        """
+        Initialize Context Cache Registry
+
+        Args:
+            client: genai.Client（または caches / aio.caches を持つ擬似クライアント）
+            ttl_seconds: キャッシュの TTL（秒）
+            refresh_margin_seconds: 期限の何秒前に TTL を延長するか
+            retry_after_seconds: 登録失敗後、再試行するまでの秒数
+        """
+        self.client = client
+        self.ttl_seconds = ttl_seconds if ttl_seconds is not None else float(os.getenv('GEMINI_CONTEXT_CACHE_TTL', '3600'))
+        self.refresh_margin_seconds = refresh_margin_seconds if refresh_margin_seconds is not None else float(os.getenv('GEMINI_CONTEXT_CACHE_REFRESH_MARGIN', '300'))
+        self.retry_after_seconds = retry_after_seconds if retry_after_seconds is not None else float(os.getenv('GEMINI_CONTEXT_CACHE_RETRY_AFTER', '600'))
+
+        self._lock = threading.Lock()
+        # key -> (cached content 名, 期限 (monotonic))
+        self._entries: Dict[Tuple[str, str, str], Tuple[str, float]] = {}
+        # key -> 再試行可能になる時刻 (monotonic)
+        self._failures: Dict[Tuple[str, str, str], float] = {}
+        # 登録・延長中のキー（同時に複数回登録しない）
+        self._pending = set()
+
+        self.hits = 0
+        self.fallbacks = 0
+        self.created = 0
+        self.refreshed = 0
+
+    @staticmethod
+    def _key(model: str, prompt_name: str) -> Tuple[str, str, str]:
+        return (model, prompt_name, get_prompt_loader().version(prompt_name))
+
+    def _create_config(self, prompt_name: str, version: str) -> types.CreateCachedContentConfig:
+        prompt = get_prompt_loader().load(prompt_name)
+        return types.CreateCachedContentConfig(
+            contents=[types.Content(role="user", parts=[types.Part.from_text(text=prompt)])],
+            ttl=f"{int(self.ttl_seconds)}s",
+            display_name=f"{prompt_name}-{version}"
+        )
+
+    def _update_config(self) -> types.UpdateCachedContentConfig:
+        return types.UpdateCachedContentConfig(ttl=f"{int(self.ttl_seconds)}s")
+
+    def _plan(self, key) -> Tuple[Optional[str], Optional[str]]:
+        """
+        ハンドルと必要な操作を決定（ロック内で呼ぶ）
+
+        Returns:
+            (現在使えるハンドル, 操作: None / "create" / "refresh")
+        """
+        now = time.monotonic()
+        entry = self._entries.get(key)
+        if entry is not None and entry[1] <= now:
+            self._entries.pop(key, None)
+            entry = None
+
+        handle = entry[0] if entry else None
+        if key in self._pending:
+            return handle, None
+        if entry is None:
+            if self._failures.get(key, 0.0) > now:
+                return None, None
+            self._pending.add(key)
+            return None, "create"
+        if entry[1] - now <= self.refresh_margin_seconds:
+            self._pending.add(key)
+            return handle, "refresh"
+        return handle, None
+
+    def _finish(self, key, name: Optional[str], action: str, error: Optional[Exception] = None):
+        with self._lock:
+            self._pending.discard(key)
+            if name is not None:
+                self._entries[key] = (name, time.monotonic() + self.ttl_seconds)
+                self._failures.pop(key, None)
+                if action == "create":
+                    self.created += 1
+                else:
+                    self.refreshed += 1
+            else:
+                self._entries.pop(key, None)
+                self._failures[key] = time.monotonic() + self.retry_after_seconds
+        if error is not None:
+            print(f"[ContextCache] Failed to {action} cache for {key[1]} ({key[0]}): {error}, using inline prompt")
+        elif name is not None:
+            verb = "Created" if action == "create" else "Refreshed"
+            print(f"[ContextCache] {verb} cache for {key[1]} ({key[0]}): {name}")
+
+    def _record(self, handle: Optional[str]) -> Optional[str]:
+        with self._lock:
+            if handle:
+                self.hits += 1
+            else:
+                self.fallbacks += 1
+        return handle
+
+    def get_handle(self, model: str, prompt_name: str) -> Optional[str]:
+        """
+        静的プロンプトの cached content 名を取得（必要なら登録・TTL 延長を行う）
+
+        Args:
+            model: モデル名
+            prompt_name: プロンプトファイル名（拡張子なし）
+
+        Returns:
+            str or None: cached content 名（使用できない場合は None = インラインで送信）
+        """
+        key = self._key(model, prompt_name)
+        with self._lock:
+            handle, action = self._plan(key)
+
+        if action == "create":
+            try:
+                cached = self.client.caches.create(model=model, config=self._create_config(prompt_name, key[2]))
+                self._finish(key, cached.name, action)
+                handle = cached.name
+            except Exception as e:
+                self._finish(key, None, action, e)
+        elif action == "refresh":
+            try:
+                self.client.caches.update(name=handle, config=self._update_config())
+                self._finish(key, handle, action)
+            except Exception as e:
+                self._finish(key, None, action, e)
+                handle = None
+
+        return self._record(handle)
+
+    async def get_handle_async(self, model: str, prompt_name: str) -> Optional[str]:
+        """
+        Async version of get_handle (client.aio.caches).
+        """
+        key = self._key(model, prompt_name)
+        with self._lock:
+            handle, action = self._plan(key)
+
+        if action == "create":
+            try:
+                cached = await self.client.aio.caches.create(model=model, config=self._create_config(prompt_name, key[2]))
+                self._finish(key, cached.name, action)
+                handle = cached.name
+            except Exception as e:
+                self._finish(key, None, action, e)
+        elif action == "refresh":
+            try:
+                await self.client.aio.caches.update(name=handle, config=self._update_config())
+                self._finish(key, handle, action)
+            except Exception as e:
+                self._finish(key, None, action, e)
+                handle = None
+
+        return self._record(handle)
+
+    def invalidate(self, model: str, prompt_name: str):
+        """
+        ハンドルを破棄（生成時にキャッシュが見つからないエラーを受けた場合など）
+        次回の get_handle で再登録します。
+        """
+        key = self._key(model, prompt_name)
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def stats(self) -> Dict:
+        """統計を取得"""
+        now = time.monotonic()
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "fallbacks": self.fallbacks,
+                "created": self.created,
+                "refreshed": self.refreshed,
+                "entries": {
+                    f"{model}/{prompt_name}": {"name": name, "expires_in_s": round(expires_at - now, 1)}
+                    for (model, prompt_name, _), (name, expires_at) in self._entries.items()
+                },
+                "unavailable": [
+                    f"{model}/{prompt_name}"
+                    for (model, prompt_name, _), retry_at in self._failures.items()
+                    if retry_at > now
+                ]
+            }
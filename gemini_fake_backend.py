@@ -0,0 +1,400 @@
+"""
+Fake Gemini Backend
+
+ネットワークなし・API キーなしでアプリ全体を負荷試験するための、genai.Client 互換の擬似バックエンドです。
+GEMINI_BACKEND=fake で get_gemini_service() がこのクライアントを使用します。
+
+GeminiService が使用するバックエンドのインターフェース（genai.Client のサブセット）:
+    client.models.generate_content(model, contents, config) -> GenerateContentResponse
+    client.models.generate_content_stream(...) -> Iterator[GenerateContentResponse]
+    client.aio.models.generate_content(...) / generate_content_stream(...)（async）
+    client.caches / client.aio.caches: create(model, config), update(name, config)
+    client.close() / client.aio.aclose()
+
+レスポンスは config.response_schema から生成するため、レビュー・タグ・アイテム・チャット回答・
+インサイトなど全てのプロンプトでスキーマに沿った JSON を返します。
+usage_metadata のトークン数（入力は contents から概算、画像は1枚 258 トークン）も付与します。
+
+同じ画像を繰り返し送る負荷試験では、画像解析キャッシュを無効化（GEMINI_IMAGE_CACHE_ENABLED=0）してください。
+
+環境変数:
+    GEMINI_BACKEND: "fake" で擬似バックエンドを使用（デフォルト: "genai"）
+    GEMINI_FAKE_LATENCY: レイテンシ分布（デフォルト: "lognormal:800:0.4"）
+        fixed:<ms> / uniform:<min_ms>:<max_ms> / normal:<mean_ms>:<stddev_ms> / lognormal:<median_ms>:<sigma>
+    GEMINI_FAKE_TTFT_RATIO: ストリーミング時、最初のチャンクまでの時間がレイテンシに占める割合（デフォルト: 0.3）
+    GEMINI_FAKE_ERROR_RATE: エラーを返す確率（0.0-1.0, デフォルト: 0.0）
+    GEMINI_FAKE_ERROR_CODES: 返すエラーのステータスコード（カンマ区切り, デフォルト: "429,503"）
+    GEMINI_FAKE_OUTPUT_TOKENS: 長文フィールド（コメント・回答・インサイト等）の出力トークン数（デフォルト: 200）
+    GEMINI_FAKE_MS_PER_OUTPUT_TOKEN: 出力トークン1つあたりに加算するレイテンシ（ミリ秒, デフォルト: 0）
+    GEMINI_FAKE_SEED: 乱数シード（指定すると再現可能）
+"""
+
+import asyncio
+import itertools
+import json
+import os
+import random
+import threading
+import time
+from typing import AsyncIterator, Dict, Iterator, List, Optional, Tuple
+
+from google.genai import errors, types
+
+
+# Gemini の画像1枚あたりの入力トークン数（258 トークン/タイル）
+IMAGE_TOKENS = 258
+
+# 長文として扱う文字列フィールド（GEMINI_FAKE_OUTPUT_TOKENS の長さで生成）
+LONG_TEXT_FIELDS = ("ai_review_comment", "answer", "insight", "recommend_reasons", "analysis")
+
+FAKE_TEXT = {
+    "ai_catchphrase": ["都会の風を纏う旅人", "休日のカフェに溶け込む詩人", "モノトーンの街を歩く哲学者"],
+    "category": ["Tシャツ", "シャツ", "デニムパンツ", "スニーカー", "ジャケット", "スカート"],
+    "color": ["白", "黒", "ネイビー", "ベージュ", "グレー"],
+    "tags": ["カジュアル", "都会の風を纏う旅人", "モノトーン", "リラックス", "デート", "白 Tシャツ", "黒 スキニーパンツ"],
+}
+
+FAKE_SENTENCES = [
+    "**シルエット** ゆったりとしたトップスに細身のボトムスを合わせ、メリハリのある印象です。",
+    "**色使い** ベーシックカラーでまとめ、小物で程よくアクセントを加えています。",
+    "**季節感** 軽やかな素材感が今の季節にぴったりです。",
+    "全体として清潔感があり、幅広いシーンで好印象を与えるコーディネートです。",
+]
+
+# 擬似エラーのステータス
+ERROR_STATUSES = {
+    400: "INVALID_ARGUMENT",
+    429: "RESOURCE_EXHAUSTED",
+    500: "INTERNAL",
+    503: "UNAVAILABLE",
+    504: "DEADLINE_EXCEEDED",
+}
+
+
+class LatencyDistribution:
+    """GEMINI_FAKE_LATENCY 形式のレイテンシ分布"""
+
+    def __init__(self, spec: str):
+        """
+        Args:
+            spec: "fixed:800" / "uniform:300:1500" / "normal:800:200" / "lognormal:800:0.4"
+        """
+        kind, *params = spec.split(":")
+        self.kind = kind
+        self.params = [float(p) for p in params]
+        expected = {"fixed": 1, "uniform": 2, "normal": 2, "lognormal": 2}
+        if kind not in expected or len(self.params) != expected[kind]:
+            raise ValueError(f"Invalid latency spec: {spec}")
+        self.spec = spec
+
+    def sample(self, rng: random.Random) -> float:
+        """レイテンシ（秒）をサンプリング"""
+        if self.kind == "fixed":
+            ms = self.params[0]
+        elif self.kind == "uniform":
+            ms = rng.uniform(*self.params)
+        elif self.kind == "normal":
+            ms = rng.gauss(*self.params)
+        else:
+            median, sigma = self.params
+            ms = median * rng.lognormvariate(0.0, sigma)
+        return max(ms, 0.0) / 1000
+
+
+class FakeGeminiEngine:
+    """擬似レスポンスの生成（レイテンシ・エラー・トークン数）を担当する共通部分"""
+
+    def __init__(
+        self,
+        latency: Optional[str] = None,
+        ttft_ratio: Optional[float] = None,
+        error_rate: Optional[float] = None,
+        error_codes: Optional[List[int]] = None,
+        output_tokens: Optional[int] = None,
+        seed: Optional[int] = None,
+        ms_per_output_token: Optional[float] = None
+    ):
+        """
+        Initialize Fake Gemini Engine
+
+        Args:
+            latency: レイテンシ分布（GEMINI_FAKE_LATENCY 形式）
+            ttft_ratio: ストリーミング時の最初のチャンクまでの割合
+            error_rate: エラーを返す確率
+            error_codes: 返すエラーのステータスコード
+            output_tokens: 長文フィールドの出力トークン数
+            seed: 乱数シード
+            ms_per_output_token: 出力トークン1つあたりの生成時間（ミリ秒）
+        """
+        self.latency = LatencyDistribution(latency or os.getenv('GEMINI_FAKE_LATENCY', 'lognormal:800:0.4'))
+        self.ttft_ratio = ttft_ratio if ttft_ratio is not None else float(os.getenv('GEMINI_FAKE_TTFT_RATIO', '0.3'))
+        self.error_rate = error_rate if error_rate is not None else float(os.getenv('GEMINI_FAKE_ERROR_RATE', '0.0'))
+        if error_codes is None:
+            error_codes = [int(code) for code in os.getenv('GEMINI_FAKE_ERROR_CODES', '429,503').split(",") if code.strip()]
+        self.error_codes = error_codes
+        self.output_tokens = output_tokens if output_tokens is not None else int(os.getenv('GEMINI_FAKE_OUTPUT_TOKENS', '200'))
+        self.ms_per_output_token = ms_per_output_token if ms_per_output_token is not None else float(os.getenv('GEMINI_FAKE_MS_PER_OUTPUT_TOKEN', '0'))
+        if seed is None and os.getenv('GEMINI_FAKE_SEED'):
+            seed = int(os.getenv('GEMINI_FAKE_SEED'))
+
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self._cache_ids = itertools.count(1)
+        self.requests = 0
+        self.errors = 0
+
+    def _choice(self, values: list):
+        with self._lock:
+            return self._rng.choice(values)
+
+    def sample_latency(self) -> float:
+        with self._lock:
+            return self.latency.sample(self._rng)
+
+    def maybe_fail(self, model: str):
+        """error_rate の確率で APIError を送出"""
+        with self._lock:
+            self.requests += 1
+            fail = self.error_codes and self._rng.random() < self.error_rate
+            if fail:
+                self.errors += 1
+                code = self._rng.choice(self.error_codes)
+        if not fail:
+            return
+        status = ERROR_STATUSES.get(code, "UNKNOWN")
+        response_json = {"error": {"code": code, "message": f"Fake {status} for {model}", "status": status}}
+        if code >= 500:
+            raise errors.ServerError(code, response_json)
+        raise errors.ClientError(code, response_json)
+
+    # ---- レスポンス本文 ----
+
+    def _long_text(self) -> str:
+        # 日本語はおおよそ 1 文字 = 1 トークン
+        text = ""
+        while len(text) < self.output_tokens:
+            text += self._choice(FAKE_SENTENCES)
+        return text[:self.output_tokens]
+
+    def _fake_string(self, field: Optional[str], schema: dict) -> str:
+        if schema.get("enum"):
+            return self._choice(schema["enum"])
+        if field in LONG_TEXT_FIELDS:
+            return self._long_text()
+        if field == "description":
+            return f"{self._choice(FAKE_TEXT['color'])} {self._choice(FAKE_TEXT['category'])}"
+        if field in FAKE_TEXT:
+            return self._choice(FAKE_TEXT[field])
+        return "サンプル"
+
+    def fake_value(self, schema: Optional[dict], field: Optional[str] = None):
+        """
+        response_schema（dict 形式の JSON スキーマ）に沿ったダミー値を生成
+
+        Args:
+            schema: JSON スキーマ
+            field: 親オブジェクトでのフィールド名（文字列の内容を決めるのに使用）
+        """
+        schema = schema or {"type": "object", "properties": {"text": {"type": "string"}}}
+        kind = str(schema.get("type", "string")).lower()
+        if kind == "object":
+            return {name: self.fake_value(prop, name) for name, prop in schema.get("properties", {}).items()}
+        if kind == "array":
+            if field == "tags":
+                return list(FAKE_TEXT["tags"])
+            if field == "item_types":
+                return ["トップス", "ボトムス", "シューズ"]
+            return [self.fake_value(schema.get("items"), field) for _ in range(3)]
+        if kind in ("integer", "number"):
+            return self._choice([1, 2, 3])
+        if kind == "boolean":
+            return True
+        return self._fake_string(field, schema)
+
+    @staticmethod
+    def _schema_of(config) -> Optional[dict]:
+        schema = getattr(config, "response_schema", None) if config is not None else None
+        if schema is None or isinstance(schema, dict):
+            return schema
+        # types.Schema 等で渡された場合
+        return schema.model_dump(exclude_none=True, mode="json") if hasattr(schema, "model_dump") else None
+
+    @staticmethod
+    def count_prompt_tokens(contents) -> int:
+        """contents の入力トークン数を概算（テキストは 2 文字 = 1 トークン, 画像は 258 トークン）"""
+        if contents is None:
+            return 0
+        if not isinstance(contents, list):
+            contents = [contents]
+        tokens = 0
+        for content in contents:
+            if isinstance(content, str):
+                tokens += max(1, len(content) // 2)
+            elif isinstance(content, types.Content):
+                tokens += FakeGeminiEngine.count_prompt_tokens(list(content.parts or []))
+            elif isinstance(content, types.Part):
+                if content.inline_data is not None:
+                    tokens += IMAGE_TOKENS
+                elif content.text:
+                    tokens += max(1, len(content.text) // 2)
+        return tokens
+
+    def build_text(self, config) -> str:
+        """レスポンス本文（response_mime_type が JSON ならスキーマに沿った JSON）"""
+        if config is not None and getattr(config, "response_mime_type", None) == "application/json":
+            return json.dumps(self.fake_value(self._schema_of(config)), ensure_ascii=False)
+        return self._long_text()
+
+    @staticmethod
+    def build_response(
+        text: Optional[str],
+        prompt_tokens: int,
+        output_tokens: int,
+        final: bool = True
+    ) -> types.GenerateContentResponse:
+        return types.GenerateContentResponse(
+            candidates=[types.Candidate(
+                content=types.Content(role="model", parts=[types.Part(text=text)]),
+                finish_reason=types.FinishReason.STOP if final else None
+            )],
+            usage_metadata=types.GenerateContentResponseUsageMetadata(
+                prompt_token_count=prompt_tokens,
+                candidates_token_count=output_tokens,
+                total_token_count=prompt_tokens + output_tokens
+            ) if final else None
+        )
+
+    def prepare(self, model: str, contents, config) -> Tuple[float, str, int]:
+        """
+        1リクエスト分の (レイテンシ秒, 本文, 入力トークン数) を決定（エラーの場合は送出）
+        """
+        self.maybe_fail(model)
+        text = self.build_text(config)
+        latency = self.sample_latency() + len(text) * self.ms_per_output_token / 1000
+        return latency, text, self.count_prompt_tokens(contents)
+
+    def stream_chunks(self, text: str, chunk_count: int = 8) -> List[str]:
+        """本文をストリーミング用のチャンクに分割"""
+        size = max(1, -(-len(text) // chunk_count))
+        return [text[i:i + size] for i in range(0, len(text), size)] or [""]
+
+    def create_cache(self, model: str, config) -> types.CachedContent:
+        return types.CachedContent(
+            name=f"cachedContents/fake-{next(self._cache_ids)}",
+            model=model,
+            display_name=getattr(config, "display_name", None)
+        )
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {
+                "latency": self.latency.spec,
+                "error_rate": self.error_rate,
+                "requests": self.requests,
+                "errors": self.errors
+            }
+
+
+class _FakeModels:
+    """client.models"""
+
+    def __init__(self, engine: FakeGeminiEngine):
+        self._engine = engine
+
+    def generate_content(self, *, model: str, contents, config=None) -> types.GenerateContentResponse:
+        latency, text, prompt_tokens = self._engine.prepare(model, contents, config)
+        time.sleep(latency)
+        return self._engine.build_response(text, prompt_tokens, len(text))
+
+    def generate_content_stream(self, *, model: str, contents, config=None) -> Iterator[types.GenerateContentResponse]:
+        latency, text, prompt_tokens = self._engine.prepare(model, contents, config)
+        chunks = self._engine.stream_chunks(text)
+        time.sleep(latency * self._engine.ttft_ratio)
+        for i, chunk in enumerate(chunks):
+            if i > 0:
+                time.sleep(latency * (1 - self._engine.ttft_ratio) / (len(chunks) - 1))
+            final = i == len(chunks) - 1
+            yield self._engine.build_response(chunk, prompt_tokens, len(text), final)
+
+
+class _FakeAsyncModels:
+    """client.aio.models"""
+
+    def __init__(self, engine: FakeGeminiEngine):
+        self._engine = engine
+
+    async def generate_content(self, *, model: str, contents, config=None) -> types.GenerateContentResponse:
+        latency, text, prompt_tokens = self._engine.prepare(model, contents, config)
+        await asyncio.sleep(latency)
+        return self._engine.build_response(text, prompt_tokens, len(text))
+
+    async def generate_content_stream(self, *, model: str, contents, config=None) -> AsyncIterator[types.GenerateContentResponse]:
+        latency, text, prompt_tokens = self._engine.prepare(model, contents, config)
+        return self._stream(latency, text, prompt_tokens)
+
+    async def _stream(self, latency: float, text: str, prompt_tokens: int) -> AsyncIterator[types.GenerateContentResponse]:
+        chunks = self._engine.stream_chunks(text)
+        await asyncio.sleep(latency * self._engine.ttft_ratio)
+        for i, chunk in enumerate(chunks):
+            if i > 0:
+                await asyncio.sleep(latency * (1 - self._engine.ttft_ratio) / (len(chunks) - 1))
+            final = i == len(chunks) - 1
+            yield self._engine.build_response(chunk, prompt_tokens, len(text), final)
+
+
+class _FakeCaches:
+    """client.caches（常に登録に成功する）"""
+
+    def __init__(self, engine: FakeGeminiEngine):
+        self._engine = engine
+
+    def create(self, *, model: str, config=None) -> types.CachedContent:
+        return self._engine.create_cache(model, config)
+
+    def update(self, *, name: str, config=None) -> types.CachedContent:
+        return types.CachedContent(name=name)
+
+
+class _FakeAsyncCaches(_FakeCaches):
+    """client.aio.caches"""
+
+    async def create(self, *, model: str, config=None) -> types.CachedContent:
+        return self._engine.create_cache(model, config)
+
+    async def update(self, *, name: str, config=None) -> types.CachedContent:
+        return types.CachedContent(name=name)
+
+
+class _FakeAsyncClient:
+    """client.aio"""
+
+    def __init__(self, engine: FakeGeminiEngine):
+        self.models = _FakeAsyncModels(engine)
+        self.caches = _FakeAsyncCaches(engine)
+
+    async def aclose(self):
+        pass
+
+
+class FakeGeminiClient:
+    """genai.Client 互換の擬似クライアント（ネットワークを使用しない）"""
+
+    def __init__(self, engine: Optional[FakeGeminiEngine] = None):
+        """
+        Args:
+            engine: 擬似レスポンスの設定（省略時は環境変数から作成）
+        """
+        self.engine = engine or FakeGeminiEngine()
+        self.models = _FakeModels(self.engine)
+        self.caches = _FakeCaches(self.engine)
+        self.aio = _FakeAsyncClient(self.engine)
+        print(f"[FakeGemini] Using fake backend (latency: {self.engine.latency.spec}, "
+              f"error_rate: {self.engine.error_rate}, output_tokens: {self.engine.output_tokens})")
+
+    def close(self):
+        pass
+
+
+def is_fake_backend() -> bool:
+    """GEMINI_BACKEND=fake が指定されているかどうか"""
+    return os.getenv('GEMINI_BACKEND', 'genai') == 'fake'
@@ -0,0 +1,255 @@
+"""
+Gemini Model Router
+
+レイテンシが重要な呼び出し（チャット・ファッションレビュー）のモデル選択を行うルーティングポリシーです。
+
+- ヘッジ: プライマリのモデルが閾値（GEMINI_HEDGE_DELAY_MS）までに応答しない場合、
+  セカンダリのモデルにも同じリクエストを送り、先に成功した方を採用して他方はキャンセルする
+  閾値を "auto" にすると、LLMMetrics の (メソッド, モデル) ごとの p95 を使う
+- 期限を考慮したダウングレード: thinking モデル（MODEL_THINKING_BUDGETS > 0）の想定レイテンシが
+  リクエストの残り時間を超える場合、non-thinking モデル（GEMINI_DOWNGRADE_MODEL）に切り替える
+- ヘッジの割合は GEMINI_HEDGE_BUDGET（ルーティング対象の呼び出しに対する比率）までに制限する
+  （起動直後でもヘッジできるよう、最低1件は許可する。plan の時点で枠を予約し、同時の plan で上限を超えない）
+
+ルーティングの判断は [GeminiRouter] のログと /health/gemini-routing（直近の判断と集計）で確認できます。
+ヘッジはキャンセル可能な非同期呼び出し（generate_json_async）のみが対象で、
+ストリーミングのチャットにはダウングレードのみを適用します。
+
+環境変数:
+    GEMINI_ROUTING: "1" で有効化（デフォルト: 無効）
+    GEMINI_ROUTING_METHODS: ルーティング対象のメソッド（カンマ区切り,
+        デフォルト: チャット / チャット（画像付き・ストリーミング）/ レビュー / タグ / アイテム抽出 / combined レビュー）
+    GEMINI_DEADLINE_MS: 1リクエストあたりの時間予算（デフォルト: 15000）
+    GEMINI_HEDGE_MODELS: プライマリ=セカンダリ の対応（カンマ区切り,
+        デフォルト: "gemini-2.5-flash-lite=gemini-2.5-flash,gemini-2.5-flash=gemini-2.5-flash-lite,
+                     gemini-3-pro-preview=gemini-2.5-flash"）
+    GEMINI_HEDGE_DELAY_MS: ヘッジを送るまでの時間（ミリ秒 または "auto", デフォルト: "auto"）
+    GEMINI_HEDGE_DEFAULT_DELAY_MS: "auto" でサンプルが足りない場合の時間（デフォルト: 3000）
+    GEMINI_HEDGE_BUDGET: ヘッジを送る呼び出しの割合の上限（デフォルト: 0.1）
+    GEMINI_DOWNGRADE_MODEL: ダウングレード先の non-thinking モデル（デフォルト: "gemini-2.5-flash-lite"）
+    GEMINI_THINKING_EXPECTED_MS: thinking モデルの想定レイテンシ（サンプルが足りない場合, デフォルト: 10000）
+"""
+
+import os
+import threading
+import time
+from collections import deque
+from typing import Dict, Optional
+
+from llm_metrics import get_llm_metrics
+
+DEFAULT_ROUTING_METHODS = (
+    "chat_coordinate_advice",
+    "chat_coordinate_advice_with_image",
+    "chat_coordinate_advice_stream",
+    "generate_review_parallel",
+    "generate_tags_parallel",
+    "extract_items_parallel",
+    "generate_fashion_review_combined",
+)
+
+DEFAULT_HEDGE_MODELS = "gemini-2.5-flash-lite=gemini-2.5-flash,gemini-2.5-flash=gemini-2.5-flash-lite,gemini-3-pro-preview=gemini-2.5-flash"
+
+
+def is_routing_enabled() -> bool:
+    """モデルルーティングが有効かどうか"""
+    return os.getenv('GEMINI_ROUTING', '0') == '1'
+
+
+def _parse_model_map(value: str) -> Dict[str, str]:
+    mapping = {}
+    for entry in value.split(","):
+        if "=" in entry:
+            primary, secondary = entry.split("=", 1)
+            mapping[primary.strip()] = secondary.strip()
+    return mapping
+
+
+class RoutePlan:
+    """1回の呼び出しのルーティング計画"""
+
+    def __init__(
+        self,
+        method: str,
+        requested_model: str,
+        model: str,
+        hedge_model: Optional[str] = None,
+        hedge_delay: Optional[float] = None,
+        remaining: Optional[float] = None
+    ):
+        """
+        Args:
+            method: メソッド名
+            requested_model: 呼び出し元が指定したモデル
+            model: 実際にプライマリとして使うモデル（ダウングレード後）
+            hedge_model: ヘッジ先のモデル（ヘッジしない場合は None）
+            hedge_delay: ヘッジを送るまでの秒数
+            remaining: 計画時点での残り時間（秒）
+        """
+        self.method = method
+        self.requested_model = requested_model
+        self.model = model
+        self.hedge_model = hedge_model
+        self.hedge_delay = hedge_delay
+        self.remaining = remaining
+
+    @property
+    def downgraded(self) -> bool:
+        return self.model != self.requested_model
+
+
+class GeminiRouter:
+    """ヘッジ・ダウングレードのルーティングポリシー（スレッドセーフ）"""
+
+    def __init__(self, thinking_budgets: Dict[str, int]):
+        """
+        Initialize Gemini Router
+
+        Args:
+            thinking_budgets: モデル名 -> thinking_budget（GeminiService.MODEL_THINKING_BUDGETS）
+        """
+        self.thinking_budgets = thinking_budgets
+        methods = os.getenv('GEMINI_ROUTING_METHODS')
+        self.methods = {m.strip() for m in methods.split(",") if m.strip()} if methods else set(DEFAULT_ROUTING_METHODS)
+        self.deadline_seconds = float(os.getenv('GEMINI_DEADLINE_MS', '15000')) / 1000
+        self.hedge_models = _parse_model_map(os.getenv('GEMINI_HEDGE_MODELS', DEFAULT_HEDGE_MODELS))
+        hedge_delay = os.getenv('GEMINI_HEDGE_DELAY_MS', 'auto')
+        self.hedge_delay_seconds = None if hedge_delay == 'auto' else float(hedge_delay) / 1000
+        self.default_hedge_delay_seconds = float(os.getenv('GEMINI_HEDGE_DEFAULT_DELAY_MS', '3000')) / 1000
+        self.hedge_budget = float(os.getenv('GEMINI_HEDGE_BUDGET', '0.1'))
+        self.downgrade_model = os.getenv('GEMINI_DOWNGRADE_MODEL', 'gemini-2.5-flash-lite')
+        self.thinking_expected_seconds = float(os.getenv('GEMINI_THINKING_EXPECTED_MS', '10000')) / 1000
+
+        self._lock = threading.Lock()
+        self.routed = 0
+        self.downgrades = 0
+        self.hedges = 0
+        self.hedge_wins = 0
+        self.hedges_skipped = 0
+        # plan で予約し、まだヘッジを送っていない（または送らずに終わる前の）枠の数
+        self.hedges_reserved = 0
+        # 直近のルーティング判断（チューニング用）
+        self._recent = deque(maxlen=50)
+
+    def is_routed(self, method: str) -> bool:
+        return method in self.methods
+
+    def new_deadline(self) -> float:
+        """リクエスト開始時に呼び出し、期限（time.monotonic 基準）を返す"""
+        return time.monotonic() + self.deadline_seconds
+
+    def thinking_budget(self, model: str) -> int:
+        return self.thinking_budgets.get(model, 0)
+
+    def _hedge_delay(self, method: str, model: str) -> float:
+        if self.hedge_delay_seconds is not None:
+            return self.hedge_delay_seconds
+        p95 = get_llm_metrics().latency_quantile(method, model, 0.95)
+        return p95 if p95 is not None else self.default_hedge_delay_seconds
+
+    def _expected_latency(self, method: str, model: str) -> float:
+        p95 = get_llm_metrics().latency_quantile(method, model, 0.95)
+        return p95 if p95 is not None else self.thinking_expected_seconds
+
+    def plan(self, method: str, model: str, deadline: Optional[float] = None, allow_hedge: bool = True) -> RoutePlan:
+        """
+        呼び出しのルーティングを決定
+
+        Args:
+            method: メソッド名（LLMMetrics のラベル）
+            model: 呼び出し元が指定したモデル
+            deadline: new_deadline() で作成した期限（None の場合は今から GEMINI_DEADLINE_MS）
+            allow_hedge: ヘッジを許可するか（ストリーミングでは False）
+
+        Returns:
+            RoutePlan: ルーティング計画
+        """
+        if deadline is None:
+            deadline = self.new_deadline()
+        remaining = deadline - time.monotonic()
+
+        # 期限を考慮したダウングレード: thinking モデルが残り時間内に終わりそうにない場合
+        primary = model
+        if self.thinking_budget(model) > 0 and self._expected_latency(method, model) > remaining:
+            primary = self.downgrade_model
+
+        hedge_model = self.hedge_models.get(primary) if allow_hedge else None
+        hedge_delay = None
+        with self._lock:
+            self.routed += 1
+            if primary != model:
+                self.downgrades += 1
+            if hedge_model is not None:
+                if self.hedges + self.hedges_reserved + 1 > max(1.0, self.hedge_budget * self.routed):
+                    # ヘッジの割合が上限を超える場合はヘッジしない
+                    hedge_model = None
+                    self.hedges_skipped += 1
+                else:
+                    # 枠を予約する（note_hedge_started で使用, release_hedge で解放）
+                    self.hedges_reserved += 1
+        if hedge_model is not None:
+            hedge_delay = min(self._hedge_delay(method, primary), max(remaining, 0.0))
+
+        if primary != model:
+            print(f"[GeminiRouter] {method}: downgraded {model} -> {primary} "
+                  f"(remaining {remaining * 1000:.0f}ms < expected {self._expected_latency(method, model) * 1000:.0f}ms)")
+        return RoutePlan(method, model, primary, hedge_model, hedge_delay, remaining)
+
+    def note_hedge_started(self, plan: RoutePlan):
+        """予約した枠でヘッジを送ったことを記録"""
+        with self._lock:
+            self.hedges_reserved -= 1
+            self.hedges += 1
+        print(f"[GeminiRouter] {plan.method}: {plan.model} slower than {plan.hedge_delay * 1000:.0f}ms, "
+              f"hedging with {plan.hedge_model}")
+
+    def release_hedge(self, plan: RoutePlan):
+        """予約した枠を使わずに終わった場合（ヘッジ前に応答・失敗・キャンセル）に解放"""
+        with self._lock:
+            self.hedges_reserved -= 1
+
+    def record(self, plan: RoutePlan, winner: Optional[str], hedged: bool, elapsed: float):
+        """
+        ルーティング結果を記録
+
+        Args:
+            plan: ルーティング計画
+            winner: 採用したレスポンスのモデル（両方失敗した場合は None）
+            hedged: ヘッジを送ったかどうか
+            elapsed: 呼び出し全体の秒数
+        """
+        hedge_won = hedged and winner == plan.hedge_model
+        with self._lock:
+            if hedge_won:
+                self.hedge_wins += 1
+            self._recent.append({
+                "method": plan.method,
+                "requested_model": plan.requested_model,
+                "model": plan.model,
+                "downgraded": plan.downgraded,
+                "hedge_model": plan.hedge_model if hedged else None,
+                "hedge_delay_ms": round(plan.hedge_delay * 1000, 1) if plan.hedge_delay is not None else None,
+                "winner": winner,
+                "elapsed_ms": round(elapsed * 1000, 1),
+                "remaining_ms": round(plan.remaining * 1000, 1) if plan.remaining is not None else None
+            })
+        if hedged:
+            print(f"[GeminiRouter] {plan.method}: winner {winner} in {elapsed * 1000:.0f}ms "
+                  f"(primary {plan.model}, hedge {plan.hedge_model})")
+
+    def stats(self) -> Dict:
+        """統計を取得"""
+        with self._lock:
+            return {
+                "methods": sorted(self.methods),
+                "deadline_ms": self.deadline_seconds * 1000,
+                "hedge_delay_ms": "auto" if self.hedge_delay_seconds is None else self.hedge_delay_seconds * 1000,
+                "hedge_models": dict(self.hedge_models),
+                "routed": self.routed,
+                "downgrades": self.downgrades,
+                "hedges": self.hedges,
+                "hedge_wins": self.hedge_wins,
+                "hedges_skipped": self.hedges_skipped,
+                "hedges_reserved": self.hedges_reserved,
+                "recent": list(self._recent)
+            }
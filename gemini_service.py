@@ -1,14 +1,177 @@
 import json
 import asyncio
 import os
-import base64
-from typing import List, Optional
-from io import BytesIO
-from PIL import Image
+import random
+import re
+import time
+from typing import AsyncIterator, List, Optional, Union
 from google import genai
-from google.genai import types
+from google.genai import errors, types
 from models import CoordinateItem
 from prompt_loader import get_prompt_loader
+from image_pipeline import PreparedImage, get_image_pipeline
+from image_response_cache import get_image_response_cache
+from recommend_reasons_cache import get_recommend_reasons_cache
+from gemini_bulkhead import PRIORITY_BATCH, PRIORITY_DEFAULT, PRIORITY_INTERACTIVE, get_gemini_bulkhead
+from gemini_context_cache import ContextCacheRegistry, is_context_cache_enabled
+from gemini_fake_backend import FakeGeminiClient, is_fake_backend
+from gemini_router import GeminiRouter, RoutePlan, is_routing_enabled
+from llm_metrics import get_llm_metrics
+
+
+# レスポンススキーマ（リクエストごとに組み立てずに共有）
+RECOMMEND_REASONS_SCHEMA = {"type": "object", "properties": {"recommend_reasons": {"type": "string"}}}
+
+CHAT_SCHEMA = {"type": "object", "properties": {"answer": {"type": "string"}}}
+
+REVIEW_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "ai_catchphrase": {"type": "string"},
+        "ai_review_comment": {"type": "string"}
+    },
+    "required": ["ai_catchphrase", "ai_review_comment"]
+}
+
+TAGS_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "tags": {"type": "array", "items": {"type": "string"}}
+    },
+    "required": ["tags"]
+}
+
+ITEMS_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "item_types": {
+            "type": "array",
+            "items": {"type": "string"}
+        },
+        "items": {
+            "type": "array",
+            "items": {
+                "type": "object",
+                "properties": {
+                    "item_type": {
+                        "type": "string",
+                        "enum": ["アウター", "トップス", "ボトムス", "シューズ", "アクセサリー"]
+                    },
+                    "category": {"type": "string"},
+                    "color": {"type": "string"},
+                    "description": {"type": "string"}
+                },
+                "required": ["item_type", "category", "color", "description"]
+            }
+        }
+    },
+    "required": ["items", "item_types"]
+}
+
+# combined モード: レビュー・タグ・アイテム抽出を1回の呼び出しで生成
+FASHION_REVIEW_SCHEMA = {
+    "type": "object",
+    "properties": {
+        **REVIEW_SCHEMA["properties"],
+        **TAGS_SCHEMA["properties"],
+        **ITEMS_SCHEMA["properties"]
+    },
+    "required": REVIEW_SCHEMA["required"] + TAGS_SCHEMA["required"] + ITEMS_SCHEMA["required"]
+}
+
+COORDINATE_ITEMS_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "items": {
+            "type": "array",
+            "items": {
+                "type": "object",
+                "properties": {
+                    "item_type": {
+                        "type": "string",
+                        "enum": ["アウター", "トップス", "ボトムス", "シューズ", "アクセサリー"]
+                    },
+                    "category": {"type": "string"},
+                    "color": {"type": "string"},
+                    "description": {
+                        "type": "string",
+                        "description": "色と種類からタグを生成してください。# は含めないでください。"
+                    }
+                },
+                "required": ["item_type", "category", "color", "description"]
+            }
+        }
+    },
+    "required": ["items"]
+}
+
+ANALYSIS_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "analysis": {"type": "string"}
+    }
+}
+
+# リクエスト dict 内で「contents の先頭が静的プロンプト（プロンプト名）」であることを示すキー
+# generate_json が取り除き、Context Caching が有効ならキャッシュのハンドルに置き換える
+STATIC_PROMPT_KEY = "static_prompt"
+
+# リクエスト dict 内でメトリクスのメソッド名（LLMMetrics のラベル）を指定するキー（省略時は静的プロンプト名）
+METHOD_KEY = "method"
+
+
+class JsonStringFieldStream:
+    """
+    ストリーミング中の JSON テキストから、指定した文字列フィールドの値を逐次取り出す
+
+    例: '{"answer": "こん' -> 'こん', 'にちは"}' -> 'にちは'
+    エスケープシーケンスがチャンク境界で分断されている場合は、次のチャンクが届くまで保留します。
+    """
+
+    def __init__(self, field: str):
+        self._start_pattern = re.compile(r'"' + re.escape(field) + r'"\s*:\s*"')
+        self._buffer = ""
+        self._pos = None  # 値の未出力部分の開始位置（フィールド発見前は None）
+        self.done = False
+
+    def feed(self, chunk: str) -> str:
+        """
+        チャンクを追加し、新たに確定した値の文字列を返す
+        """
+        self._buffer += chunk
+        if self.done:
+            return ""
+        if self._pos is None:
+            match = self._start_pattern.search(self._buffer)
+            if not match:
+                return ""
+            self._pos = match.end()
+
+        start = i = self._pos
+        end = len(self._buffer)
+        while i < end:
+            char = self._buffer[i]
+            if char == '"':
+                self.done = True
+                break
+            if char == '\\':
+                if i + 1 >= end:
+                    break
+                if self._buffer[i + 1] == 'u':
+                    # サロゲートペア（\ud83d\ude00）は2つ揃ってからデコード
+                    needed = 6
+                    if i + 6 <= end and 0xD800 <= int(self._buffer[i + 2:i + 6], 16) <= 0xDBFF:
+                        needed = 12
+                    if i + needed > end:
+                        break
+                    i += needed
+                    continue
+                i += 2
+                continue
+            i += 1
+
+        self._pos = i + 1 if self.done else i
+        return json.loads('"' + self._buffer[start:i] + '"')
 
 
 class GeminiService:
@@ -24,58 +187,425 @@ class GeminiService:
         "gemini-1.5-flash": 0,
     }
 
-    def __init__(self, api_key: Optional[str] = None):
-        # Try to get API key from environment variable if not provided
+    # cached content を参照したリクエストが失敗した場合にインラインで再実行するステータス
+    CONTEXT_CACHE_ERROR_CODES = (400, 403, 404)
+
+    # Gemini に送信する画像の縮小率
+    FASHION_REVIEW_IMAGE_SCALE = 0.3
+    IMAGE_SCALE = 0.5
+
+    # ファッションレビューの方式（GEMINI_REVIEW_MODE）
+    # parallel: レビュー・タグ・アイテム抽出を3並列で呼び出す / combined: 1回の呼び出しでまとめて生成
+    # ab: GEMINI_REVIEW_COMBINED_RATIO の割合で combined に振り分ける（ライブ A/B）
+    REVIEW_MODES = ("parallel", "combined", "ab")
+
+    def __init__(self, api_key: Optional[str] = None, client: Optional[genai.Client] = None):
+        """
+        Args:
+            api_key: Gemini API key (default: GOOGLE_GENAI_API_KEY)
+            client: Existing genai.Client to share (connection pools are reused across services),
+                    or a compatible backend such as FakeGeminiClient
+        """
+        if client is None and is_fake_backend():
+            client = FakeGeminiClient()
+        if client is None:
+            # Try to get API key from environment variable if not provided
+            api_key = api_key or os.getenv('GOOGLE_GENAI_API_KEY')
+            client = genai.Client(api_key=api_key) if api_key else genai.Client()
+        self.client = client
+
+        # 静的プロンプトの Context Caching（GEMINI_CONTEXT_CACHE=1 の場合のみ）
+        self.context_cache = ContextCacheRegistry(self.client) if is_context_cache_enabled() else None
+
+        # ヘッジ・ダウングレードのモデルルーティング（GEMINI_ROUTING=1 の場合のみ）
+        self.router = GeminiRouter(self.MODEL_THINKING_BUDGETS) if is_routing_enabled() else None
+
+    @staticmethod
+    def create_backend_client(api_key: Optional[str] = None):
+        """
+        Create the backend client selected by GEMINI_BACKEND.
+
+        環境変数:
+            GEMINI_BACKEND: "genai"（デフォルト, Gemini API）/ "fake"（ネットワークを使わない擬似バックエンド）
+
+        Returns:
+            genai.Client or FakeGeminiClient
+        """
+        if is_fake_backend():
+            return FakeGeminiClient()
+        return GeminiService.create_shared_client(api_key)
+
+    @staticmethod
+    def create_shared_client(api_key: Optional[str] = None) -> genai.Client:
+        """
+        Create a genai.Client with pooled, keep-alive HTTP transports for sharing within a worker.
+
+        環境変数:
+            GEMINI_HTTP2: "0" で HTTP/2 を無効化（デフォルト: 有効, h2 パッケージが必要）
+            GEMINI_MAX_CONNECTIONS: 最大接続数（デフォルト: 100）
+            GEMINI_MAX_KEEPALIVE_CONNECTIONS: keep-alive で保持する接続数（デフォルト: 20）
+            GEMINI_KEEPALIVE_EXPIRY: keep-alive 接続の保持秒数（デフォルト: 120）
+
+        Returns:
+            genai.Client: Shared client
+        """
+        import httpx
+
         api_key = api_key or os.getenv('GOOGLE_GENAI_API_KEY')
-        self.client = genai.Client(api_key=api_key) if api_key else genai.Client()
+
+        http2 = os.getenv('GEMINI_HTTP2', '1') != '0'
+        if http2:
+            try:
+                import h2  # noqa: F401
+            except ImportError:
+                print("[Gemini] h2 is not installed, falling back to HTTP/1.1")
+                http2 = False
+
+        limits = httpx.Limits(
+            max_connections=int(os.getenv('GEMINI_MAX_CONNECTIONS', '100')),
+            max_keepalive_connections=int(os.getenv('GEMINI_MAX_KEEPALIVE_CONNECTIONS', '20')),
+            keepalive_expiry=float(os.getenv('GEMINI_KEEPALIVE_EXPIRY', '120'))
+        )
+        http_options = types.HttpOptions(
+            httpx_client=httpx.Client(http2=http2, limits=limits),
+            httpx_async_client=httpx.AsyncClient(http2=http2, limits=limits)
+        )
+
+        print(f"[Gemini] Shared client created (http2: {http2}, max_connections: {limits.max_connections}, keepalive: {limits.max_keepalive_connections})")
+        if api_key:
+            return genai.Client(api_key=api_key, http_options=http_options)
+        return genai.Client(http_options=http_options)
+
+    async def aclose(self):
+        """Close the underlying HTTP transports (call on shutdown)."""
+        try:
+            await self.client.aio.aclose()
+        except Exception as e:
+            print(f"[Gemini] Error closing async client: {e}")
+        try:
+            self.client.close()
+        except Exception as e:
+            print(f"[Gemini] Error closing client: {e}")
 
     @staticmethod
-    def resize_image_base64(image_base64: str, scale: float = 0.5) -> str:
+    def prepare_image(image: Union[bytes, PreparedImage], scale: float = IMAGE_SCALE, cache_scope: Optional[str] = None) -> PreparedImage:
         """
-        Resize image to reduce processing time for Gemini API.
+        Decode and downscale the image once for Gemini (no base64 round trip).
 
         Args:
-            image_base64: Base64 encoded image
+            image: Raw image bytes, or an already prepared image (returned as is)
             scale: Scale factor (0.5 = half resolution)
+            cache_scope: Response cache scope (e.g. user_id); cached results are never shared across scopes
+
+        Returns:
+            PreparedImage: Gemini payload bytes and Storage upload bytes
+        """
+        if isinstance(image, PreparedImage):
+            return image
+        return get_image_pipeline().prepare(image, scale, cache_scope)
+
+    @staticmethod
+    def _image_part(image: PreparedImage) -> types.Part:
+        return types.Part.from_bytes(data=image.gemini_bytes, mime_type=image.mime_type)
+
+    @staticmethod
+    def _split_request_meta(request: dict) -> tuple:
+        """
+        Remove STATIC_PROMPT_KEY / METHOD_KEY from the request.
 
         Returns:
-            str: Resized image as base64
+            (request without the keys, static prompt name or None, method label for metrics)
         """
+        if STATIC_PROMPT_KEY not in request and METHOD_KEY not in request:
+            return request, None, "generate_json"
+        request = dict(request)
+        static_prompt = request.pop(STATIC_PROMPT_KEY, None)
+        method = request.pop(METHOD_KEY, None) or static_prompt or "generate_json"
+        return request, static_prompt, method
+
+    @staticmethod
+    def _with_cached_content(request: dict, handle: Optional[str]) -> dict:
+        """
+        Replace the leading static prompt part with a reference to its cached content.
+        """
+        if not handle:
+            return request
+        return {
+            **request,
+            "contents": request["contents"][1:],
+            "config": request["config"].model_copy(update={"cached_content": handle})
+        }
+
+    @staticmethod
+    def _observe(
+        method: str,
+        request: dict,
+        start_time: float,
+        attempts: int,
+        response=None,
+        error: Optional[Exception] = None,
+        usage=None
+    ):
+        """
+        Record one generate_content call (latency, tokens, retries, outcome) in LLMMetrics.
+
+        Args:
+            usage: usage_metadata when it is not on the response (e.g. collected from earlier stream chunks)
+        """
+        config = request.get("config")
+        finish_reason = None
+        if response is not None:
+            usage = usage or response.usage_metadata
+            if response.candidates:
+                reason = response.candidates[-1].finish_reason
+                finish_reason = getattr(reason, "value", reason)
+        get_llm_metrics().observe_call(
+            method,
+            request["model"],
+            time.perf_counter() - start_time,
+            outcome="ok" if error is None else type(error).__name__,
+            retries=max(attempts - 1, 0),
+            usage=usage,
+            max_output_tokens=getattr(config, "max_output_tokens", None),
+            finish_reason=finish_reason
+        )
+
+    @staticmethod
+    def _parse_json(method: str, model: str, response) -> dict:
         try:
-            # Decode base64 to image
-            image_data = base64.b64decode(image_base64)
-            image = Image.open(BytesIO(image_data))
+            return json.loads(response.text)
+        except (json.JSONDecodeError, TypeError):
+            get_llm_metrics().record_parse_failure(method, model)
+            raise
 
-            # Calculate new size
-            new_width = int(image.width * scale)
-            new_height = int(image.height * scale)
+    def generate_json(self, request: dict, priority: int = PRIORITY_DEFAULT) -> dict:
+        """
+        Call generate_content synchronously and parse the JSON response.
+        The call goes through the per-model bulkhead (concurrency limit, priority lanes, 429/503 backoff)
+        and is recorded in LLMMetrics under request[METHOD_KEY].
 
-            # Resize image with high quality
-            resized_image = image.resize((new_width, new_height), Image.Resampling.LANCZOS)
+        Args:
+            request: Keyword arguments for models.generate_content (model, contents, config)
+            priority: PRIORITY_INTERACTIVE / PRIORITY_DEFAULT / PRIORITY_BATCH
 
-            # Convert back to base64
-            buffer = BytesIO()
-            resized_image.save(buffer, format=image.format or 'JPEG', quality=85)
-            resized_base64 = base64.b64encode(buffer.getvalue()).decode('utf-8')
+        Returns:
+            dict: Parsed JSON response
 
-            print(f"[Image Resize] {image.width}x{image.height} -> {new_width}x{new_height}")
-            return resized_base64
+        Raises:
+            GeminiOverloadedError: The bulkhead rejected the call (queue full / timeout / cooling down)
+        """
+        request, static_prompt, method = self._split_request_meta(request)
+        start_time = time.perf_counter()
+        attempts = 0
+        handle = None
+        if self.context_cache is not None and static_prompt:
+            handle = self.context_cache.get_handle(request["model"], static_prompt)
+
+        def invoke(call_request: dict):
+            nonlocal attempts
+            attempts += 1
+            return self.client.models.generate_content(**call_request)
+
+        bulkhead = get_gemini_bulkhead()
+        try:
+            try:
+                cached_request = self._with_cached_content(request, handle)
+                response = bulkhead.call(request["model"], lambda: invoke(cached_request), priority)
+            except errors.APIError as e:
+                if handle is None or e.code not in self.CONTEXT_CACHE_ERROR_CODES:
+                    raise
+                # キャッシュが期限切れ・削除済みの場合はインラインのプロンプトで再実行
+                print(f"[ContextCache] Cached content {handle} rejected ({e.code}), retrying inline")
+                self.context_cache.invalidate(request["model"], static_prompt)
+                response = bulkhead.call(request["model"], lambda: invoke(request), priority)
         except Exception as e:
-            print(f"Error resizing image: {e}, using original")
-            return image_base64
-    
-    def generate_recommend_reasons(self, coordinates: List[CoordinateItem]) -> str:
+            self._observe(method, request, start_time, attempts, error=e)
+            raise
+        self._observe(method, request, start_time, attempts, response)
+        return self._parse_json(method, request["model"], response)
+
+    async def generate_json_async(
+        self,
+        request: dict,
+        priority: int = PRIORITY_DEFAULT,
+        deadline: Optional[float] = None
+    ) -> dict:
         """
-        Generate recommendation reasons based on coordinate reviews using Gemini API.
+        Async version of generate_json using the native async client (client.aio).
+
+        When model routing is enabled (GEMINI_ROUTING=1) and the method is routed, the call may be
+        downgraded to a non-thinking model near the deadline, or hedged to a secondary model.
 
         Args:
-            coordinates: List of CoordinateItem objects (expecting 3-4 items)
+            deadline: Request deadline from GeminiRouter.new_deadline() (default: now + GEMINI_DEADLINE_MS)
+        """
+        request, static_prompt, method = self._split_request_meta(request)
+        if self.router is None or not self.router.is_routed(method):
+            return await self._call_json_async(request, static_prompt, method, priority)
+
+        start_time = time.perf_counter()
+        plan = self.router.plan(method, request["model"], deadline)
+        if plan.downgraded:
+            request = self._for_model(request, plan.model)
+        if plan.hedge_model is None:
+            try:
+                result = await self._call_json_async(request, static_prompt, method, priority)
+            except Exception:
+                self.router.record(plan, None, False, time.perf_counter() - start_time)
+                raise
+            self.router.record(plan, plan.model, False, time.perf_counter() - start_time)
+            return result
+        return await self._hedged_json_async(plan, request, static_prompt, method, priority, start_time)
+
+    def _for_model(self, request: dict, model: str) -> dict:
+        """Copy the request for another model (thinking budget follows MODEL_THINKING_BUDGETS)."""
+        return {
+            **request,
+            "model": model,
+            "config": request["config"].model_copy(update={
+                "thinking_config": types.ThinkingConfig(thinking_budget=self.MODEL_THINKING_BUDGETS.get(model, 0), include_thoughts=False)
+            })
+        }
+
+    async def _hedged_json_async(self, plan: RoutePlan, request: dict, static_prompt: Optional[str], method: str, priority: int, start_time: float) -> dict:
+        """
+        Send the request to plan.model, and also to plan.hedge_model if it has not answered after plan.hedge_delay.
+        The first successful response wins and the other call is cancelled.
+        """
+        tasks = {asyncio.ensure_future(self._call_json_async(request, static_prompt, method, priority)): plan.model}
+        hedged = False
+        try:
+            done, _ = await asyncio.wait(tasks, timeout=plan.hedge_delay)
+            if not done:
+                hedged = True
+                self.router.note_hedge_started(plan)
+                hedge_request = self._for_model(request, plan.hedge_model)
+                tasks[asyncio.ensure_future(self._call_json_async(hedge_request, static_prompt, method, priority))] = plan.hedge_model
+
+            pending = set(tasks)
+            error = None
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        self.router.record(plan, tasks[task], hedged, time.perf_counter() - start_time)
+                        return task.result()
+                    error = error or task.exception()
+            self.router.record(plan, None, hedged, time.perf_counter() - start_time)
+            raise error
+        finally:
+            if not hedged:
+                self.router.release_hedge(plan)
+            for task in tasks:
+                if not task.done():
+                    task.cancel()
+
+    async def _call_json_async(self, request: dict, static_prompt: Optional[str], method: str, priority: int) -> dict:
+        """
+        One generate_content call (context cache, bulkhead, metrics) for a request without meta keys.
+        """
+        start_time = time.perf_counter()
+        attempts = 0
+        handle = None
+        if self.context_cache is not None and static_prompt:
+            handle = await self.context_cache.get_handle_async(request["model"], static_prompt)
+
+        def invoke(call_request: dict):
+            nonlocal attempts
+            attempts += 1
+            return self.client.aio.models.generate_content(**call_request)
+
+        bulkhead = get_gemini_bulkhead()
+        try:
+            try:
+                cached_request = self._with_cached_content(request, handle)
+                response = await bulkhead.call_async(request["model"], lambda: invoke(cached_request), priority)
+            except errors.APIError as e:
+                if handle is None or e.code not in self.CONTEXT_CACHE_ERROR_CODES:
+                    raise
+                print(f"[ContextCache] Cached content {handle} rejected ({e.code}), retrying inline")
+                self.context_cache.invalidate(request["model"], static_prompt)
+                response = await bulkhead.call_async(request["model"], lambda: invoke(request), priority)
+        except (Exception, asyncio.CancelledError) as e:
+            # ヘッジで負けてキャンセルされた呼び出しも記録する（p95 が速い側に偏らないように）
+            self._observe(method, request, start_time, attempts, error=e)
+            raise
+        self._observe(method, request, start_time, attempts, response)
+        return self._parse_json(method, request["model"], response)
+
+    @staticmethod
+    def _image_cache_namespace(prompt_name: str, image: PreparedImage, extra: tuple = ()) -> tuple:
+        # ユーザー（cache_scope）と色のシグネチャが一致するエントリのみ対象にする（dHash は明暗のみ）
+        return (prompt_name, get_prompt_loader().version(prompt_name), image.cache_scope, image.color_signature, extra)
+
+    def _generate_image_json(
+        self,
+        prompt_name: str,
+        image: PreparedImage,
+        request: dict,
+        extra: tuple = (),
+        priority: int = PRIORITY_DEFAULT
+    ) -> dict:
+        """
+        generate_json with the perceptual-hash response cache.
+        Duplicate images (same cache_scope and colors) skip the Gemini call; only successful responses are cached.
+
+        Args:
+            prompt_name: Prompt file used by the request (its version is part of the cache key)
+            image: Prepared image (perceptual_hash is the cache key)
+            request: Keyword arguments for models.generate_content
+            extra: Additional cache key parts (e.g. question for chat)
+            priority: Bulkhead priority lane
+        """
+        cache = get_image_response_cache()
+        namespace = self._image_cache_namespace(prompt_name, image, extra)
+        if cache is not None:
+            cached = cache.get(namespace, image.perceptual_hash)
+            if cached is not None:
+                print(f"[Gemini Cache] Hit for {prompt_name}")
+                get_llm_metrics().record_cache_hit(prompt_name, "image")
+                return cached
+
+        result = self.generate_json(request, priority)
+        if cache is not None:
+            cache.set(namespace, image.perceptual_hash, result)
+        return result
+
+    async def _generate_image_json_async(
+        self,
+        prompt_name: str,
+        image: PreparedImage,
+        request: dict,
+        extra: tuple = (),
+        priority: int = PRIORITY_DEFAULT,
+        deadline: Optional[float] = None
+    ) -> dict:
+        """
+        Async version of _generate_image_json.
+        """
+        cache = get_image_response_cache()
+        namespace = self._image_cache_namespace(prompt_name, image, extra)
+        if cache is not None:
+            cached = cache.get(namespace, image.perceptual_hash)
+            if cached is not None:
+                print(f"[Gemini Cache] Hit for {prompt_name}")
+                get_llm_metrics().record_cache_hit(prompt_name, "image")
+                return cached
+
+        result = await self.generate_json_async(request, priority, deadline)
+        if cache is not None:
+            cache.set(namespace, image.perceptual_hash, result)
+        return result
+
+    def _recommend_reasons_request(self, coordinates: List[CoordinateItem]) -> Optional[dict]:
+        """
+        Build the generate_content request for recommend reasons.
 
         Returns:
-            str: Recommendation reason text (up to 150 characters)
+            dict or None: Request kwargs, or None if there is nothing to summarize
         """
         if not coordinates or len(coordinates) < 2:
-            return ""
+            return None
 
         # Build coordinate reviews
         coordinate_reviews = []
@@ -89,301 +619,582 @@ class GeminiService:
             "generate_recommend_reasons",
             coordinate_reviews="\n".join(coordinate_reviews)
         )
-        
+
+        return {
+            "model": "gemini-2.5-flash-lite",  # Using newer model
+            METHOD_KEY: "generate_recommend_reasons",
+            "contents": prompt,
+            "config": types.GenerateContentConfig(
+                response_mime_type="application/json",
+                response_schema=RECOMMEND_REASONS_SCHEMA,
+                thinking_config=types.ThinkingConfig(thinking_budget=0, include_thoughts=False)
+            ),
+        }
+
+    def generate_recommend_reasons(self, coordinates: List[CoordinateItem]) -> str:
+        """
+        Generate recommendation reasons based on coordinate reviews using Gemini API.
+
+        Args:
+            coordinates: List of CoordinateItem objects (expecting 3-4 items)
+
+        Returns:
+            str: Recommendation reason text (up to 150 characters)
+        """
+        request = self._recommend_reasons_request(coordinates)
+        if request is None:
+            return ""
+
+        # 同じコーディネートの組み合わせは LLM を呼ばずにキャッシュから返す
+        cache = get_recommend_reasons_cache()
+        cached = cache.get(coordinates)
+        if cached is not None:
+            get_llm_metrics().record_cache_hit("generate_recommend_reasons", "recommend_reasons")
+            return cached
+
         try:
-            response = self.client.models.generate_content(
-                model="gemini-2.5-flash-lite",  # Using newer model
-                contents=prompt,
-                config=types.GenerateContentConfig(
-                    response_mime_type="application/json",
-                    response_schema={"type": "object", "properties": {"recommend_reasons": {"type": "string"}}},
-                    thinking_config=types.ThinkingConfig(thinking_budget=0, include_thoughts=False)
-                ),
-            )
-            
-            # Parse JSON response
-            result = json.loads(response.text)
-            return result.get("recommend_reasons", "")
+            result = self.generate_json(request)
+            recommend_reasons = result.get("recommend_reasons", "")
+            cache.set(coordinates, recommend_reasons)
+            return recommend_reasons
         except Exception as e:
             print(f"Error generating recommend reasons: {e}")
+            get_llm_metrics().record_fallback("generate_recommend_reasons", e)
             return ""
     
-    async def generate_recommend_reasons_async(self, coordinates: List[CoordinateItem]) -> str:
+    async def generate_recommend_reasons_async(self, coordinates: List[CoordinateItem], priority: int = PRIORITY_DEFAULT) -> str:
         """
         Async version of generate_recommend_reasons.
         """
-        # Run the synchronous method in an executor to avoid blocking
-        loop = asyncio.get_event_loop()
-        return await loop.run_in_executor(None, self.generate_recommend_reasons, coordinates)
+        request = self._recommend_reasons_request(coordinates)
+        if request is None:
+            return ""
+
+        cache = get_recommend_reasons_cache()
+        cached = cache.get(coordinates)
+        if cached is not None:
+            get_llm_metrics().record_cache_hit("generate_recommend_reasons", "recommend_reasons")
+            return cached
+
+        try:
+            result = await self.generate_json_async(request, priority)
+            recommend_reasons = result.get("recommend_reasons", "")
+            cache.set(coordinates, recommend_reasons)
+            return recommend_reasons
+        except Exception as e:
+            print(f"Error generating recommend reasons: {e}")
+            get_llm_metrics().record_fallback("generate_recommend_reasons", e)
+            return ""
     
-    def chat_coordinate_advice(self, question: str, gender: str, model: Optional[str] = None) -> str:
+    def _chat_request(self, question: str, gender: str, model: Optional[str] = None, image: Optional[PreparedImage] = None) -> dict:
         """
-        Generate coordinate advice based on user's question using Gemini API.
+        Build the generate_content request for chat advice (text only or with image).
 
         Args:
             question: User's question about fashion/coordination
             gender: Gender of the user (men/women/other)
+            model: Optional model name (default: gemini-2.5-flash-lite)
+            image: Optional prepared image
 
         Returns:
-            str: Fashion advice response
+            dict: Request kwargs for generate_content
         """
         gender_str = "メンズ" if gender == "men" else "レディース" if gender == "women" else "ユニセックス"
 
         # Load prompt from file
         prompt_loader = get_prompt_loader()
         prompt = prompt_loader.format(
-            "chat_coordinate_advice",
+            "chat_coordinate_advice_with_image" if image else "chat_coordinate_advice",
             gender_str=gender_str,
             question=question
         )
-        
-        try:
-            # Use provided model or default to gemini-2.5-flash-lite
-            model_name = model if model else "gemini-2.5-flash-lite"
-
-            # Get appropriate thinking_budget for the selected model
-            thinking_budget = self.MODEL_THINKING_BUDGETS.get(model_name, 0)
-            print(f"Using model: {model_name}, thinking_budget: {thinking_budget}")
-
-            response = self.client.models.generate_content(
-                model=model_name,
-                contents=prompt,
-                config=types.GenerateContentConfig(
-                    response_mime_type="application/json",
-                    response_schema={"type": "object", "properties": {"answer": {"type": "string"}}},
-                    temperature=0.7,
-                    max_output_tokens=3000,
-                    thinking_config=types.ThinkingConfig(thinking_budget=thinking_budget, include_thoughts=False)
-                ),
-            )
 
-            result = json.loads(response.text)
+        if image:
+            # Create content with text and resized image
+            contents = [types.Part.from_text(text=prompt), self._image_part(image)]
+        else:
+            contents = prompt
+
+        # Use provided model or default to gemini-2.5-flash-lite
+        model_name = model if model else "gemini-2.5-flash-lite"
+
+        # Get appropriate thinking_budget for the selected model
+        # Default to 0 for unknown models (non-thinking models)
+        thinking_budget = self.MODEL_THINKING_BUDGETS.get(model_name, 0)
+        print(f"Using model: {model_name}, thinking_budget: {thinking_budget}")
+
+        return {
+            "model": model_name,
+            METHOD_KEY: "chat_coordinate_advice_with_image" if image else "chat_coordinate_advice",
+            "contents": contents,
+            "config": types.GenerateContentConfig(
+                response_mime_type="application/json",
+                response_schema=CHAT_SCHEMA,
+                temperature=0.7,
+                max_output_tokens=3000,
+                thinking_config=types.ThinkingConfig(thinking_budget=thinking_budget, include_thoughts=False)
+            ),
+        }
+
+    def chat_coordinate_advice(self, question: str, gender: str, model: Optional[str] = None) -> str:
+        """
+        Generate coordinate advice based on user's question using Gemini API.
+
+        Args:
+            question: User's question about fashion/coordination
+            gender: Gender of the user (men/women/other)
+
+        Returns:
+            str: Fashion advice response
+        """
+        try:
+            result = self.generate_json(self._chat_request(question, gender, model), PRIORITY_INTERACTIVE)
             return result.get("answer", "申し訳ございません。回答を生成できませんでした。")
         except Exception as e:
             print(f"Error in chat_coordinate_advice: {e}")
+            get_llm_metrics().record_fallback("chat_coordinate_advice", e)
             return "申し訳ございません。エラーが発生しました。もう一度お試しください。"
     
-    def chat_coordinate_advice_with_image(self, question: str, gender: str, image_base64: str, model: Optional[str] = None) -> str:
+    def chat_coordinate_advice_with_image(self, question: str, gender: str, image_data: bytes, model: Optional[str] = None) -> str:
         """
         Generate coordinate advice based on user's question and image using Gemini API.
 
         Args:
             question: User's question about fashion/coordination
             gender: Gender of the user (men/women/other)
-            image_base64: Base64 encoded image data
+            image_data: Raw image bytes
 
         Returns:
             str: Fashion advice response
         """
-        gender_str = "メンズ" if gender == "men" else "レディース" if gender == "women" else "ユニセックス"
-
-        # Load prompt from file
-        prompt_loader = get_prompt_loader()
-        prompt = prompt_loader.format(
-            "chat_coordinate_advice_with_image",
-            gender_str=gender_str,
-            question=question
-        )
-        
         try:
             # Resize image to 1/2 resolution for faster processing
-            resized_image_base64 = self.resize_image_base64(image_base64, scale=0.5)
-
-            # Create content with text and resized image
-            content = [
-                {"text": prompt},
-                {"inline_data": {
-                    "mime_type": "image/jpeg",
-                    "data": resized_image_base64
-                }}
-            ]
-
-            # Use provided model or default to gemini-2.5-flash-lite
-            model_name = model if model else "gemini-2.5-flash-lite"
-
-            # Get appropriate thinking_budget for the selected model
-            # Default to 0 for unknown models (non-thinking models)
-            thinking_budget = self.MODEL_THINKING_BUDGETS.get(model_name, 0)
-            print(f"Using model: {model_name}, thinking_budget: {thinking_budget}")
-
-            response = self.client.models.generate_content(
-                model=model_name,
-                contents=content,
-                config=types.GenerateContentConfig(
-                    response_mime_type="application/json",
-                    response_schema={"type": "object", "properties": {"answer": {"type": "string"}}},
-                    temperature=0.7,
-                    max_output_tokens=3000,
-                    thinking_config=types.ThinkingConfig(thinking_budget=thinking_budget, include_thoughts=False)
-                ),
+            image = self.prepare_image(image_data, self.IMAGE_SCALE)
+
+            result = self._generate_image_json(
+                "chat_coordinate_advice_with_image",
+                image,
+                self._chat_request(question, gender, model, image),
+                extra=(question, gender, model),
+                priority=PRIORITY_INTERACTIVE
             )
-            
-            result = json.loads(response.text)
             return result.get("answer", "申し訳ございません。回答を生成できませんでした。")
         except Exception as e:
             print(f"Error in chat_coordinate_advice_with_image: {e}")
+            get_llm_metrics().record_fallback("chat_coordinate_advice_with_image", e)
             return "申し訳ございません。エラーが発生しました。もう一度お試しください。"
     
-    async def chat_coordinate_advice_async(self, question: str, gender: str, image_base64: Optional[str] = None, model: Optional[str] = None) -> str:
+    async def chat_coordinate_advice_async(self, question: str, gender: str, image_data: Optional[bytes] = None, model: Optional[str] = None) -> str:
         """
         Async version of chat_coordinate_advice with optional image support.
         """
-        loop = asyncio.get_event_loop()
-        if image_base64:
-            return await loop.run_in_executor(None, self.chat_coordinate_advice_with_image, question, gender, image_base64, model)
-        else:
-            return await loop.run_in_executor(None, self.chat_coordinate_advice, question, gender, model)
+        method = "chat_coordinate_advice_with_image" if image_data else "chat_coordinate_advice"
+        # 画像の前処理も含めたリクエスト全体の期限（モデルルーティング用）
+        deadline = self.router.new_deadline() if self.router is not None else None
+        try:
+            image = None
+            if image_data:
+                # Resize image off the event loop (CPU bound)
+                image = await asyncio.to_thread(self.prepare_image, image_data, self.IMAGE_SCALE)
+
+            request = self._chat_request(question, gender, model, image)
+            if image:
+                result = await self._generate_image_json_async(
+                    "chat_coordinate_advice_with_image", image, request,
+                    extra=(question, gender, model), priority=PRIORITY_INTERACTIVE, deadline=deadline
+                )
+            else:
+                result = await self.generate_json_async(request, PRIORITY_INTERACTIVE, deadline)
+            return result.get("answer", "申し訳ございません。回答を生成できませんでした。")
+        except Exception as e:
+            print(f"Error in {method}: {e}")
+            get_llm_metrics().record_fallback(method, e)
+            return "申し訳ございません。エラーが発生しました。もう一度お試しください。"
 
-    def _generate_review_parallel(self, resized_image_base64: str) -> dict:
+    async def chat_coordinate_advice_stream(
+        self,
+        question: str,
+        gender: str,
+        image_data: Optional[bytes] = None,
+        model: Optional[str] = None
+    ) -> AsyncIterator[dict]:
         """
-        並列処理用: レビューとキャッチフレーズを生成
+        Streaming version of chat_coordinate_advice_async (generate_content_stream).
 
-        Returns:
-            dict: {"ai_catchphrase": str, "ai_review_comment": str}
+        Yields events:
+            {"event": "delta", "data": {"text": str}}: answer text as it is generated
+            {"event": "done", "data": {"answer": str, "model": str, "cached": bool, "ttft_ms": float,
+                                       "elapsed_ms": float, "usage": dict}}
+            {"event": "error", "data": {"message": str}}
+
+        Closing the iterator (e.g. on client disconnect) cancels the upstream request.
+        """
+        start_time = time.perf_counter()
+        model_name = model if model else "gemini-2.5-flash-lite"
+        method = "chat_coordinate_advice_stream"
+        image = None
+        stream = None
+        bulkhead = None
+        request = None
+        plan = None
+        deadline = self.router.new_deadline() if self.router is not None else None
+        try:
+            if image_data:
+                image = await asyncio.to_thread(self.prepare_image, image_data, self.IMAGE_SCALE)
+
+            request, _, _ = self._split_request_meta(self._chat_request(question, gender, model, image))
+
+            # 同じ画像・質問の回答がキャッシュ済みならそのまま返す
+            cache = get_image_response_cache() if image else None
+            namespace = self._image_cache_namespace("chat_coordinate_advice_with_image", image, (question, gender, model)) if image else None
+            cached = cache.get(namespace, image.perceptual_hash) if cache is not None else None
+            if cached is not None:
+                get_llm_metrics().record_cache_hit(method, "image")
+                answer = cached.get("answer", "")
+                yield {"event": "delta", "data": {"text": answer}}
+                yield {"event": "done", "data": {
+                    "answer": answer,
+                    "model": model_name,
+                    "cached": True,
+                    "ttft_ms": round((time.perf_counter() - start_time) * 1000, 1),
+                    "elapsed_ms": round((time.perf_counter() - start_time) * 1000, 1),
+                    "usage": {}
+                }}
+                return
+
+            # ストリーミングはヘッジせず、期限を考慮したダウングレードのみ
+            if self.router is not None and self.router.is_routed(method):
+                plan = self.router.plan(method, model_name, deadline, allow_hedge=False)
+                if plan.downgraded:
+                    request = self._for_model(request, plan.model)
+                    model_name = plan.model
+
+            # ストリーム全体でバルクヘッドの枠を1つ使う
+            model_bulkhead = get_gemini_bulkhead().for_model(model_name)
+            await model_bulkhead.acquire_async(PRIORITY_INTERACTIVE)
+            bulkhead = model_bulkhead
+
+            parser = JsonStringFieldStream("answer")
+            raw_text = []
+            ttft_ms = None
+            usage = None
+            last_chunk = None
+            stream = await self.client.aio.models.generate_content_stream(**request)
+            async for chunk in stream:
+                last_chunk = chunk
+                if chunk.usage_metadata is not None:
+                    usage = chunk.usage_metadata
+                text = chunk.text or ""
+                raw_text.append(text)
+                delta = parser.feed(text)
+                if delta:
+                    if ttft_ms is None:
+                        ttft_ms = round((time.perf_counter() - start_time) * 1000, 1)
+                    yield {"event": "delta", "data": {"text": delta}}
+
+            full_text = "".join(raw_text)
+            try:
+                result = json.loads(full_text)
+                answer = result.get("answer", "")
+                if cache is not None and answer:
+                    cache.set(namespace, image.perceptual_hash, result)
+            except json.JSONDecodeError:
+                get_llm_metrics().record_parse_failure(method, model_name)
+                answer = full_text
+                if not parser.done:
+                    # JSON ではない回答の場合はテキストをそのまま送る
+                    yield {"event": "delta", "data": {"text": full_text}}
+
+            self._observe(method, request, start_time, 1, last_chunk, usage=usage)
+            if plan is not None:
+                self.router.record(plan, model_name, False, time.perf_counter() - start_time)
+            elapsed_ms = round((time.perf_counter() - start_time) * 1000, 1)
+            print(f"[Gemini Stream] Chat answer streamed (ttft: {ttft_ms}ms, total: {elapsed_ms}ms)")
+            yield {"event": "done", "data": {
+                "answer": answer,
+                "model": model_name,
+                "cached": False,
+                "ttft_ms": ttft_ms,
+                "elapsed_ms": elapsed_ms,
+                "usage": {
+                    "prompt_tokens": usage.prompt_token_count,
+                    "output_tokens": usage.candidates_token_count,
+                    "total_tokens": usage.total_token_count
+                } if usage is not None else {}
+            }}
+        except asyncio.CancelledError:
+            print("[Gemini Stream] Cancelled, closing upstream stream")
+            raise
+        except Exception as e:
+            print(f"Error in chat_coordinate_advice_stream: {e}")
+            if request is not None:
+                self._observe(method, request, start_time, 1, error=e)
+            get_llm_metrics().record_fallback(method, e)
+            yield {"event": "error", "data": {"message": "申し訳ございません。エラーが発生しました。もう一度お試しください。"}}
+        finally:
+            if stream is not None:
+                await stream.aclose()
+            if bulkhead is not None:
+                bulkhead.release()
+
+    def _review_request(self, image: PreparedImage) -> dict:
+        """
+        並列処理用: レビューとキャッチフレーズ生成のリクエストを構築
         """
         # Load prompt from file
         prompt_loader = get_prompt_loader()
         prompt = prompt_loader.load("generate_review_parallel")
 
+        return {
+            "model": "gemini-2.5-flash-lite",
+            STATIC_PROMPT_KEY: "generate_review_parallel",
+            "contents": [
+                types.Part.from_text(text=prompt),
+                self._image_part(image)
+            ],
+            "config": types.GenerateContentConfig(
+                response_mime_type="application/json",
+                response_schema=REVIEW_SCHEMA,
+                temperature=0.5,
+                max_output_tokens=500,
+                thinking_config=types.ThinkingConfig(thinking_budget=0, include_thoughts=False)
+            ),
+        }
+
+    def _tags_request(self, image: PreparedImage) -> dict:
+        """
+        並列処理用: タグ生成のリクエストを構築
+        """
+        # Load prompt from file
+        prompt_loader = get_prompt_loader()
+        prompt = prompt_loader.load("generate_tags_parallel")
+
+        return {
+            "model": "gemini-2.5-flash-lite",
+            STATIC_PROMPT_KEY: "generate_tags_parallel",
+            "contents": [
+                types.Part.from_text(text=prompt),
+                self._image_part(image)
+            ],
+            "config": types.GenerateContentConfig(
+                response_mime_type="application/json",
+                response_schema=TAGS_SCHEMA,
+                temperature=0.7,
+                max_output_tokens=300,
+                thinking_config=types.ThinkingConfig(thinking_budget=0, include_thoughts=False)
+            ),
+        }
+
+    def _items_request(self, image: PreparedImage) -> dict:
+        """
+        並列処理用: アイテム抽出のリクエストを構築
+        """
+        # Load prompt from file
+        prompt_loader = get_prompt_loader()
+        prompt = prompt_loader.load("extract_items_parallel")
+
+        return {
+            "model": "gemini-2.5-flash-lite",
+            STATIC_PROMPT_KEY: "extract_items_parallel",
+            "contents": [
+                types.Part.from_text(text=prompt),
+                self._image_part(image)
+            ],
+            "config": types.GenerateContentConfig(
+                response_mime_type="application/json",
+                response_schema=ITEMS_SCHEMA,
+                temperature=0.4,
+                max_output_tokens=700,
+                thinking_config=types.ThinkingConfig(thinking_budget=0, include_thoughts=False)
+            ),
+        }
+
+    @staticmethod
+    def _default_review() -> dict:
+        return {
+            "ai_catchphrase": "素敵なコーディネート",
+            "ai_review_comment": "バランスの取れた素敵なコーディネートです。"
+        }
+
+    @staticmethod
+    def _default_tags() -> dict:
+        return {"tags": ["カジュアル", "シンプル", "ベーシック", "ナチュラル", "デイリー", "トップス", "ボトムス"]}
+
+    @staticmethod
+    def _default_items() -> dict:
+        return {"items": [], "item_types": []}
+
+    def _generate_review_parallel(self, image: PreparedImage) -> dict:
+        """
+        並列処理用: レビューとキャッチフレーズを生成
+
+        Returns:
+            dict: {"ai_catchphrase": str, "ai_review_comment": str}
+        """
         try:
-            content = [
-                {"text": prompt},
-                {"inline_data": {"mime_type": "image/jpeg", "data": resized_image_base64}}
-            ]
-
-            response = self.client.models.generate_content(
-                model="gemini-2.5-flash-lite",
-                contents=content,
-                config=types.GenerateContentConfig(
-                    response_mime_type="application/json",
-                    response_schema={
-                        "type": "object",
-                        "properties": {
-                            "ai_catchphrase": {"type": "string"},
-                            "ai_review_comment": {"type": "string"}
-                        },
-                        "required": ["ai_catchphrase", "ai_review_comment"]
-                    },
-                    temperature=0.5,
-                    max_output_tokens=500,
-                    thinking_config=types.ThinkingConfig(thinking_budget=0, include_thoughts=False)
-                ),
-            )
+            return self._generate_image_json("generate_review_parallel", image, self._review_request(image))
+        except Exception as e:
+            print(f"[Parallel 1] Error generating review: {e}")
+            get_llm_metrics().record_fallback("generate_review_parallel", e)
+            return self._default_review()
 
-            return json.loads(response.text)
+    async def _generate_review_parallel_async(self, image: PreparedImage, deadline: Optional[float] = None) -> dict:
+        """
+        Async version of _generate_review_parallel.
+        """
+        try:
+            return await self._generate_image_json_async("generate_review_parallel", image, self._review_request(image), deadline=deadline)
         except Exception as e:
             print(f"[Parallel 1] Error generating review: {e}")
-            return {
-                "ai_catchphrase": "素敵なコーディネート",
-                "ai_review_comment": "バランスの取れた素敵なコーディネートです。"
-            }
+            get_llm_metrics().record_fallback("generate_review_parallel", e)
+            return self._default_review()
 
-    def _generate_tags_parallel(self, resized_image_base64: str) -> dict:
+    def _generate_tags_parallel(self, image: PreparedImage) -> dict:
         """
         並列処理用: タグを生成
 
         Returns:
             dict: {"tags": list}
         """
-        # Load prompt from file
-        prompt_loader = get_prompt_loader()
-        prompt = prompt_loader.load("generate_tags_parallel")
-
         try:
-            content = [
-                {"text": prompt},
-                {"inline_data": {"mime_type": "image/jpeg", "data": resized_image_base64}}
-            ]
-
-            response = self.client.models.generate_content(
-                model="gemini-2.5-flash-lite",
-                contents=content,
-                config=types.GenerateContentConfig(
-                    response_mime_type="application/json",
-                    response_schema={
-                        "type": "object",
-                        "properties": {
-                            "tags": {"type": "array", "items": {"type": "string"}}
-                        },
-                        "required": ["tags"]
-                    },
-                    temperature=0.7,
-                    max_output_tokens=300,
-                    thinking_config=types.ThinkingConfig(thinking_budget=0, include_thoughts=False)
-                ),
-            )
+            return self._generate_image_json("generate_tags_parallel", image, self._tags_request(image))
+        except Exception as e:
+            print(f"[Parallel 2] Error generating tags: {e}")
+            get_llm_metrics().record_fallback("generate_tags_parallel", e)
+            return self._default_tags()
 
-            return json.loads(response.text)
+    async def _generate_tags_parallel_async(self, image: PreparedImage, deadline: Optional[float] = None) -> dict:
+        """
+        Async version of _generate_tags_parallel.
+        """
+        try:
+            return await self._generate_image_json_async("generate_tags_parallel", image, self._tags_request(image), deadline=deadline)
         except Exception as e:
             print(f"[Parallel 2] Error generating tags: {e}")
-            return {"tags": ["カジュアル", "シンプル", "ベーシック", "ナチュラル", "デイリー", "トップス", "ボトムス"]}
+            get_llm_metrics().record_fallback("generate_tags_parallel", e)
+            return self._default_tags()
 
-    def _extract_items_parallel(self, resized_image_base64: str) -> dict:
+    def _extract_items_parallel(self, image: PreparedImage) -> dict:
         """
         並列処理用: アイテムを抽出
 
         Returns:
             dict: {"items": list, "item_types": list}
         """
+        try:
+            return self._generate_image_json("extract_items_parallel", image, self._items_request(image))
+        except Exception as e:
+            print(f"[Parallel 3] Error extracting items: {e}")
+            get_llm_metrics().record_fallback("extract_items_parallel", e)
+            return self._default_items()
+
+    async def _extract_items_parallel_async(self, image: PreparedImage, deadline: Optional[float] = None) -> dict:
+        """
+        Async version of _extract_items_parallel.
+        """
+        try:
+            return await self._generate_image_json_async("extract_items_parallel", image, self._items_request(image), deadline=deadline)
+        except Exception as e:
+            print(f"[Parallel 3] Error extracting items: {e}")
+            get_llm_metrics().record_fallback("extract_items_parallel", e)
+            return self._default_items()
+
+    def _fashion_review_request(self, image: PreparedImage) -> dict:
+        """
+        combined モード: レビュー・タグ・アイテム抽出をまとめて生成するリクエストを構築
+        （画像のアップロードは1回）
+        """
         # Load prompt from file
         prompt_loader = get_prompt_loader()
-        prompt = prompt_loader.load("extract_items_parallel")
+        prompt = prompt_loader.load("generate_fashion_review_combined")
+
+        return {
+            "model": "gemini-2.5-flash-lite",
+            STATIC_PROMPT_KEY: "generate_fashion_review_combined",
+            "contents": [
+                types.Part.from_text(text=prompt),
+                self._image_part(image)
+            ],
+            "config": types.GenerateContentConfig(
+                response_mime_type="application/json",
+                response_schema=FASHION_REVIEW_SCHEMA,
+                temperature=0.5,
+                max_output_tokens=1500,
+                thinking_config=types.ThinkingConfig(thinking_budget=0, include_thoughts=False)
+            ),
+        }
 
+    def _combined_review_result(self, result: dict) -> dict:
+        # 欠けているフィールドは parallel モードと同じデフォルト値で補う
+        review_result = result if result.get("ai_catchphrase") or result.get("ai_review_comment") else self._default_review()
+        tags_result = result if result.get("tags") else self._default_tags()
+        return self._merge_fashion_review(review_result, tags_result, result)
+
+    def _generate_fashion_review_combined(self, image: PreparedImage) -> dict:
+        """
+        combined モード: 1回の呼び出しでレビュー・タグ・アイテムを生成
+        """
         try:
-            content = [
-                {"text": prompt},
-                {"inline_data": {"mime_type": "image/jpeg", "data": resized_image_base64}}
-            ]
-
-            response = self.client.models.generate_content(
-                model="gemini-2.5-flash-lite",
-                contents=content,
-                config=types.GenerateContentConfig(
-                    response_mime_type="application/json",
-                    response_schema={
-                        "type": "object",
-                        "properties": {
-                            "item_types": {
-                                "type": "array",
-                                "items": {"type": "string"}
-                            },
-                            "items": {
-                                "type": "array",
-                                "items": {
-                                    "type": "object",
-                                    "properties": {
-                                        "item_type": {
-                                            "type": "string",
-                                            "enum": ["アウター", "トップス", "ボトムス", "シューズ", "アクセサリー"]
-                                        },
-                                        "category": {"type": "string"},
-                                        "color": {"type": "string"},
-                                        "description": {"type": "string"}
-                                    },
-                                    "required": ["item_type", "category", "color", "description"]
-                                }
-                            }
-                        },
-                        "required": ["items", "item_types"]
-                    },
-                    temperature=0.4,
-                    max_output_tokens=700,
-                    thinking_config=types.ThinkingConfig(thinking_budget=0, include_thoughts=False)
-                ),
-            )
+            result = self._generate_image_json("generate_fashion_review_combined", image, self._fashion_review_request(image))
+            return self._combined_review_result(result)
+        except Exception as e:
+            print(f"[Combined] Error generating fashion review: {e}")
+            get_llm_metrics().record_fallback("generate_fashion_review_combined", e)
+            return self._merge_fashion_review(self._default_review(), self._default_tags(), self._default_items())
 
-            return json.loads(response.text)
+    async def _generate_fashion_review_combined_async(self, image: PreparedImage, deadline: Optional[float] = None) -> dict:
+        """
+        Async version of _generate_fashion_review_combined.
+        """
+        try:
+            result = await self._generate_image_json_async(
+                "generate_fashion_review_combined", image, self._fashion_review_request(image), deadline=deadline
+            )
+            return self._combined_review_result(result)
         except Exception as e:
-            print(f"[Parallel 3] Error extracting items: {e}")
-            return {"items": [], "item_types": []}
+            print(f"[Combined] Error generating fashion review: {e}")
+            get_llm_metrics().record_fallback("generate_fashion_review_combined", e)
+            return self._merge_fashion_review(self._default_review(), self._default_tags(), self._default_items())
+
+    def review_mode(self, mode: Optional[str] = None) -> str:
+        """
+        ファッションレビューの方式を決定
 
-    def generate_fashion_review(self, image_base64: str) -> dict:
+        Args:
+            mode: 明示的に指定する方式（None の場合は GEMINI_REVIEW_MODE）
+
+        Returns:
+            str: "parallel" or "combined"（ab の場合はリクエストごとに振り分け）
+        """
+        mode = mode or os.getenv('GEMINI_REVIEW_MODE', 'parallel')
+        if mode not in self.REVIEW_MODES:
+            print(f"[Gemini] Unknown review mode {mode}, using parallel")
+            return "parallel"
+        if mode == "ab":
+            ratio = float(os.getenv('GEMINI_REVIEW_COMBINED_RATIO', '0.5'))
+            return "combined" if random.random() < ratio else "parallel"
+        return mode
+
+    @staticmethod
+    def _merge_fashion_review(review_result: dict, tags_result: dict, items_result: dict) -> dict:
+        return {
+            "ai_catchphrase": review_result.get("ai_catchphrase", ""),
+            "ai_review_comment": review_result.get("ai_review_comment", ""),
+            "tags": tags_result.get("tags", []),
+            "item_types": items_result.get("item_types", []),
+            "items": items_result.get("items", [])
+        }
+
+    def generate_fashion_review(self, image: Union[bytes, PreparedImage], mode: Optional[str] = None) -> dict:
         """
         Generate comprehensive fashion review and extract items from full-body image using Gemini API.
-        Uses parallel requests to improve response time.
+        Uses parallel requests to improve response time (parallel mode), or a single request with
+        the merged schema (combined mode).
 
         Args:
-            image_base64: Base64 encoded full-body image
+            image: Raw full-body image bytes, or an image prepared with
+                prepare_image(image_data, FASHION_REVIEW_IMAGE_SCALE)
+            mode: "parallel" / "combined" / "ab" (default: GEMINI_REVIEW_MODE)
 
         Returns:
             dict: {
@@ -394,53 +1205,103 @@ class GeminiService:
                 "items": list
             }
         """
-        import time
         start_time = time.time()
+        mode = self.review_mode(mode)
 
         # Resize image to 30% resolution for faster processing
-        resized_image_base64 = self.resize_image_base64(image_base64, scale=0.3)
+        image = self.prepare_image(image, self.FASHION_REVIEW_IMAGE_SCALE)
 
-        # Execute 3 parallel requests using ThreadPoolExecutor
-        from concurrent.futures import ThreadPoolExecutor
+        if mode == "combined":
+            result = self._generate_fashion_review_combined(image)
+        else:
+            # Execute 3 parallel requests using ThreadPoolExecutor
+            from concurrent.futures import ThreadPoolExecutor
 
-        with ThreadPoolExecutor(max_workers=3) as executor:
-            # Submit all 3 requests in parallel
-            future_review = executor.submit(self._generate_review_parallel, resized_image_base64)
-            future_tags = executor.submit(self._generate_tags_parallel, resized_image_base64)
-            future_items = executor.submit(self._extract_items_parallel, resized_image_base64)
+            with ThreadPoolExecutor(max_workers=3) as executor:
+                # Submit all 3 requests in parallel
+                future_review = executor.submit(self._generate_review_parallel, image)
+                future_tags = executor.submit(self._generate_tags_parallel, image)
+                future_items = executor.submit(self._extract_items_parallel, image)
 
-            # Wait for all results
-            review_result = future_review.result()
-            tags_result = future_tags.result()
-            items_result = future_items.result()
+                # Wait for all results
+                review_result = future_review.result()
+                tags_result = future_tags.result()
+                items_result = future_items.result()
 
-        # Merge results
-        result = {
-            "ai_catchphrase": review_result.get("ai_catchphrase", ""),
-            "ai_review_comment": review_result.get("ai_review_comment", ""),
-            "tags": tags_result.get("tags", []),
-            "item_types": items_result.get("item_types", []),
-            "items": items_result.get("items", [])
-        }
+            # Merge results
+            result = self._merge_fashion_review(review_result, tags_result, items_result)
 
         elapsed_time = time.time() - start_time
-        print(f"[Gemini Parallel] Fashion review completed in {elapsed_time:.2f}s with {len(result.get('items', []))} items")
+        get_llm_metrics().observe_operation("fashion_review", mode, elapsed_time)
+        print(f"[Gemini {mode.capitalize()}] Fashion review completed in {elapsed_time:.2f}s with {len(result.get('items', []))} items")
 
         return result
 
-    async def generate_fashion_review_async(self, image_base64: str) -> dict:
+    async def generate_fashion_review_async(self, image: Union[bytes, PreparedImage], mode: Optional[str] = None) -> dict:
         """
-        Async version of generate_fashion_review with parallel processing.
+        Async version of generate_fashion_review.
+        In parallel mode the 3 requests run concurrently on the native async client (asyncio.gather),
+        so no executor threads are held while waiting on HTTP.
         """
-        loop = asyncio.get_event_loop()
-        return await loop.run_in_executor(None, self.generate_fashion_review, image_base64)
+        start_time = time.time()
+        mode = self.review_mode(mode)
+        deadline = self.router.new_deadline() if self.router is not None else None
+
+        # Resize image to 30% resolution off the event loop (CPU bound)
+        image = await asyncio.to_thread(self.prepare_image, image, self.FASHION_REVIEW_IMAGE_SCALE)
+
+        if mode == "combined":
+            result = await self._generate_fashion_review_combined_async(image, deadline)
+        else:
+            review_result, tags_result, items_result = await asyncio.gather(
+                self._generate_review_parallel_async(image, deadline),
+                self._generate_tags_parallel_async(image, deadline),
+                self._extract_items_parallel_async(image, deadline)
+            )
+
+            # Merge results
+            result = self._merge_fashion_review(review_result, tags_result, items_result)
 
-    def extract_coordinate_items(self, image_base64: str) -> list:
+        elapsed_time = time.time() - start_time
+        get_llm_metrics().observe_operation("fashion_review", mode, elapsed_time)
+        print(f"[Gemini {mode.capitalize()}] Fashion review completed in {elapsed_time:.2f}s with {len(result.get('items', []))} items")
+
+        return result
+
+    def _extract_coordinate_items_request(self, image: PreparedImage) -> dict:
+        """
+        Build the generate_content request for coordinate item extraction.
+        """
+        # Load prompt from file
+        prompt_loader = get_prompt_loader()
+        prompt = prompt_loader.load("extract_coordinate_items")
+
+        return {
+            "model": "gemini-2.5-flash-lite",
+            STATIC_PROMPT_KEY: "extract_coordinate_items",
+            # Create content with text and resized image
+            "contents": [types.Part.from_text(text=prompt), self._image_part(image)],
+            "config": types.GenerateContentConfig(
+                temperature=0.4,
+                response_mime_type="application/json",
+                response_schema=COORDINATE_ITEMS_SCHEMA,
+                max_output_tokens=2000,
+                thinking_config=types.ThinkingConfig(thinking_budget=0, include_thoughts=False)
+            ),
+        }
+
+    @staticmethod
+    def _log_extracted_items(items: list):
+        print(f"[Gemini] Extracted {len(items)} items from coordinate image")
+        for item in items:
+            print(f"  - {item.get('item_type')}: {item.get('category')} ({item.get('color')})")
+
+    def extract_coordinate_items(self, image_data: bytes) -> list:
         """
         Extract items from coordinate image using Gemini API.
 
         Args:
-            image_base64: Base64 encoded full-body coordinate image
+            image_data: Raw full-body coordinate image bytes
 
         Returns:
             list: List of items with properties:
@@ -450,93 +1311,46 @@ class GeminiService:
                 - description: Generated tags based on color and type
         """
         # Resize image to 1/2 resolution for faster processing
-        resized_image_base64 = self.resize_image_base64(image_base64, scale=0.5)
-
-        # Response schema definition
-        response_schema = {
-            "type": "object",
-            "properties": {
-                "items": {
-                    "type": "array",
-                    "items": {
-                        "type": "object",
-                        "properties": {
-                            "item_type": {
-                                "type": "string",
-                                "enum": ["アウター", "トップス", "ボトムス", "シューズ", "アクセサリー"]
-                            },
-                            "category": {"type": "string"},
-                            "color": {"type": "string"},
-                            "description": {
-                                "type": "string",
-                                "description": "色と種類からタグを生成してください。# は含めないでください。"
-                            }
-                        },
-                        "required": ["item_type", "category", "color", "description"]
-                    }
-                }
-            },
-            "required": ["items"]
-        }
-
-        # Load prompt from file
-        prompt_loader = get_prompt_loader()
-        prompt = prompt_loader.load("extract_coordinate_items")
+        image = self.prepare_image(image_data, self.IMAGE_SCALE)
 
         try:
-            # Create content with text and resized image
-            content = [
-                {"text": prompt},
-                {"inline_data": {
-                    "mime_type": "image/jpeg",
-                    "data": resized_image_base64
-                }}
-            ]
-
-            response = self.client.models.generate_content(
-                model="gemini-2.5-flash-lite",
-                contents=content,
-                config=types.GenerateContentConfig(
-                    temperature=0.4,
-                    response_mime_type="application/json",
-                    response_schema=response_schema,
-                    max_output_tokens=2000,
-                    thinking_config=types.ThinkingConfig(thinking_budget=0, include_thoughts=False)
-                ),
-            )
-
-            result = json.loads(response.text)
+            result = self._generate_image_json("extract_coordinate_items", image, self._extract_coordinate_items_request(image))
             items = result.get("items", [])
-
-            print(f"[Gemini] Extracted {len(items)} items from coordinate image")
-            for item in items:
-                print(f"  - {item.get('item_type')}: {item.get('category')} ({item.get('color')})")
-
+            self._log_extracted_items(items)
             return items
 
         except Exception as e:
             print(f"Error in extract_coordinate_items: {e}")
+            get_llm_metrics().record_fallback("extract_coordinate_items", e)
             return []
 
-    async def extract_coordinate_items_async(self, image_base64: str) -> list:
+    async def extract_coordinate_items_async(self, image_data: bytes) -> list:
         """
         Async version of extract_coordinate_items.
         """
-        loop = asyncio.get_event_loop()
-        return await loop.run_in_executor(None, self.extract_coordinate_items, image_base64)
+        # Resize image off the event loop (CPU bound)
+        image = await asyncio.to_thread(self.prepare_image, image_data, self.IMAGE_SCALE)
 
-    def analyze_recent_coordinates(self, tags_list: List[List[str]]) -> str:
-        """
-        Analyze recent coordinate tags and generate a summary.
+        try:
+            result = await self._generate_image_json_async("extract_coordinate_items", image, self._extract_coordinate_items_request(image))
+            items = result.get("items", [])
+            self._log_extracted_items(items)
+            return items
 
-        Args:
-            tags_list: List of tag lists from recent coordinates (up to 3)
+        except Exception as e:
+            print(f"Error in extract_coordinate_items: {e}")
+            get_llm_metrics().record_fallback("extract_coordinate_items", e)
+            return []
+
+    def _analyze_recent_coordinates_request(self, tags_list: List[List[str]]) -> Optional[dict]:
+        """
+        Build the generate_content request for recent coordinate analysis.
 
         Returns:
-            str: Analysis summary (approximately 100 characters)
+            dict or None: Request kwargs, or None if there are no tags
         """
         if not tags_list or all(not tags for tags in tags_list):
-            return ""
+            return None
 
         # Flatten and deduplicate tags
         all_tags = []
@@ -544,7 +1358,7 @@ class GeminiService:
             all_tags.extend(tags)
 
         if not all_tags:
-            return ""
+            return None
 
         # Load prompt from file and format with tags
         prompt_loader = get_prompt_loader()
@@ -553,36 +1367,68 @@ class GeminiService:
             tags=', '.join(all_tags)
         )
 
-        try:
-            response = self.client.models.generate_content(
-                model="gemini-2.5-flash-lite",
-                contents=prompt,
-                config=types.GenerateContentConfig(
-                    response_mime_type="application/json",
-                    response_schema={
-                        "type": "object",
-                        "properties": {
-                            "analysis": {"type": "string"}
-                        }
-                    },
-                    temperature=0.7,
-                    max_output_tokens=500,
-                    thinking_config=types.ThinkingConfig(thinking_budget=0, include_thoughts=False)
-                ),
-            )
+        return {
+            "model": "gemini-2.5-flash-lite",
+            METHOD_KEY: "analyze_recent_coordinates",
+            "contents": prompt,
+            "config": types.GenerateContentConfig(
+                response_mime_type="application/json",
+                response_schema=ANALYSIS_SCHEMA,
+                temperature=0.7,
+                max_output_tokens=500,
+                thinking_config=types.ThinkingConfig(thinking_budget=0, include_thoughts=False)
+            ),
+        }
+
+    def analyze_recent_coordinates(self, tags_list: List[List[str]]) -> str:
+        """
+        Analyze recent coordinate tags and generate a summary.
 
-            result = json.loads(response.text)
+        Args:
+            tags_list: List of tag lists from recent coordinates (up to 3)
+
+        Returns:
+            str: Analysis summary (approximately 100 characters)
+        """
+        request = self._analyze_recent_coordinates_request(tags_list)
+        if request is None:
+            return ""
+
+        try:
+            result = self.generate_json(request, PRIORITY_BATCH)
             return result.get("analysis", "")
         except Exception as e:
             print(f"Error in analyze_recent_coordinates: {e}")
+            get_llm_metrics().record_fallback("analyze_recent_coordinates", e)
             return ""
 
     async def analyze_recent_coordinates_async(self, tags_list: List[List[str]]) -> str:
         """
         Async version of analyze_recent_coordinates.
         """
-        loop = asyncio.get_event_loop()
-        return await loop.run_in_executor(None, self.analyze_recent_coordinates, tags_list)
+        request = self._analyze_recent_coordinates_request(tags_list)
+        if request is None:
+            return ""
+
+        try:
+            result = await self.generate_json_async(request, PRIORITY_BATCH)
+            return result.get("analysis", "")
+        except Exception as e:
+            print(f"Error in analyze_recent_coordinates: {e}")
+            get_llm_metrics().record_fallback("analyze_recent_coordinates", e)
+            return ""
+
+    @staticmethod
+    def _test_gemini_request(prompt: str, model: str) -> dict:
+        return {
+            "model": model,
+            "contents": prompt,
+            "config": types.GenerateContentConfig(
+                temperature=0.7,
+                max_output_tokens=500,
+                thinking_config=types.ThinkingConfig(thinking_budget=0, include_thoughts=False)
+            ),
+        }
 
     def test_gemini(self, prompt: str, model: str = "gemini-3.1-flash-lite-preview") -> str:
         """
@@ -595,26 +1441,58 @@ class GeminiService:
         Returns:
             str: Gemini's response
         """
+        request = self._test_gemini_request(prompt, model)
+        start_time = time.perf_counter()
         try:
-            response = self.client.models.generate_content(
-                model=model,
-                contents=prompt,
-                config=types.GenerateContentConfig(
-                    temperature=0.7,
-                    max_output_tokens=500,
-                    thinking_config=types.ThinkingConfig(thinking_budget=0, include_thoughts=False)
-                ),
-            )
-
+            response = get_gemini_bulkhead().call(model, lambda: self.client.models.generate_content(**request))
+            self._observe("test_gemini", request, start_time, 1, response)
             return response.text
 
         except Exception as e:
             print(f"Error in test_gemini: {e}")
+            get_llm_metrics().record_fallback("test_gemini", e)
             return f"エラーが発生しました: {str(e)}"
 
     async def test_gemini_async(self, prompt: str, model: str = "gemini-3.1-flash-lite-preview") -> str:
         """
         Async version of test_gemini.
         """
-        loop = asyncio.get_event_loop()
-        return await loop.run_in_executor(None, self.test_gemini, prompt, model)
+        request = self._test_gemini_request(prompt, model)
+        start_time = time.perf_counter()
+        try:
+            response = await get_gemini_bulkhead().call_async(model, lambda: self.client.aio.models.generate_content(**request))
+            self._observe("test_gemini", request, start_time, 1, response)
+            return response.text
+
+        except Exception as e:
+            print(f"Error in test_gemini: {e}")
+            get_llm_metrics().record_fallback("test_gemini", e)
+            return f"エラーが発生しました: {str(e)}"
+
+
+# グローバルインスタンス（ワーカープロセスごとに1つ）
+_gemini_service = None
+
+
+def get_gemini_service() -> GeminiService:
+    """
+    ワーカー内で共有する GeminiService を取得
+
+    genai.Client（とその HTTP コネクションプール）をリクエスト間・サービス間で再利用するため、
+    リクエストごとに GeminiService() を生成せずにこちらを使用してください。
+
+    Returns:
+        GeminiService: 共有インスタンス
+    """
+    global _gemini_service
+    if _gemini_service is None:
+        _gemini_service = GeminiService(client=GeminiService.create_backend_client())
+    return _gemini_service
+
+
+async def close_gemini_service():
+    """共有 GeminiService の HTTP トランスポートを閉じる（シャットダウン時）"""
+    global _gemini_service
+    if _gemini_service is not None:
+        await _gemini_service.aclose()
+        _gemini_service = None
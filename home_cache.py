@@ -0,0 +1,366 @@
+"""
+Home Cache
+
+/api/home のペイロード（最近のコーディネート7件とタグ）をユーザーごとにキャッシュします。
+AsyncFirebaseRepository.get_home_data は最大4回のクエリで30件のドキュメントを読み込むため、
+ホーム画面の表示ではキャッシュを優先し、書き込み時に無効化します（write-through invalidation）。
+
+- ローカル層: プロセス内の LRU（TTL 付き）
+- 共有層: HOME_CACHE_BACKEND で選択するバックエンド（インスタンス間で共有, 任意）
+  register_home_cache_backend() で独自のバックエンドを追加できます
+
+無効化: FirebaseService の save_coordinate / delete_coordinate / アイテム登録（save_user_item,
+save_user_closet_item, register_items_batch）が書き込み後に invalidate(user_id) を呼び出します。
+読み込み中に無効化された場合、その読み込み結果は保存しません（古いデータの再キャッシュを防ぐ）。
+
+共有層がある場合、無効化はユーザーごとのバージョン（共有層のカウンター）を増やして行います。
+ペイロードはバージョンごとに保存され、ローカル層も返す前に現在のバージョンと比較するため、
+他のインスタンス（uvicorn の他のワーカー）で行われた書き込みもすぐに反映されます。
+共有層に接続できない間はバージョンを確認できないため、ローカル層の有効期間を
+HOME_CACHE_LOCAL_TTL_WITH_BACKEND 秒に短縮しています。
+共有層がない場合（単一プロセス）は、ローカル層のみで HOME_CACHE_TTL まで保持します。
+
+環境変数:
+    HOME_CACHE_ENABLED: "0" で無効化（デフォルト: 有効）
+    HOME_CACHE_TTL: ローカル層の有効期間（秒, デフォルト: 60）
+    HOME_CACHE_LOCAL_TTL_WITH_BACKEND: 共有層があるときのローカル層の有効期間の上限（秒, デフォルト: 5）
+    HOME_CACHE_MAX_ENTRIES: ローカル層の最大エントリ数（デフォルト: 10000）
+    HOME_CACHE_BACKEND: 共有層のバックエンド（"redis" など, デフォルト: なし）
+    HOME_CACHE_SHARED_TTL: 共有層の有効期間（秒, デフォルト: 600）
+    HOME_CACHE_REDIS_URL: HOME_CACHE_BACKEND=redis の接続先（デフォルト: "redis://localhost:6379/0"）
+"""
+
+import asyncio
+import copy
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+
+
+class HomeCacheBackend:
+    """
+    共有層のバックエンドのインターフェース
+
+    ペイロードは (user_id, version) ごとに保存します。無効化は bump_version でバージョンを増やすだけで、
+    古いバージョンのペイロードは TTL で消えます（読み込み中の古い結果が新しいバージョンに保存されない）。
+    """
+
+    def get(self, user_id: str, version: int) -> Optional[Dict[str, Any]]:
+        raise NotImplementedError
+
+    def set(self, user_id: str, version: int, payload: Dict[str, Any], ttl_seconds: float):
+        raise NotImplementedError
+
+    def get_version(self, user_id: str) -> int:
+        """ユーザーの現在のバージョン（無効化されたことがなければ 0）"""
+        raise NotImplementedError
+
+    def bump_version(self, user_id: str):
+        """ユーザーのバージョンを増やす（全インスタンスのキャッシュを無効化する）"""
+        raise NotImplementedError
+
+
+class RedisHomeCacheBackend(HomeCacheBackend):
+    """Redis を共有層に使うバックエンド（redis パッケージが必要）"""
+
+    KEY_PREFIX = "home:"
+    VERSION_KEY_PREFIX = "home-version:"
+
+    def __init__(self, url: Optional[str] = None):
+        """
+        Initialize Redis Home Cache Backend
+
+        Args:
+            url: 接続先（None の場合は HOME_CACHE_REDIS_URL）
+        """
+        import redis
+
+        self.url = url or os.getenv('HOME_CACHE_REDIS_URL', 'redis://localhost:6379/0')
+        # ホーム画面の表示を遅らせないよう、短いタイムアウトで Firestore にフォールバックする
+        self._client = redis.Redis.from_url(self.url, socket_timeout=0.2, socket_connect_timeout=0.2)
+
+    def get(self, user_id: str, version: int) -> Optional[Dict[str, Any]]:
+        value = self._client.get(f"{self.KEY_PREFIX}{user_id}:{version}")
+        return json.loads(value) if value else None
+
+    def set(self, user_id: str, version: int, payload: Dict[str, Any], ttl_seconds: float):
+        self._client.set(f"{self.KEY_PREFIX}{user_id}:{version}", json.dumps(payload, ensure_ascii=False), ex=max(int(ttl_seconds), 1))
+
+    def get_version(self, user_id: str) -> int:
+        value = self._client.get(self.VERSION_KEY_PREFIX + user_id)
+        return int(value) if value else 0
+
+    def bump_version(self, user_id: str):
+        # バージョンのキーには TTL を付けない（期限切れで 0 に戻ると古いペイロードが有効になるため）
+        self._client.incr(self.VERSION_KEY_PREFIX + user_id)
+
+
+# HOME_CACHE_BACKEND の名前 -> バックエンドのファクトリ
+_BACKENDS: Dict[str, Callable[[], HomeCacheBackend]] = {
+    "redis": RedisHomeCacheBackend,
+}
+
+
+def register_home_cache_backend(name: str, factory: Callable[[], HomeCacheBackend]):
+    """
+    共有層のバックエンドを登録
+
+    Args:
+        name: HOME_CACHE_BACKEND に指定する名前
+        factory: バックエンドを作成する関数
+    """
+    _BACKENDS[name] = factory
+
+
+class HomeCache:
+    """ユーザーごとのホーム画面ペイロードのキャッシュ（ローカル LRU + 共有層, スレッドセーフ）"""
+
+    def __init__(
+        self,
+        ttl_seconds: Optional[float] = None,
+        max_entries: Optional[int] = None,
+        backend: Optional[HomeCacheBackend] = None,
+        shared_ttl_seconds: Optional[float] = None,
+        local_ttl_with_backend: Optional[float] = None
+    ):
+        """
+        Initialize Home Cache
+
+        Args:
+            ttl_seconds: ローカル層の有効期間（秒）
+            max_entries: ローカル層の最大エントリ数
+            backend: 共有層のバックエンド（None の場合はローカル層のみ）
+            shared_ttl_seconds: 共有層の有効期間（秒）
+            local_ttl_with_backend: 共有層があるときのローカル層の有効期間の上限（秒）
+        """
+        self.ttl_seconds = ttl_seconds if ttl_seconds is not None else float(os.getenv('HOME_CACHE_TTL', '60'))
+        if backend is not None:
+            if local_ttl_with_backend is None:
+                local_ttl_with_backend = float(os.getenv('HOME_CACHE_LOCAL_TTL_WITH_BACKEND', '5'))
+            self.ttl_seconds = min(self.ttl_seconds, local_ttl_with_backend)
+        self.max_entries = max_entries if max_entries is not None else int(os.getenv('HOME_CACHE_MAX_ENTRIES', '10000'))
+        self.backend = backend
+        self.shared_ttl_seconds = shared_ttl_seconds if shared_ttl_seconds is not None else float(os.getenv('HOME_CACHE_SHARED_TTL', '600'))
+        self._lock = threading.Lock()
+        # user_id -> (保存時刻, 共有層のバージョン, ペイロード)
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        # user_id -> 読み込み中のトークン（invalidate で破棄され、破棄されたトークンの結果は保存しない）
+        self._loading: Dict[str, set] = {}
+        self.local_hits = 0
+        self.shared_hits = 0
+        self.misses = 0
+        self.invalidations = 0
+        self.stale_loads = 0
+        self.backend_errors = 0
+
+    def get_or_load(self, user_id: str, loader: Callable[[], Dict[str, Any]]) -> Dict[str, Any]:
+        """
+        キャッシュ済みのペイロードを返し、なければ loader で読み込んで保存
+
+        Args:
+            user_id: User ID
+            loader: ペイロードを読み込む関数（例外は呼び出し元に伝播し、キャッシュしない）
+
+        Returns:
+            dict: ペイロードのコピー
+        """
+        version = self._shared_version(user_id)
+        cached, token = self._begin_load(user_id, version)
+        if cached is not None:
+            return cached
+
+        try:
+            payload = self._shared_get(user_id, version)
+            shared_hit = payload is not None
+            if not shared_hit:
+                payload = loader()
+        except Exception:
+            self._finish_load(user_id, token)
+            raise
+
+        if self._complete_load(user_id, token, version, payload, shared_hit) and not shared_hit:
+            self._shared_set(user_id, version, payload)
+        return copy.deepcopy(payload)
+
+    async def get_or_load_async(self, user_id: str, loader: Callable[[], Awaitable[Dict[str, Any]]]) -> Dict[str, Any]:
+        """
+        get_or_load の非同期版（loader はコルーチン関数, 共有層の呼び出しはスレッドで実行）
+
+        Args:
+            user_id: User ID
+            loader: ペイロードを読み込むコルーチン関数（例外は呼び出し元に伝播し、キャッシュしない）
+
+        Returns:
+            dict: ペイロードのコピー
+        """
+        version = await asyncio.to_thread(self._shared_version, user_id) if self.backend is not None else None
+        cached, token = self._begin_load(user_id, version)
+        if cached is not None:
+            return cached
+
+        try:
+            payload = await asyncio.to_thread(self._shared_get, user_id, version) if version is not None else None
+            shared_hit = payload is not None
+            if not shared_hit:
+                payload = await loader()
+        except BaseException:
+            # キャンセルされた場合もトークンを破棄する
+            self._finish_load(user_id, token)
+            raise
+
+        if self._complete_load(user_id, token, version, payload, shared_hit) and not shared_hit and version is not None:
+            await asyncio.to_thread(self._shared_set, user_id, version, payload)
+        return copy.deepcopy(payload)
+
+    def _begin_load(self, user_id: str, version: Optional[int]) -> Tuple[Optional[Dict[str, Any]], Optional[object]]:
+        """
+        ローカル層を参照し、ヒットすれば (コピー, None)、なければ (None, 読み込みのトークン) を返す
+
+        version は共有層の現在のバージョン（共有層がない, または取得に失敗した場合は None で比較しない）
+        """
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry is not None and now - entry[0] <= self.ttl_seconds and (version is None or entry[1] == version):
+                self._entries.move_to_end(user_id)
+                self.local_hits += 1
+                # 呼び出し側での変更がキャッシュに影響しないようにコピーを返す
+                return copy.deepcopy(entry[2]), None
+            if entry is not None:
+                self._entries.pop(user_id)
+            token = object()
+            self._loading.setdefault(user_id, set()).add(token)
+            return None, token
+
+    def _complete_load(self, user_id: str, token: object, version: Optional[int], payload: Dict[str, Any], shared_hit: bool) -> bool:
+        """読み込み結果をローカル層に保存し、保存した（読み込み中に無効化されていない）かを返す"""
+        with self._lock:
+            if shared_hit:
+                self.shared_hits += 1
+            else:
+                self.misses += 1
+        if not self._finish_load(user_id, token):
+            return False
+        self._store_local(user_id, version, payload)
+        return True
+
+    def invalidate(self, user_id: str):
+        """
+        ユーザーのキャッシュを無効化（書き込み後に呼び出す）
+
+        Args:
+            user_id: User ID
+        """
+        with self._lock:
+            self._entries.pop(user_id, None)
+            self._loading.pop(user_id, None)
+            self.invalidations += 1
+        if self.backend is not None:
+            try:
+                self.backend.bump_version(user_id)
+            except Exception as e:
+                self._backend_error("bump_version", e)
+
+    def _finish_load(self, user_id: str, token: object) -> bool:
+        """読み込みを終了し、結果を保存してよい（読み込み中に無効化されていない）かを返す"""
+        with self._lock:
+            tokens = self._loading.get(user_id)
+            if tokens is None or token not in tokens:
+                self.stale_loads += 1
+                return False
+            tokens.discard(token)
+            if not tokens:
+                del self._loading[user_id]
+            return True
+
+    def _store_local(self, user_id: str, version: Optional[int], payload: Dict[str, Any]):
+        with self._lock:
+            self._entries[user_id] = (time.time(), version, copy.deepcopy(payload))
+            self._entries.move_to_end(user_id)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def _shared_version(self, user_id: str) -> Optional[int]:
+        if self.backend is None:
+            return None
+        try:
+            return self.backend.get_version(user_id)
+        except Exception as e:
+            self._backend_error("get_version", e)
+            return None
+
+    def _shared_get(self, user_id: str, version: Optional[int]) -> Optional[Dict[str, Any]]:
+        if self.backend is None or version is None:
+            return None
+        try:
+            return self.backend.get(user_id, version)
+        except Exception as e:
+            self._backend_error("get", e)
+            return None
+
+    def _shared_set(self, user_id: str, version: Optional[int], payload: Dict[str, Any]):
+        if self.backend is None or version is None:
+            return
+        try:
+            self.backend.set(user_id, version, payload, self.shared_ttl_seconds)
+        except Exception as e:
+            self._backend_error("set", e)
+
+    def _backend_error(self, operation: str, error: Exception):
+        # 共有層の障害ではホーム画面を失敗させず、Firestore から読み込む
+        with self._lock:
+            self.backend_errors += 1
+        print(f"[HomeCache] Shared backend {operation} failed: {type(error).__name__}: {error}")
+
+    def clear(self):
+        """ローカル層をクリア"""
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict:
+        """キャッシュ統計を取得"""
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "local_hits": self.local_hits,
+                "shared_hits": self.shared_hits,
+                "misses": self.misses,
+                "invalidations": self.invalidations,
+                "stale_loads": self.stale_loads,
+                "backend": type(self.backend).__name__ if self.backend is not None else None,
+                "backend_errors": self.backend_errors,
+                "ttl_seconds": self.ttl_seconds,
+                "shared_ttl_seconds": self.shared_ttl_seconds
+            }
+
+
+# グローバルインスタンス（シングルトンパターン）
+_home_cache = None
+_home_cache_loaded = False
+
+
+def get_home_cache() -> Optional[HomeCache]:
+    """
+    HomeCacheのグローバルインスタンスを取得
+
+    Returns:
+        HomeCache or None: キャッシュが無効な場合は None
+    """
+    global _home_cache, _home_cache_loaded
+    if not _home_cache_loaded:
+        if os.getenv('HOME_CACHE_ENABLED', '1') != '0':
+            backend = None
+            backend_name = os.getenv('HOME_CACHE_BACKEND', '')
+            if backend_name:
+                try:
+                    backend = _BACKENDS[backend_name]()
+                    print(f"[HomeCache] Shared backend: {backend_name}")
+                except Exception as e:
+                    # 共有層が使えない場合はローカル層のみで動作する
+                    print(f"[HomeCache] Shared backend '{backend_name}' unavailable, using local cache only: {e}")
+            _home_cache = HomeCache(backend=backend)
+        _home_cache_loaded = True
+    return _home_cache
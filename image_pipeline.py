@@ -0,0 +1,173 @@
+"""
+Image Preprocessing Pipeline
+
+アップロード画像を一度だけデコードし、Gemini 送信用の縮小画像と Storage アップロード用の画像を作成します。
+
+- 生のバイト列から直接デコード（base64 の往復なし）
+- JPEG は Image.draft() で DCT 領域の縮小（1/2, 1/4, 1/8）を行ってからデコードし、
+  残りの縮小のみ LANCZOS で行う
+- EXIF の回転情報を適用
+- Storage にはアップロードされた元のバイト列をそのまま使用
+"""
+
+from io import BytesIO
+from typing import Optional
+
+from PIL import Image, ImageOps
+
+
+class PreparedImage:
+    """前処理済み画像"""
+
+    def __init__(
+        self,
+        gemini_bytes: bytes,
+        storage_bytes: bytes,
+        mime_type: str = "image/jpeg",
+        original_size: Optional[tuple] = None,
+        gemini_size: Optional[tuple] = None,
+        perceptual_hash: Optional[int] = None,
+        color_signature: Optional[int] = None,
+        cache_scope: Optional[str] = None
+    ):
+        """
+        Args:
+            gemini_bytes: Gemini に送信する縮小済み JPEG
+            storage_bytes: Storage にアップロードするバイト列（元画像）
+            mime_type: gemini_bytes の MIME タイプ
+            original_size: 元画像のサイズ (width, height)
+            gemini_size: 縮小後のサイズ (width, height)
+            perceptual_hash: 縮小後画像の dHash（64bit, 類似画像の判定に使用）
+            color_signature: 縮小後画像の色のシグネチャ（dHash は明暗のみのため、色の違いを区別する）
+            cache_scope: レスポンスキャッシュの範囲（user_id 等, 他のユーザーとキャッシュを共有しない）
+        """
+        self.gemini_bytes = gemini_bytes
+        self.storage_bytes = storage_bytes
+        self.mime_type = mime_type
+        self.original_size = original_size
+        self.gemini_size = gemini_size
+        self.perceptual_hash = perceptual_hash
+        self.color_signature = color_signature
+        self.cache_scope = cache_scope
+
+
+class ImagePipeline:
+    """画像前処理パイプライン"""
+
+    def __init__(self, quality: int = 85):
+        """
+        Args:
+            quality: Gemini 送信用 JPEG の品質
+        """
+        self.quality = quality
+
+    @staticmethod
+    def difference_hash(image: Image.Image, hash_size: int = 8) -> int:
+        """
+        dHash（隣接ピクセルの明暗差によるパーセプチュアルハッシュ）を計算
+
+        再圧縮や軽微な色調の違いではほとんど変化しないため、同一・ほぼ同一の写真の判定に使用します。
+
+        Args:
+            image: 画像
+            hash_size: ハッシュの一辺（8 で 64bit）
+
+        Returns:
+            int: ハッシュ値
+        """
+        pixels = list(image.convert("L").resize((hash_size + 1, hash_size), Image.Resampling.LANCZOS).getdata())
+        value = 0
+        for row in range(hash_size):
+            for col in range(hash_size):
+                left = pixels[row * (hash_size + 1) + col]
+                right = pixels[row * (hash_size + 1) + col + 1]
+                value = (value << 1) | (1 if left > right else 0)
+        return value
+
+    @staticmethod
+    def color_signature(image: Image.Image, grid_size: int = 4, levels: int = 4) -> int:
+        """
+        色のシグネチャ（grid_size x grid_size に縮小した各セルの RGB を levels 段階に量子化）を計算
+
+        dHash はグレースケールの明暗差のみのため、同じ構図で色だけが違う写真（赤と緑のトップス等）を区別できません。
+        レスポンスキャッシュのキーに含め、色が違う写真の結果を返さないようにします。
+
+        Args:
+            image: 画像
+            grid_size: 縮小後の一辺
+            levels: 各チャンネルの量子化の段階数
+
+        Returns:
+            int: シグネチャ
+        """
+        value = 0
+        for red, green, blue in image.convert("RGB").resize((grid_size, grid_size), Image.Resampling.BOX).getdata():
+            for channel in (red, green, blue):
+                value = value * levels + channel * levels // 256
+        return value
+
+    def prepare(self, image_data: bytes, scale: float = 0.5, cache_scope: Optional[str] = None) -> PreparedImage:
+        """
+        画像を一度だけデコードし、Gemini 用・Storage 用のバイト列を作成
+
+        Args:
+            image_data: アップロードされた画像のバイト列
+            scale: Gemini 用画像の縮小率（0.5 = 半分の解像度）
+            cache_scope: レスポンスキャッシュの範囲（user_id 等）
+
+        Returns:
+            PreparedImage: 前処理済み画像（失敗した場合は元画像をそのまま使用）
+        """
+        try:
+            image = Image.open(BytesIO(image_data))
+            original_size = image.size
+            target_size = (max(1, int(image.width * scale)), max(1, int(image.height * scale)))
+
+            # JPEG の場合はデコード時に 1/2, 1/4, 1/8 の縮小を行う（target_size 以上で最小のもの）
+            if image.format == "JPEG":
+                image.draft("RGB", target_size)
+
+            # EXIF Orientation 5-8 は90度回転（縦横が入れ替わる）
+            if image.getexif().get(0x0112, 1) in (5, 6, 7, 8):
+                target_size = (target_size[1], target_size[0])
+
+            image = ImageOps.exif_transpose(image)
+            if image.mode != "RGB":
+                image = image.convert("RGB")
+
+            if image.size != target_size:
+                image = image.resize(target_size, Image.Resampling.LANCZOS)
+
+            buffer = BytesIO()
+            image.save(buffer, format="JPEG", quality=self.quality)
+
+            print(f"[ImagePipeline] {original_size[0]}x{original_size[1]} -> {image.width}x{image.height}")
+            return PreparedImage(
+                gemini_bytes=buffer.getvalue(),
+                storage_bytes=image_data,
+                original_size=original_size,
+                gemini_size=image.size,
+                perceptual_hash=self.difference_hash(image),
+                color_signature=self.color_signature(image),
+                cache_scope=cache_scope
+            )
+        except Exception as e:
+            print(f"[ImagePipeline] Error preparing image: {e}, using original")
+            return PreparedImage(gemini_bytes=image_data, storage_bytes=image_data, cache_scope=cache_scope)
+
+
+# グローバルインスタンス（シングルトンパターン）
+_image_pipeline = None
+
+
+def get_image_pipeline() -> ImagePipeline:
+    """
+    ImagePipelineのグローバルインスタンスを取得
+
+    Returns:
+        ImagePipeline: パイプラインインスタンス
+    """
+    global _image_pipeline
+    if _image_pipeline is None:
+        _image_pipeline = ImagePipeline()
+    return _image_pipeline
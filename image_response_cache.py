@@ -0,0 +1,160 @@
+"""
+Image Response Cache
+
+Gemini による画像解析結果（レビュー・タグ・アイテム抽出・画像付きチャット）を、
+縮小後画像のパーセプチュアルハッシュ（dHash）とプロンプトのバージョンをキーにキャッシュします。
+通信エラー後の再アップロードや、同じ写真の再送信では Gemini を呼び出さずに結果を返します。
+
+namespace にはユーザー（PreparedImage.cache_scope）と色のシグネチャを含めます。
+- 他のユーザーの結果は返さない（/api/fashion_review では抽出したアイテムがクローゼットに保存されるため）
+- dHash はグレースケールの明暗差のみのため、同じ構図で色だけが違う写真は色のシグネチャで区別する
+
+成功したレスポンスのみキャッシュします（フォールバック値はキャッシュしない）。
+
+環境変数:
+    GEMINI_IMAGE_CACHE_ENABLED: "0" で無効化（デフォルト: 有効）
+    GEMINI_IMAGE_CACHE_TTL: キャッシュの有効期間（秒, デフォルト: 3600）
+    GEMINI_IMAGE_CACHE_MAX_DISTANCE: 同一画像とみなすハミング距離の上限（0-64, デフォルト: 0 = 完全一致のみ）
+    GEMINI_IMAGE_CACHE_MAX_ENTRIES: 最大エントリ数（デフォルト: 1000）
+"""
+
+import copy
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+
+class ImageResponseCache:
+    """パーセプチュアルハッシュをキーにした画像解析結果のキャッシュ（スレッドセーフ）"""
+
+    def __init__(
+        self,
+        ttl_seconds: Optional[float] = None,
+        max_distance: Optional[int] = None,
+        max_entries: Optional[int] = None
+    ):
+        """
+        Initialize Image Response Cache
+
+        Args:
+            ttl_seconds: キャッシュの有効期間（秒）
+            max_distance: 同一画像とみなすハミング距離の上限
+            max_entries: 最大エントリ数（超えた場合は最も古いものから削除）
+        """
+        self.ttl_seconds = ttl_seconds if ttl_seconds is not None else float(os.getenv('GEMINI_IMAGE_CACHE_TTL', '3600'))
+        self.max_distance = max_distance if max_distance is not None else int(os.getenv('GEMINI_IMAGE_CACHE_MAX_DISTANCE', '0'))
+        self.max_entries = max_entries if max_entries is not None else int(os.getenv('GEMINI_IMAGE_CACHE_MAX_ENTRIES', '1000'))
+        self._lock = threading.Lock()
+        # (namespace, perceptual_hash) -> (保存時刻, 結果)
+        # namespace = (プロンプト名, プロンプトバージョン, cache_scope, 色のシグネチャ, 追加キー)
+        self._entries: "OrderedDict[Tuple[tuple, int], Tuple[float, Any]]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def hamming_distance(a: int, b: int) -> int:
+        return bin(a ^ b).count("1")
+
+    def get(self, namespace: tuple, perceptual_hash: Optional[int]) -> Optional[Any]:
+        """
+        キャッシュ済みの結果を取得
+
+        完全一致がなければ、同じ namespace 内でハミング距離が max_distance 以内の最も近いエントリを返します。
+
+        Args:
+            namespace: (プロンプト名, プロンプトバージョン, cache_scope, 色のシグネチャ, 追加キー)
+            perceptual_hash: 画像の dHash
+
+        Returns:
+            結果のコピー、見つからない場合は None
+        """
+        if perceptual_hash is None:
+            return None
+
+        now = time.time()
+        with self._lock:
+            self._evict_expired(now)
+
+            entry = self._entries.get((namespace, perceptual_hash))
+            if entry is None and self.max_distance > 0:
+                best_distance = self.max_distance + 1
+                for (entry_namespace, entry_hash), candidate in self._entries.items():
+                    if entry_namespace != namespace:
+                        continue
+                    distance = self.hamming_distance(entry_hash, perceptual_hash)
+                    if distance < best_distance:
+                        best_distance = distance
+                        entry = candidate
+
+            if entry is None:
+                self.misses += 1
+                return None
+
+            self.hits += 1
+            # 呼び出し側での変更がキャッシュに影響しないようにコピーを返す
+            return copy.deepcopy(entry[1])
+
+    def set(self, namespace: tuple, perceptual_hash: Optional[int], value: Any):
+        """
+        結果をキャッシュに保存
+
+        Args:
+            namespace: (プロンプト名, プロンプトバージョン, cache_scope, 色のシグネチャ, 追加キー)
+            perceptual_hash: 画像の dHash（None の場合は保存しない）
+            value: 保存する結果（成功したレスポンスのみ）
+        """
+        if perceptual_hash is None:
+            return
+
+        with self._lock:
+            key = (namespace, perceptual_hash)
+            self._entries.pop(key, None)
+            self._entries[key] = (time.time(), copy.deepcopy(value))
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def _evict_expired(self, now: float):
+        # 挿入順 = 保存時刻順なので先頭から期限切れを削除
+        while self._entries:
+            key, (stored_at, _) = next(iter(self._entries.items()))
+            if now - stored_at <= self.ttl_seconds:
+                break
+            self._entries.pop(key)
+
+    def clear(self):
+        """キャッシュをクリア"""
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict:
+        """キャッシュ統計を取得"""
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "ttl_seconds": self.ttl_seconds,
+                "max_distance": self.max_distance
+            }
+
+
+# グローバルインスタンス（シングルトンパターン）
+_image_response_cache = None
+_image_response_cache_loaded = False
+
+
+def get_image_response_cache() -> Optional[ImageResponseCache]:
+    """
+    ImageResponseCacheのグローバルインスタンスを取得
+
+    Returns:
+        ImageResponseCache or None: キャッシュが無効な場合は None
+    """
+    global _image_response_cache, _image_response_cache_loaded
+    if not _image_response_cache_loaded:
+        if os.getenv('GEMINI_IMAGE_CACHE_ENABLED', '1') != '0':
+            _image_response_cache = ImageResponseCache()
+        _image_response_cache_loaded = True
+    return _image_response_cache
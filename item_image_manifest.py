@@ -0,0 +1,204 @@
+"""
+Item Image Manifest
+
+Firebase Storage の items/{item_id}/ 以下の画像 URL を item_id ごとに保持するマニフェストです。
+FirebaseService.get_item_images / get_item_images_batch はこのマニフェストから URL を返します。
+
+- 初回の参照時に、items/ 全体を1回のページング付き一覧取得（バックグラウンド）でマニフェストを構築する
+- マニフェストにない item_id は、その場で並列に一覧取得する（ITEM_IMAGE_LIST_CONCURRENCY）
+- ITEM_IMAGE_MANIFEST_TTL を過ぎたエントリはそのまま返し、バックグラウンドで item_id 単位に再取得する
+- 読み取り時に blob.make_public() は呼ばない（アップロード時に公開済み: upload_image / upload_standard_items.py）
+  public_url はバケット名とパスから組み立てられるため、一覧取得ではオブジェクト名のみを取得する
+
+環境変数:
+    ITEM_IMAGE_MANIFEST_TTL: エントリの再取得までの秒数（デフォルト: 3600）
+    ITEM_IMAGE_MANIFEST_SCAN: "0" で初回参照時の全体スキャンを無効化（デフォルト: 有効）
+    ITEM_IMAGE_LIST_CONCURRENCY: item_id 単位の一覧取得の同時実行数（デフォルト: 8）
+"""
+
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional
+
+
+class ItemImageManifest:
+    """item_id -> 公開 URL のマニフェスト（スレッドセーフ）"""
+
+    ROOT_PREFIX = "items/"
+    # 一覧取得ではオブジェクト名のみ取得する
+    LIST_FIELDS = "items(name),nextPageToken"
+
+    def __init__(
+        self,
+        bucket: Any,
+        ttl_seconds: Optional[float] = None,
+        max_workers: Optional[int] = None,
+        scan_enabled: Optional[bool] = None
+    ):
+        """
+        Initialize Item Image Manifest
+
+        Args:
+            bucket: Firebase Storage のバケット
+            ttl_seconds: エントリの再取得までの秒数
+            max_workers: item_id 単位の一覧取得の同時実行数
+            scan_enabled: 初回参照時に items/ 全体をスキャンするか
+        """
+        self.bucket = bucket
+        self.ttl_seconds = ttl_seconds if ttl_seconds is not None else float(os.getenv('ITEM_IMAGE_MANIFEST_TTL', '3600'))
+        max_workers = max_workers if max_workers is not None else int(os.getenv('ITEM_IMAGE_LIST_CONCURRENCY', '8'))
+        self.scan_enabled = scan_enabled if scan_enabled is not None else os.getenv('ITEM_IMAGE_MANIFEST_SCAN', '1') != '0'
+        self._executor = ThreadPoolExecutor(max_workers=max(max_workers, 1), thread_name_prefix="item-image-manifest")
+        self._lock = threading.Lock()
+        # item_id -> (取得時刻, URL のリスト)
+        self._entries: Dict[str, tuple] = {}
+        # バックグラウンドで再取得中の item_id
+        self._refreshing: set = set()
+        self._scan_started = False
+        self.scan_seconds: Optional[float] = None
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+        self.list_calls = 0
+
+    @classmethod
+    def item_id_of(cls, blob_name: str) -> Optional[str]:
+        """オブジェクト名から item_id を取得（items/{item_id}/... 以外とディレクトリは None）"""
+        if not blob_name.startswith(cls.ROOT_PREFIX) or blob_name.endswith('/'):
+            return None
+        item_id, separator, rest = blob_name[len(cls.ROOT_PREFIX):].partition('/')
+        if not separator or not rest:
+            return None
+        return item_id
+
+    def get_many(self, item_ids: List[str]) -> Dict[str, List[str]]:
+        """
+        複数アイテムの画像 URL を取得
+
+        Args:
+            item_ids: Item IDs（空文字は無視）
+
+        Returns:
+            dict: item_id -> 公開 URL のリスト（画像がない場合は空リスト）
+        """
+        item_ids = list(dict.fromkeys(item_id for item_id in item_ids if item_id and item_id.strip()))
+        self._ensure_scan_started()
+
+        now = time.time()
+        result: Dict[str, List[str]] = {}
+        missing = []
+        with self._lock:
+            for item_id in item_ids:
+                entry = self._entries.get(item_id)
+                if entry is None:
+                    missing.append(item_id)
+                    self.misses += 1
+                    continue
+                fetched_at, urls = entry
+                result[item_id] = list(urls)
+                if now - fetched_at > self.ttl_seconds:
+                    self.stale_hits += 1
+                    if item_id not in self._refreshing:
+                        # 古いエントリはそのまま返し、バックグラウンドで再取得する
+                        self._refreshing.add(item_id)
+                        self._executor.submit(self._refresh, item_id)
+                else:
+                    self.hits += 1
+
+        if missing:
+            for item_id, urls in zip(missing, self._executor.map(self._list_item, missing)):
+                result[item_id] = list(urls) if urls is not None else []
+
+        return {item_id: result[item_id] for item_id in item_ids}
+
+    def _ensure_scan_started(self):
+        with self._lock:
+            if self._scan_started or not self.scan_enabled:
+                return
+            self._scan_started = True
+        threading.Thread(target=self._scan, name="item-image-manifest-scan", daemon=True).start()
+
+    def _scan(self):
+        """items/ 全体を1回の一覧取得（ページング）でマニフェストに反映"""
+        start = time.time()
+        try:
+            manifest: Dict[str, List[str]] = {}
+            for blob in self.bucket.list_blobs(prefix=self.ROOT_PREFIX, fields=self.LIST_FIELDS):
+                item_id = self.item_id_of(blob.name)
+                if item_id is not None:
+                    manifest.setdefault(item_id, []).append(blob.public_url)
+        except Exception as e:
+            print(f"[ItemImageManifest] Scan failed: {e}")
+            return
+
+        with self._lock:
+            self.list_calls += 1
+            for item_id, urls in manifest.items():
+                # スキャン中に item_id 単位で取得したエントリの方が新しい
+                entry = self._entries.get(item_id)
+                if entry is None or entry[0] < start:
+                    self._entries[item_id] = (start, urls)
+            self.scan_seconds = time.time() - start
+        print(f"[ItemImageManifest] Scanned {sum(len(urls) for urls in manifest.values())} images "
+              f"for {len(manifest)} items in {self.scan_seconds:.2f}s")
+
+    def _list_item(self, item_id: str) -> Optional[List[str]]:
+        """items/{item_id}/ を一覧取得してエントリを更新（失敗した場合は None, キャッシュしない）"""
+        fetched_at = time.time()
+        try:
+            urls = [
+                blob.public_url
+                for blob in self.bucket.list_blobs(prefix=f"{self.ROOT_PREFIX}{item_id}/", fields=self.LIST_FIELDS)
+                if not blob.name.endswith('/')
+            ]
+        except Exception as e:
+            print(f"Error getting images for item {item_id}: {e}")
+            return None
+
+        with self._lock:
+            self.list_calls += 1
+            self._entries[item_id] = (fetched_at, urls)
+        return urls
+
+    def _refresh(self, item_id: str):
+        try:
+            self._list_item(item_id)
+        finally:
+            with self._lock:
+                self._refreshing.discard(item_id)
+
+    def stats(self) -> Dict:
+        """マニフェストの統計を取得"""
+        with self._lock:
+            return {
+                "items": len(self._entries),
+                "images": sum(len(urls) for _, urls in self._entries.values()),
+                "hits": self.hits,
+                "stale_hits": self.stale_hits,
+                "misses": self.misses,
+                "list_calls": self.list_calls,
+                "scan_seconds": round(self.scan_seconds, 2) if self.scan_seconds is not None else None,
+                "ttl_seconds": self.ttl_seconds
+            }
+
+
+# グローバルインスタンス（シングルトンパターン）
+_item_image_manifest = None
+
+
+def get_item_image_manifest(bucket: Any) -> ItemImageManifest:
+    """
+    ItemImageManifestのグローバルインスタンスを取得
+
+    Args:
+        bucket: Firebase Storage のバケット（初回の呼び出しでのみ使用）
+
+    Returns:
+        ItemImageManifest: シングルトンインスタンス
+    """
+    global _item_image_manifest
+    if _item_image_manifest is None:
+        _item_image_manifest = ItemImageManifest(bucket)
+    return _item_image_manifest
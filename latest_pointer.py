@@ -0,0 +1,102 @@
+"""
+Latest Pointer
+
+ユーザーごとの最新の診断結果を users/{user_id}/latest/{kind} に保持します。
+診断の保存時に履歴のドキュメントと同じバッチで書き込み、読み込みは1回の get で済むようにします
+（履歴コレクションをユーザーの全件読み込んでソートしない）。
+
+    kind="fashion-type"    -> fashion-types の最新ドキュメントのコピー（FashionTypeService.diagnose）
+    kind="animal-fortune"  -> animal-fortunes の最新ドキュメントのコピー（AnimalFortuneService.diagnose）
+
+ポインターがないユーザー（この仕組みの導入前に診断したユーザー）は、初回の読み込み時に
+履歴コレクションから最新を探してポインターを作成します。
+"""
+
+from typing import Any, Dict, Optional
+
+from google.api_core.exceptions import AlreadyExists
+
+LATEST_FASHION_TYPE = "fashion-type"
+LATEST_ANIMAL_FORTUNE = "animal-fortune"
+
+# kind -> 履歴コレクション
+HISTORY_COLLECTIONS = {
+    LATEST_FASHION_TYPE: "fashion-types",
+    LATEST_ANIMAL_FORTUNE: "animal-fortunes",
+}
+
+
+def latest_ref(db, user_id: str, kind: str):
+    """
+    最新ポインターのドキュメント参照を取得
+
+    Args:
+        db: Firestore client instance
+        user_id: ユーザーID
+        kind: LATEST_FASHION_TYPE / LATEST_ANIMAL_FORTUNE
+
+    Returns:
+        DocumentReference: users/{user_id}/latest/{kind}
+    """
+    return db.collection('users').document(user_id).collection('latest').document(kind)
+
+
+def set_latest(batch, db, user_id: str, kind: str, data: Dict[str, Any]):
+    """
+    履歴ドキュメントと同じバッチで最新ポインターを書き込む
+
+    Args:
+        batch: WriteBatch
+        db: Firestore client instance
+        user_id: ユーザーID
+        kind: LATEST_FASHION_TYPE / LATEST_ANIMAL_FORTUNE
+        data: 履歴ドキュメントと同じデータ
+    """
+    batch.set(latest_ref(db, user_id, kind), data)
+
+
+def get_latest(db, user_id: str, kind: str) -> Optional[Dict[str, Any]]:
+    """
+    ユーザーの最新の診断結果を取得（ポインターがない場合は履歴から探して作成）
+
+    Args:
+        db: Firestore client instance
+        user_id: ユーザーID
+        kind: LATEST_FASHION_TYPE / LATEST_ANIMAL_FORTUNE
+
+    Returns:
+        dict: 最新の診断結果（doc_id に履歴ドキュメントのID） or None
+    """
+    ref = latest_ref(db, user_id, kind)
+    snapshot = ref.get()
+    if snapshot.exists:
+        data = snapshot.to_dict()
+        data['doc_id'] = data.get('id')
+        return data
+
+    data = _find_latest_in_history(db, user_id, HISTORY_COLLECTIONS[kind])
+    if data is None:
+        return None
+
+    try:
+        # 読み込み中に新しい診断が保存された場合はそちらを優先する（create は既存のドキュメントを上書きしない）
+        ref.create({key: value for key, value in data.items() if key != 'doc_id'})
+        print(f"[LatestPointer] Backfilled {kind} for user {user_id}")
+    except AlreadyExists:
+        pass
+    except Exception as e:
+        print(f"[LatestPointer] Failed to backfill {kind} for user {user_id}: {e}")
+    return data
+
+
+def _find_latest_in_history(db, user_id: str, collection: str) -> Optional[Dict[str, Any]]:
+    """履歴コレクションからユーザーの最新ドキュメントを探す（ポインター導入前のデータ用）"""
+    docs = []
+    for doc in db.collection(collection).where('user_id', '==', user_id).stream():
+        data = doc.to_dict()
+        data['doc_id'] = doc.id
+        docs.append(data)
+    if not docs:
+        return None
+    # created_at が未確定（None）のドキュメントは最も古いものとして扱う
+    return max(docs, key=lambda x: (x.get('created_at') is not None, x.get('created_at') or 0))
@@ -0,0 +1,352 @@
+"""
+LLM Metrics
+
+Gemini の generate_content 呼び出しごとの計測値を (メソッド, モデル) 単位で集計し、
+/metrics（Prometheus テキスト形式）と /health/llm-metrics（JSON のサマリー）で公開します。
+
+- レイテンシのヒストグラム（バルクヘッドの待ち・再試行を含む、呼び出し側から見た時間）
+- 入力・出力トークン数（usage_metadata）と出力トークン数のヒストグラム
+- max_output_tokens と、それに達して打ち切られた回数（finish_reason = MAX_TOKENS）
+- 再試行回数（429 / 503）、エラー種別ごとの失敗回数、JSON パース失敗
+- フォールバック（デフォルト値・エラーメッセージ）を返した回数
+- 画像解析・レコメンド理由キャッシュのヒット数
+- 複数の呼び出しからなる処理全体のレイテンシ（例: ファッションレビューの parallel / combined モードの A/B 比較）
+
+出力トークン数の分布と max_output_tokens を比べることで、上限の過不足を確認できます。
+"""
+
+import threading
+from typing import Dict, List, Optional, Tuple
+
+# レイテンシのバケット（秒）
+LATENCY_BUCKETS = (0.1, 0.25, 0.5, 1.0, 2.0, 4.0, 8.0, 16.0, 32.0)
+
+# 出力トークン数のバケット
+OUTPUT_TOKEN_BUCKETS = (16, 32, 64, 128, 256, 512, 1024, 2048, 4096, 8192)
+
+
+def _escape_label(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+class Histogram:
+    """累積バケット形式のヒストグラム（ロックは呼び出し側で取る）"""
+
+    def __init__(self, buckets: Tuple[float, ...]):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)  # 最後は +Inf
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+
+    def observe(self, value: float):
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[i] += 1
+                break
+        else:
+            self.counts[-1] += 1
+        self.count += 1
+        self.sum += value
+        self.max = max(self.max, value)
+
+    def quantile(self, q: float) -> Optional[float]:
+        """バケットの上限値で分位点を概算（+Inf に入った場合は最大値）"""
+        if self.count == 0:
+            return None
+        target = q * self.count
+        cumulative = 0
+        for i, bound in enumerate(self.buckets):
+            cumulative += self.counts[i]
+            if cumulative >= target:
+                return min(bound, self.max)
+        return self.max
+
+    def cumulative(self) -> List[Tuple[str, int]]:
+        result = []
+        cumulative = 0
+        for bound, count in zip(self.buckets, self.counts):
+            cumulative += count
+            result.append((f"{bound:g}", cumulative))
+        result.append(("+Inf", self.count))
+        return result
+
+
+class CallStats:
+    """(メソッド, モデル) ごとの集計"""
+
+    def __init__(self):
+        self.latency = Histogram(LATENCY_BUCKETS)
+        self.output_tokens = Histogram(OUTPUT_TOKEN_BUCKETS)
+        self.prompt_tokens_total = 0
+        self.output_tokens_total = 0
+        self.max_output_tokens: Optional[int] = None
+        self.truncated = 0
+        self.retries = 0
+        # 結果（"ok" / エラー種別）ごとの回数
+        self.outcomes: Dict[str, int] = {}
+
+
+class LLMMetrics:
+    """LLM 呼び出しの計測値を集計するクラス（スレッドセーフ）"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls: Dict[Tuple[str, str], CallStats] = {}
+        self._parse_failures: Dict[Tuple[str, str], int] = {}
+        self._fallbacks: Dict[Tuple[str, str], int] = {}
+        self._cache_hits: Dict[Tuple[str, str], int] = {}
+        self._operations: Dict[Tuple[str, str], Histogram] = {}
+
+    def _stats(self, method: str, model: str) -> CallStats:
+        stats = self._calls.get((method, model))
+        if stats is None:
+            stats = CallStats()
+            self._calls[(method, model)] = stats
+        return stats
+
+    def observe_call(
+        self,
+        method: str,
+        model: str,
+        latency_seconds: float,
+        outcome: str = "ok",
+        retries: int = 0,
+        usage=None,
+        max_output_tokens: Optional[int] = None,
+        finish_reason: Optional[str] = None
+    ):
+        """
+        generate_content 呼び出し1回分を記録
+
+        Args:
+            method: 呼び出し元のメソッド（プロンプト名）
+            model: モデル名
+            latency_seconds: 呼び出し側から見たレイテンシ（待ち・再試行を含む）
+            outcome: "ok" またはエラー種別（例外クラス名）
+            retries: 再試行回数
+            usage: response.usage_metadata
+            max_output_tokens: リクエストの max_output_tokens
+            finish_reason: 最後の候補の finish_reason
+        """
+        with self._lock:
+            stats = self._stats(method, model)
+            stats.latency.observe(latency_seconds)
+            stats.outcomes[outcome] = stats.outcomes.get(outcome, 0) + 1
+            stats.retries += retries
+            if max_output_tokens is not None:
+                stats.max_output_tokens = max_output_tokens
+            if usage is not None:
+                output_tokens = usage.candidates_token_count or 0
+                stats.prompt_tokens_total += usage.prompt_token_count or 0
+                stats.output_tokens_total += output_tokens
+                stats.output_tokens.observe(output_tokens)
+            if finish_reason == "MAX_TOKENS":
+                stats.truncated += 1
+
+    def record_parse_failure(self, method: str, model: str):
+        """レスポンスの JSON パース失敗を記録"""
+        with self._lock:
+            key = (method, model)
+            self._parse_failures[key] = self._parse_failures.get(key, 0) + 1
+
+    def record_fallback(self, method: str, error: Optional[Exception] = None):
+        """
+        フォールバック（デフォルト値・エラーメッセージ）を返したことを記録
+
+        Args:
+            method: フォールバックを返したメソッド
+            error: 原因の例外（種別ごとに集計）
+        """
+        reason = type(error).__name__ if error is not None else "empty"
+        with self._lock:
+            key = (method, reason)
+            self._fallbacks[key] = self._fallbacks.get(key, 0) + 1
+
+    def record_cache_hit(self, method: str, cache: str):
+        """キャッシュヒット（Gemini を呼び出さなかった）を記録"""
+        with self._lock:
+            key = (method, cache)
+            self._cache_hits[key] = self._cache_hits.get(key, 0) + 1
+
+    def observe_operation(self, operation: str, variant: str, latency_seconds: float):
+        """
+        処理全体（複数の generate_content 呼び出しを含む）のレイテンシを記録
+
+        Args:
+            operation: 処理名（例: "fashion_review"）
+            variant: 方式（例: "parallel" / "combined"）
+            latency_seconds: 処理全体の秒数
+        """
+        with self._lock:
+            histogram = self._operations.get((operation, variant))
+            if histogram is None:
+                histogram = Histogram(LATENCY_BUCKETS)
+                self._operations[(operation, variant)] = histogram
+            histogram.observe(latency_seconds)
+
+    def latency_quantile(self, method: str, model: str, q: float, min_count: int = 20) -> Optional[float]:
+        """
+        レイテンシの分位点（秒）を取得（サンプル数が min_count 未満の場合は None）
+        """
+        with self._lock:
+            stats = self._calls.get((method, model))
+            if stats is None or stats.latency.count < min_count:
+                return None
+            return stats.latency.quantile(q)
+
+    def summary(self) -> Dict:
+        """
+        JSON 用のサマリー（平均レイテンシの降順 = 遅いプロンプトから）
+        """
+        with self._lock:
+            calls = []
+            for (method, model), stats in self._calls.items():
+                count = stats.latency.count
+                token_count = stats.output_tokens.count
+                calls.append({
+                    "method": method,
+                    "model": model,
+                    "calls": count,
+                    "outcomes": dict(stats.outcomes),
+                    "retries": stats.retries,
+                    "parse_failures": self._parse_failures.get((method, model), 0),
+                    "latency_ms": {
+                        "avg": round(stats.latency.sum / count * 1000, 1) if count else None,
+                        "p50": round(stats.latency.quantile(0.5) * 1000, 1) if count else None,
+                        "p95": round(stats.latency.quantile(0.95) * 1000, 1) if count else None,
+                        "max": round(stats.latency.max * 1000, 1)
+                    },
+                    "tokens": {
+                        "prompt_avg": round(stats.prompt_tokens_total / token_count, 1) if token_count else None,
+                        "output_avg": round(stats.output_tokens_total / token_count, 1) if token_count else None,
+                        "output_p95": stats.output_tokens.quantile(0.95),
+                        "output_max": int(stats.output_tokens.max),
+                        "max_output_tokens": stats.max_output_tokens,
+                        "truncated": stats.truncated
+                    }
+                })
+            calls.sort(key=lambda c: c["latency_ms"]["avg"] or 0, reverse=True)
+            return {
+                "calls": calls,
+                "fallbacks": [
+                    {"method": method, "reason": reason, "count": count}
+                    for (method, reason), count in sorted(self._fallbacks.items())
+                ],
+                "cache_hits": [
+                    {"method": method, "cache": cache, "count": count}
+                    for (method, cache), count in sorted(self._cache_hits.items())
+                ],
+                "operations": [
+                    {
+                        "operation": operation,
+                        "variant": variant,
+                        "count": histogram.count,
+                        "latency_ms": {
+                            "avg": round(histogram.sum / histogram.count * 1000, 1),
+                            "p50": round(histogram.quantile(0.5) * 1000, 1),
+                            "p99": round(histogram.quantile(0.99) * 1000, 1),
+                            "max": round(histogram.max * 1000, 1)
+                        }
+                    }
+                    for (operation, variant), histogram in sorted(self._operations.items())
+                ]
+            }
+
+    @staticmethod
+    def _labels(**labels) -> str:
+        return "{" + ",".join(f'{name}="{_escape_label(value)}"' for name, value in labels.items()) + "}"
+
+    def render_prometheus(self) -> str:
+        """Prometheus テキスト形式（text/plain; version=0.0.4）で出力"""
+        lines = []
+        with self._lock:
+            calls = sorted(self._calls.items())
+
+            lines.append("# HELP llm_request_duration_seconds Gemini call latency including bulkhead wait and retries")
+            lines.append("# TYPE llm_request_duration_seconds histogram")
+            for (method, model), stats in calls:
+                for le, count in stats.latency.cumulative():
+                    lines.append(f"llm_request_duration_seconds_bucket{self._labels(method=method, model=model, le=le)} {count}")
+                labels = self._labels(method=method, model=model)
+                lines.append(f"llm_request_duration_seconds_sum{labels} {stats.latency.sum:.6f}")
+                lines.append(f"llm_request_duration_seconds_count{labels} {stats.latency.count}")
+
+            lines.append("# HELP llm_requests_total Gemini calls by outcome")
+            lines.append("# TYPE llm_requests_total counter")
+            for (method, model), stats in calls:
+                for outcome, count in sorted(stats.outcomes.items()):
+                    lines.append(f"llm_requests_total{self._labels(method=method, model=model, outcome=outcome)} {count}")
+
+            lines.append("# HELP llm_output_tokens Output tokens per response")
+            lines.append("# TYPE llm_output_tokens histogram")
+            for (method, model), stats in calls:
+                for le, count in stats.output_tokens.cumulative():
+                    lines.append(f"llm_output_tokens_bucket{self._labels(method=method, model=model, le=le)} {count}")
+                labels = self._labels(method=method, model=model)
+                lines.append(f"llm_output_tokens_sum{labels} {int(stats.output_tokens.sum)}")
+                lines.append(f"llm_output_tokens_count{labels} {stats.output_tokens.count}")
+
+            lines.append("# HELP llm_prompt_tokens_total Prompt tokens reported by usage metadata")
+            lines.append("# TYPE llm_prompt_tokens_total counter")
+            for (method, model), stats in calls:
+                lines.append(f"llm_prompt_tokens_total{self._labels(method=method, model=model)} {stats.prompt_tokens_total}")
+
+            lines.append("# HELP llm_max_output_tokens Configured max_output_tokens")
+            lines.append("# TYPE llm_max_output_tokens gauge")
+            for (method, model), stats in calls:
+                if stats.max_output_tokens is not None:
+                    lines.append(f"llm_max_output_tokens{self._labels(method=method, model=model)} {stats.max_output_tokens}")
+
+            lines.append("# HELP llm_truncated_total Responses stopped by max_output_tokens")
+            lines.append("# TYPE llm_truncated_total counter")
+            for (method, model), stats in calls:
+                lines.append(f"llm_truncated_total{self._labels(method=method, model=model)} {stats.truncated}")
+
+            lines.append("# HELP llm_retries_total Retries after 429 / 503")
+            lines.append("# TYPE llm_retries_total counter")
+            for (method, model), stats in calls:
+                lines.append(f"llm_retries_total{self._labels(method=method, model=model)} {stats.retries}")
+
+            lines.append("# HELP llm_parse_failures_total Responses that were not valid JSON")
+            lines.append("# TYPE llm_parse_failures_total counter")
+            for (method, model), count in sorted(self._parse_failures.items()):
+                lines.append(f"llm_parse_failures_total{self._labels(method=method, model=model)} {count}")
+
+            lines.append("# HELP llm_fallbacks_total Default values returned instead of a Gemini response")
+            lines.append("# TYPE llm_fallbacks_total counter")
+            for (method, reason), count in sorted(self._fallbacks.items()):
+                lines.append(f"llm_fallbacks_total{self._labels(method=method, reason=reason)} {count}")
+
+            lines.append("# HELP llm_cache_hits_total Responses served from a cache without calling Gemini")
+            lines.append("# TYPE llm_cache_hits_total counter")
+            for (method, cache), count in sorted(self._cache_hits.items()):
+                lines.append(f"llm_cache_hits_total{self._labels(method=method, cache=cache)} {count}")
+
+            lines.append("# HELP llm_operation_duration_seconds End-to-end latency of operations made of several Gemini calls")
+            lines.append("# TYPE llm_operation_duration_seconds histogram")
+            for (operation, variant), histogram in sorted(self._operations.items()):
+                for le, count in histogram.cumulative():
+                    lines.append(f"llm_operation_duration_seconds_bucket{self._labels(operation=operation, variant=variant, le=le)} {count}")
+                labels = self._labels(operation=operation, variant=variant)
+                lines.append(f"llm_operation_duration_seconds_sum{labels} {histogram.sum:.6f}")
+                lines.append(f"llm_operation_duration_seconds_count{labels} {histogram.count}")
+
+        return "\n".join(lines) + "\n"
+
+
+# グローバルインスタンス（シングルトンパターン）
+_llm_metrics = None
+
+
+def get_llm_metrics() -> LLMMetrics:
+    """
+    LLMMetricsのグローバルインスタンスを取得
+
+    Returns:
+        LLMMetrics: メトリクスインスタンス
+    """
+    global _llm_metrics
+    if _llm_metrics is None:
+        _llm_metrics = LLMMetrics()
+    return _llm_metrics
@@ -1,5 +1,6 @@
 import os
 import base64
+import binascii
 import json
 from typing import List, Optional, Dict, Any
 import urllib
@@ -9,12 +10,13 @@ from datetime import datetime
 import asyncio
 
 from pydantic import BaseModel
-import requests
+import aiohttp
 from google.cloud import firestore
 
-from fastapi import FastAPI, File, UploadFile, Form, HTTPException
-from fastapi.responses import HTMLResponse
+from fastapi import FastAPI, File, UploadFile, Form, HTTPException, Request, Header, BackgroundTasks
+from fastapi.responses import HTMLResponse, PlainTextResponse, StreamingResponse, JSONResponse, Response
 from fastapi.staticfiles import StaticFiles
+from fastapi.encoders import jsonable_encoder
 from models import (
     RecommendCoordinatesRequest, RecommendCoordinatesResponse, GenreCount,
     AnalysisCoordinateResponse, AffiliateProduct, ChatRequest, ChatResponse,
@@ -35,9 +37,16 @@ from models import (
 )
 from coordinate_service import CoordinateService
 from yahoo_shopping import YahooShoppingClient
-from gemini_service import GeminiService
+from gemini_service import get_gemini_service, close_gemini_service
+from gemini_bulkhead import get_gemini_bulkhead
+from llm_metrics import get_llm_metrics
+from home_cache import get_home_cache
+from firebase_async_repository import get_firebase_repository, close_firebase_repository
+from persistence_queue import get_persistence_queue, is_write_behind_enabled
+from master_data import get_master_data_store
 from firebase_service import FirebaseService
 from recommend_service import RecommendService
+from event_loop_monitor import get_event_loop_monitor, is_event_loop_monitor_enabled
 
 # AnalysisCoordinate Models
 class AnalysisCoordinateRequest(BaseModel):
@@ -57,6 +66,66 @@ async def startup_event():
     RecommendService.initialize()
     print("Recommendation service initialized successfully")
 
+    # Gemini クライアント（HTTP コネクションプール）をワーカー内で共有
+    get_gemini_service()
+
+    # レコメンド理由の事前生成（RECOMMEND_TRIPLE_POOL_SIZE > 0 の場合のみ）
+    if CoordinateService.triple_pool_size() > 0:
+        app.state.warm_recommend_reasons_task = asyncio.create_task(CoordinateService.warm_recommend_reasons())
+
+    # イベントループのブロッキング検知
+    if is_event_loop_monitor_enabled():
+        get_event_loop_monitor().start()
+
+    # Firestore の write-behind キュー（FIRESTORE_WRITE_BEHIND=1 の場合, 前回の残りのジョブも反映する）
+    if is_write_behind_enabled():
+        persistence_queue = get_persistence_queue()
+        persistence_queue.register_handler(
+            "save_coordinate_with_items",
+            lambda payload: FirebaseService().save_coordinate_with_items(**payload)
+        )
+        persistence_queue.start()
+
+    # マスターデータ（ファッションタイプ・グループ・質問・軸・動物）のスナップショット
+    master_data_store = get_master_data_store()
+    try:
+        master_data_db = FirebaseService().db
+    except Exception as e:
+        # Firebase が使えない環境（認証情報なし等）でも起動し、最初の参照時に読み込む
+        master_data_db = None
+        print(f"[MasterData] Skipped loading master data on startup: {e}")
+    if master_data_db is not None:
+        try:
+            await asyncio.to_thread(master_data_store.refresh, master_data_db)
+        except Exception:
+            # 一時的なエラーの場合は定期的な再読み込みで再試行する（エラーは _load で記録済み）
+            pass
+        master_data_store.start_refresh(master_data_db)
+
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    """Stop background monitors on shutdown"""
+    await get_event_loop_monitor().stop()
+    await get_master_data_store().stop()
+    if is_write_behind_enabled():
+        # 残りの書き込みを反映してから終了する
+        await asyncio.to_thread(get_persistence_queue().stop)
+    await close_firebase_repository()
+    await close_gemini_service()
+
+
+@app.middleware("http")
+async def track_in_flight_requests(request: Request, call_next):
+    """イベントループがブロックされた際に、実行中のハンドラーを特定できるよう記録する"""
+    monitor = get_event_loop_monitor()
+    key = id(request)
+    monitor.request_started(key, f"{request.method} {request.url.path}")
+    try:
+        return await call_next(request)
+    finally:
+        monitor.request_finished(key)
+
 from openai import OpenAI
 client = OpenAI(
     api_key = os.getenv('OPENAI_API_KEY')
@@ -71,6 +140,112 @@ async def root():
 async def health():
     return {"status": "ok"}
 
+@app.get("/health/event-loop")
+async def health_event_loop():
+    """イベントループ遅延の監視統計"""
+    return {"status": "ok", **get_event_loop_monitor().stats()}
+
+
+@app.get("/health/gemini-bulkhead")
+async def health_gemini_bulkhead():
+    """Gemini 呼び出しのモデル別同時実行数・待ち時間・拒否数"""
+    return {"status": "ok", "models": get_gemini_bulkhead().stats()}
+
+
+@app.get("/health/gemini-context-cache")
+async def health_gemini_context_cache():
+    """静的プロンプトの Context Caching の状態（GEMINI_CONTEXT_CACHE=1 の場合）"""
+    context_cache = get_gemini_service().context_cache
+    if context_cache is None:
+        return {"status": "disabled"}
+    return {"status": "ok", **context_cache.stats()}
+
+@app.get("/health/gemini-routing")
+async def health_gemini_routing():
+    """モデルルーティング（ヘッジ・ダウングレード）の状態と直近の判断（GEMINI_ROUTING=1 の場合）"""
+    router = get_gemini_service().router
+    if router is None:
+        return {"status": "disabled"}
+    return {"status": "ok", **router.stats()}
+
+@app.get("/health/home-cache")
+async def health_home_cache():
+    """/api/home のユーザー別キャッシュの状態（ヒット率・無効化・共有層のエラー）"""
+    home_cache = get_home_cache()
+    if home_cache is None:
+        return {"status": "disabled"}
+    return {"status": "ok", **home_cache.stats()}
+
+@app.get("/health/persistence-queue")
+async def health_persistence_queue():
+    """Firestore の write-behind キューの状態（FIRESTORE_WRITE_BEHIND=1 の場合）"""
+    if not is_write_behind_enabled():
+        return {"status": "disabled"}
+    return {"status": "ok", **(await asyncio.to_thread(get_persistence_queue().stats))}
+
+@app.get("/health/master-data")
+async def health_master_data():
+    """マスターデータのスナップショットの状態（件数・バージョン・読み込みエラー）"""
+    return {"status": "ok", **get_master_data_store().stats()}
+
+@app.post("/admin/master-data/refresh")
+async def refresh_master_data(x_admin_token: Optional[str] = Header(None)):
+    """マスターデータを再読み込み（MASTER_DATA_ADMIN_TOKEN が未設定の場合は無効）"""
+    admin_token = os.getenv('MASTER_DATA_ADMIN_TOKEN')
+    if not admin_token:
+        raise HTTPException(status_code=404, detail="Not Found")
+    if x_admin_token != admin_token:
+        raise HTTPException(status_code=403, detail="Forbidden")
+    master_data_store = get_master_data_store()
+    try:
+        await asyncio.to_thread(master_data_store.refresh, FirebaseService().db)
+    except Exception as e:
+        raise HTTPException(status_code=503, detail=f"Failed to refresh master data: {str(e)}")
+    return {"status": "ok", **master_data_store.stats()}
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def metrics():
+    """LLM 呼び出しのメトリクス（Prometheus テキスト形式）"""
+    return PlainTextResponse(get_llm_metrics().render_prometheus(), media_type="text/plain; version=0.0.4")
+
+@app.get("/health/llm-metrics")
+async def health_llm_metrics():
+    """LLM 呼び出しのメトリクスのサマリー（平均レイテンシの遅い順、トークン数と max_output_tokens の比較）"""
+    return {"status": "ok", **get_llm_metrics().summary()}
+
+async def _attach_affiliate_products(analysis_response: AnalysisCoordinateResponse, gender_jp: str):
+    """
+    トップス・ボトムスのアフィリエイト商品を非同期クライアントで並行検索し、レスポンスに設定する。
+    """
+    yahoo_client = YahooShoppingClient()
+
+    tasks = []
+    task_info = []
+
+    # トップス商品検索
+    if analysis_response.tops_categorize:
+        tops_query = yahoo_client.extract_search_keywords(analysis_response.tops_categorize)
+        tasks.append(yahoo_client.search_products_async(tops_query, gender_jp, 15))
+        task_info.append('tops')
+
+    # ボトムス商品検索
+    if analysis_response.bottoms_categorize:
+        bottoms_query = yahoo_client.extract_search_keywords(analysis_response.bottoms_categorize)
+        tasks.append(yahoo_client.search_products_async(bottoms_query, gender_jp, 15))
+        task_info.append('bottoms')
+
+    if not tasks:
+        return
+
+    results = await asyncio.gather(*tasks, return_exceptions=True)
+    for category, products in zip(task_info, results):
+        if isinstance(products, Exception) or not products:
+            continue
+        if category == 'tops':
+            analysis_response.affiliate_tops = [AffiliateProduct(**product) for product in products]
+        else:
+            analysis_response.affiliate_bottoms = [AffiliateProduct(**product) for product in products]
+
 @app.get("/health/analysis-coordinate", response_model = AnalysisCoordinateResponse)
 async def analysis_coordinate_health():
     import csv
@@ -105,20 +280,8 @@ async def analysis_coordinate_health():
         )
         
         # Yahoo Shopping API統合（health checkでも同じ処理を追加）
-        yahoo_client = YahooShoppingClient()
         gender_jp = "メンズ"  # health checkではデフォルトでメンズを使用
-        
-        # トップス商品検索
-        if analysisResponse.tops_categorize:
-            tops_query = yahoo_client.extract_search_keywords(analysisResponse.tops_categorize)
-            tops_products = yahoo_client.search_products(tops_query, gender_jp, 15)
-            analysisResponse.affiliate_tops = [AffiliateProduct(**product) for product in tops_products]
-        
-        # ボトムス商品検索  
-        if analysisResponse.bottoms_categorize:
-            bottoms_query = yahoo_client.extract_search_keywords(analysisResponse.bottoms_categorize)
-            bottoms_products = yahoo_client.search_products(bottoms_query, gender_jp, 15)
-            analysisResponse.affiliate_bottoms = [AffiliateProduct(**product) for product in bottoms_products]
+        await _attach_affiliate_products(analysisResponse, gender_jp)
         
     except Exception as e:
         print(f"Error loading local data: {e}")
@@ -136,7 +299,8 @@ async def analysis_coordinate_health():
 
 @app.get("/check-gpt")
 async def checkGPT():
-    completion = client.chat.completions.create(
+    completion = await asyncio.to_thread(
+        client.chat.completions.create,
         model = gptModel,
         messages=[{
             "role": "user",
@@ -148,7 +312,9 @@ async def checkGPT():
 @app.get("/check-vision-gpt")
 async def checkVisionGPT():
     imageURL = "https://images.wear2.jp/coordinate/DZiOeg3/21k0twHn/1728043950_500.jpg"   # WEARのコーデ画像
-    imageData = requests.get(imageURL).content
+    async with aiohttp.ClientSession() as session:
+        async with session.get(imageURL, timeout=aiohttp.ClientTimeout(total=10)) as image_response:
+            imageData = await image_response.read()
     encodedImage = base64.b64encode(imageData).decode('utf-8')
     prompt = """
     添付する画像に合わせて、以下の質問に回答する形でコーデに関するコメントをください。
@@ -172,7 +338,8 @@ async def checkVisionGPT():
     <コーディネートタイプ診断>\n
     <あなたに似合うコーディネートタイプは>\n
     """
-    response = client.chat.completions.create(
+    response = await asyncio.to_thread(
+        client.chat.completions.create,
         model="gpt-4o-mini",
         messages=[
             {
@@ -246,7 +413,8 @@ async def coordinateReview(request: ImageRequest):
     - 夢を着実に叶える粘り強さと努力家精神。
     """
 
-    response = client.chat.completions.create(
+    response = await asyncio.to_thread(
+        client.chat.completions.create,
         model="gpt-4o-mini",
         messages=[
             {
@@ -326,20 +494,8 @@ async def analysisCoordinate(request: AnalysisCoordinateRequest):
         )
         
         # Yahoo Shopping API統合
-        yahoo_client = YahooShoppingClient()
         gender_jp = "メンズ" if request.gender == "men" else "レディース" if request.gender == "women" else "メンズ"
-        
-        # トップス商品検索
-        if analysisResponse.tops_categorize:
-            tops_query = yahoo_client.extract_search_keywords(analysisResponse.tops_categorize)
-            tops_products = yahoo_client.search_products(tops_query, gender_jp, 15)
-            analysisResponse.affiliate_tops = [AffiliateProduct(**product) for product in tops_products]
-        
-        # ボトムス商品検索
-        if analysisResponse.bottoms_categorize:
-            bottoms_query = yahoo_client.extract_search_keywords(analysisResponse.bottoms_categorize)
-            bottoms_products = yahoo_client.search_products(bottoms_query, gender_jp, 15)
-            analysisResponse.affiliate_bottoms = [AffiliateProduct(**product) for product in bottoms_products]
+        await _attach_affiliate_products(analysisResponse, gender_jp)
         
     except Exception as e:
         print(f"Error loading local data: {e}")
@@ -366,13 +522,70 @@ async def recommend_coordinates(request: RecommendCoordinatesRequest):
         recommend_reasons=result.get('recommend_reasons')
     )
 
+def _sse_event(event: str, data: dict) -> str:
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+
+def _decode_chat_image(request: ChatRequest) -> Optional[bytes]:
+    """image_base64 をデコード（不正な場合は 400, ストリーミングではレスポンス開始前に検証する）"""
+    if not request.image_base64:
+        return None
+    try:
+        return base64.b64decode(request.image_base64)
+    except (binascii.Error, ValueError) as e:
+        raise HTTPException(status_code=400, detail=f"Invalid image_base64: {str(e)}")
+
+
+async def _chat_event_stream(request: ChatRequest, http_request: Request, image_data: Optional[bytes]):
+    """Gemini のストリーミング生成を SSE に変換（クライアント切断時は上流の生成を中断）"""
+    gemini_service = get_gemini_service()
+    events = gemini_service.chat_coordinate_advice_stream(
+        request.question,
+        request.gender,
+        image_data,
+        request.model
+    )
+    try:
+        async for event in events:
+            if await http_request.is_disconnected():
+                print("[Chat Stream] Client disconnected, cancelling generation")
+                break
+            yield _sse_event(event["event"], event["data"])
+    finally:
+        await events.aclose()
+
+
+@app.post("/chat/stream")
+async def chat_coordinate_stream(request: ChatRequest, http_request: Request):
+    """
+    /chat のストリーミング版（Server-Sent Events）
+
+    event: delta  data: {"text": "..."}   回答テキストの差分
+    event: done   data: {"answer": "...", "model": "...", "ttft_ms": ..., "elapsed_ms": ..., "usage": {...}}
+    event: error  data: {"message": "..."}
+    """
+    # base64 のデコードはヘッダー送信前に行い、不正な入力は 400 で返す
+    image_data = _decode_chat_image(request)
+    return StreamingResponse(
+        _chat_event_stream(request, http_request, image_data),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
 @app.post("/chat", response_model=ChatResponse)
-async def chat_coordinate(request: ChatRequest):
-    gemini_service = GeminiService()
+async def chat_coordinate(request: ChatRequest, http_request: Request = None):
+    # Accept: text/event-stream の場合はストリーミングで返す
+    if http_request is not None and "text/event-stream" in http_request.headers.get("accept", ""):
+        return await chat_coordinate_stream(request, http_request)
+
+    gemini_service = get_gemini_service()
+    # base64 のデコードはここで一度だけ行い、以降は生のバイト列で扱う
+    image_data = _decode_chat_image(request)
     answer = await gemini_service.chat_coordinate_advice_async(
         request.question, 
         request.gender, 
-        request.image_base64,
+        image_data,
         request.model
     )
     return ChatResponse(answer=answer)
@@ -488,7 +701,7 @@ async def gemini_test(request: GeminiTestRequest):
         GeminiTestResponse: Contains the response from Gemini
     """
     try:
-        gemini_service = GeminiService()
+        gemini_service = get_gemini_service()
         response = await gemini_service.test_gemini_async(request.prompt, request.model)
         return GeminiTestResponse(response=response)
     except Exception as e:
@@ -590,13 +803,11 @@ async def health_home():
     Uses a dummy user_id or tries to fetch data to ensure logic works.
     """
     try:
-        firebase_service = FirebaseService()
-        
         # Use a known test user ID or a random one to check empty state
         test_user_id = "test-user-id"
         
         print(f"Testing home API with user_id: {test_user_id}")
-        data = firebase_service.get_home_data(test_user_id)
+        data = await get_firebase_repository().get_home_data(test_user_id)
         
         recent_count = len(data.get("recent_coordinates", []))
         tags_count = len(data.get("tags", []))
@@ -640,14 +851,13 @@ async def health_fashion_review():
     try:
         with open(image_path, "rb") as image_file:
             image_data = image_file.read()
-            image_base64 = base64.b64encode(image_data).decode('utf-8')
 
         # Initialize services
-        gemini_service = GeminiService()
+        gemini_service = get_gemini_service()
 
         # Generate AI review and extract items using Gemini (single API call)
         print(f"[Health Check] Generating fashion review and extracting items for test image")
-        ai_review = await gemini_service.generate_fashion_review_async(image_base64)
+        ai_review = await gemini_service.generate_fashion_review_async(image_data)
 
         # Build mock response (Firebase操作はスキップ)
         from datetime import datetime
@@ -930,7 +1140,10 @@ async def health_user_insight():
 
         # Step 3: Generate user insight
         print("\n[3/3] Generating user insight...")
-        insight_result = await get_user_insight(test_user_id)
+        insight_tasks = BackgroundTasks()
+        insight_result = await get_user_insight(test_user_id, insight_tasks)
+        # 保存まで確認する
+        await insight_tasks()
 
         print(f"\n[Health Check] User insight generation completed")
         print(f"  - Status: {insight_result['status']}")
@@ -1043,10 +1256,8 @@ async def home_data(user_id: str):
     Returns:
         HomeResponse: Dashboard data
     """
-    firebase_service = FirebaseService()
-    
     print(f"Fetching home data for user: {user_id}")
-    data = firebase_service.get_home_data(user_id)
+    data = await get_firebase_repository().get_home_data(user_id)
     
     return HomeResponse(
         recent_coordinates=[
@@ -1070,10 +1281,8 @@ async def get_closet_items(user_id: str, item_type: Optional[str] = None):
     Returns:
         ClosetResponse: List of items
     """
-    firebase_service = FirebaseService()
-    
     print(f"Fetching closet items for user: {user_id}, type: {item_type}")
-    items_data = firebase_service.get_user_items(user_id, item_type)
+    items_data = await get_firebase_repository().get_user_items(user_id, item_type)
     
     items = []
     for data in items_data:
@@ -1117,12 +1326,11 @@ async def analyze_recent_coordinate(request: AnalyzeRecentCoordinateRequest):
         AnalyzeRecentCoordinateResponse: Contains analyze_recent_coordinate summary
     """
     try:
-        firebase_service = FirebaseService()
-        gemini_service = GeminiService()
+        gemini_service = get_gemini_service()
 
         # Get tags from recent coordinates
         print(f"Fetching recent coordinates for user: {request.uid}, target_days: {request.target_days}")
-        tags_list = firebase_service.get_recent_coordinates_with_tags(
+        tags_list = await get_firebase_repository().get_recent_coordinates_with_tags(
             user_id=request.uid,
             target_days=request.target_days,
             limit=3
@@ -1187,15 +1395,21 @@ async def fashion_review(
 
         # Read image data
         image_data = await file.read()
-        image_base64 = base64.b64encode(image_data).decode('utf-8')
 
         # Initialize services
-        gemini_service = GeminiService()
-        firebase_service = FirebaseService()
+        gemini_service = get_gemini_service()
+
+        # Decode once: Gemini payload (downscaled) and Storage upload bytes (original)
+        prepared_image = await asyncio.to_thread(
+            gemini_service.prepare_image,
+            image_data,
+            gemini_service.FASHION_REVIEW_IMAGE_SCALE,
+            user_id
+        )
 
         # Generate AI review and extract items using Gemini (parallel API calls)
         print(f"Generating fashion review and extracting items for user: {user_id}")
-        ai_review = await gemini_service.generate_fashion_review_async(image_base64)
+        ai_review = await gemini_service.generate_fashion_review_async(prepared_image)
 
         # Prepare image upload tasks (parallel execution)
         upload_start_time = time.time()
@@ -1217,23 +1431,20 @@ async def fashion_review(
 
         # Build parallel upload tasks
         upload_tasks = {
-            'coordinate': asyncio.to_thread(
-                firebase_service.upload_image,
-                image_data,
+            'coordinate': get_firebase_repository().upload_image(
+                prepared_image.storage_bytes,
                 f"coordinates/{user_id}"
             )
         }
 
         if tops_image_data:
-            upload_tasks['tops'] = asyncio.to_thread(
-                firebase_service.upload_image,
+            upload_tasks['tops'] = get_firebase_repository().upload_image(
                 tops_image_data,
                 f"items/{user_id}/tops"
             )
 
         if bottoms_image_data:
-            upload_tasks['bottoms'] = asyncio.to_thread(
-                firebase_service.upload_image,
+            upload_tasks['bottoms'] = get_firebase_repository().upload_image(
                 bottoms_image_data,
                 f"items/{user_id}/bottoms"
             )
@@ -1321,9 +1532,11 @@ async def fashion_review(
 
             print(f"  Prepared item: {item_type} - {item_data.get('category')}")
 
-        # Save coordinate with items and item_types to Firestore
-        print("Saving coordinate with items to Firestore...")
-        firebase_service.save_coordinate(
+        # Save coordinate and closet items in one batch write, and fetch recent coordinates concurrently
+        # (both run off the event loop; the current coordinate is excluded from the recent list below)
+        # With FIRESTORE_WRITE_BEHIND=1 the batch write is journaled locally and committed by the background worker
+        persist_start_time = time.time()
+        save_kwargs = dict(
             user_id=user_id,
             coordinate_id=coordinate_id,
             image_path=coordinate_image_url,
@@ -1331,29 +1544,22 @@ async def fashion_review(
             ai_review_comment=ai_review["ai_review_comment"],
             tags=ai_review["tags"],
             items=items_for_firestore,
-            item_types=ai_review.get("item_types", [])
+            item_types=ai_review.get("item_types", []),
+            date=current_date
         )
-
-        # Save individual items to user's closet (users/{user_id}/items)
-        print("Saving items to user's closet...")
-        for item in items_for_firestore:
-            try:
-                firebase_service.save_user_item(
-                    user_id=user_id,
-                    item_id=item['id'],
-                    coordinate_id=coordinate_id,
-                    item_type=item['item_type'],
-                    category=item.get('category'),
-                    color=item.get('color'),
-                    image_url=item.get('item_image_path', coordinate_image_url),  # Use individual image if available
-                    description=item.get('description')
-                )
-            except Exception as e:
-                print(f"Failed to save item to closet: {e}")
-
-        # Get user's recent coordinates
-        print("Fetching recent coordinates...")
-        recent_coords_data = firebase_service.get_user_coordinates(user_id, limit=10)
+        if is_write_behind_enabled():
+            print("Queueing coordinate with items for Firestore and fetching recent coordinates...")
+            save_task = asyncio.to_thread(
+                get_persistence_queue().enqueue, "save_coordinate_with_items", coordinate_id, save_kwargs
+            )
+        else:
+            print("Saving coordinate with items to Firestore and fetching recent coordinates...")
+            save_task = get_firebase_repository().save_coordinate_with_items(**save_kwargs)
+        _, recent_coords_data = await asyncio.gather(
+            save_task,
+            get_firebase_repository().get_user_coordinates(user_id, 10)
+        )
+        print(f"[Firestore] Persistence stage completed in {time.time() - persist_start_time:.2f}s")
 
         # Format recent coordinates (exclude the current one)
         recent_coordinates = []
@@ -1378,6 +1584,8 @@ async def fashion_review(
                     ai_catchphrase=coord_data.get('ai_catchphrase', ''),
                     ai_review_comment=coord_data.get('ai_review_comment', '')
                 ))
+        # The read may or may not see the new coordinate; keep the same count as before either way
+        recent_coordinates = recent_coordinates[:9]
 
         # Build response
         response = FashionReviewResponse(
@@ -1717,8 +1925,7 @@ async def health_coordinate_list():
         print(f"  test_user_id: {test_user_id}")
         print(f"  target: {year}/{month:02d}")
 
-        firebase = FirebaseService()
-        coordinates = firebase.get_coordinates_by_month(test_user_id, year, month)
+        coordinates = await get_firebase_repository().get_coordinates_by_month(test_user_id, year, month)
 
         coord_by_day: Dict[int, Dict[str, Any]] = {}
         for coord in coordinates:
@@ -1797,8 +2004,7 @@ async def health_coordinate_date():
         print(f"  test_user_id: {test_user_id}")
         print(f"  target_date: {today}")
 
-        firebase = FirebaseService()
-        coordinate = firebase.get_coordinate_by_date(test_user_id, today)
+        coordinate = await get_firebase_repository().get_coordinate_by_date(test_user_id, today)
 
         if not coordinate:
             print(f"  No coordinate found for {today} (expected for test user)")
@@ -1871,8 +2077,7 @@ async def get_coordinate_list(uid: str, year: int, month: int, page: int = 0):
     """
     import calendar as cal_module
 
-    firebase = FirebaseService()
-    coordinates = firebase.get_coordinates_by_month(uid, year, month)
+    coordinates = await get_firebase_repository().get_coordinates_by_month(uid, year, month)
 
     # day -> coordinate data のマッピングを構築
     coord_by_day: Dict[int, Dict[str, Any]] = {}
@@ -1916,8 +2121,7 @@ async def get_coordinate_by_date(uid: str, target_date: str):
     指定ユーザーの指定日付（YYYY-MM-DD）のコーディネート詳細を返す。
     コーデが存在しない場合は空配列を返す。
     """
-    firebase = FirebaseService()
-    coordinate = firebase.get_coordinate_by_date(uid, target_date)
+    coordinate = await get_firebase_repository().get_coordinate_by_date(uid, target_date)
 
     if not coordinate:
         return []
@@ -1958,14 +2162,13 @@ async def health_delete_coordinate():
     Tests with test-user-id to verify the deletion logic works.
     """
     try:
-        firebase = FirebaseService()
         test_user_id = "test-user-id"
 
         print(f"=== Health check: delete-coordinate ===")
         print(f"  test_user_id: {test_user_id}")
 
         # Get user's coordinates to find one to test with
-        coords = firebase.get_user_coordinates(test_user_id, limit=1)
+        coords = await get_firebase_repository().get_user_coordinates(test_user_id, limit=1)
 
         if not coords:
             return {
@@ -2013,8 +2216,8 @@ async def delete_coordinate(coordinate_id: str, uid: str):
         DeleteCoordinateResponse: 削除結果
     """
     try:
-        firebase = FirebaseService()
-        result = firebase.delete_coordinate(uid, coordinate_id)
+        # Firestore / Storage のカスケード削除はブロッキングのためスレッドプールで実行
+        result = await get_firebase_repository().delete_coordinate(uid, coordinate_id)
 
         return DeleteCoordinateResponse(
             success=result["success"],
@@ -2087,8 +2290,25 @@ async def diagnose_fashion_type(request: FashionTypeDiagnosisRequest):
         raise HTTPException(status_code=500, detail=f"Internal server error: {str(e)}")
 
 
+async def _master_data_snapshot():
+    """マスターデータのスナップショット（起動時に読み込めなかった場合はスレッドで読み込む）"""
+    return await asyncio.to_thread(get_master_data_store().get, FirebaseService().db)
+
+
+def _master_data_response(request: Request, etag: Optional[str], content: Dict[str, Any]) -> Response:
+    """ETag 付きのレスポンス（If-None-Match が一致する場合は 304）"""
+    headers = {"Cache-Control": "no-cache"}
+    if etag is None:
+        return JSONResponse(content=jsonable_encoder(content), headers=headers)
+    headers["ETag"] = etag
+    if_none_match = request.headers.get("if-none-match", "")
+    if etag in [value.strip() for value in if_none_match.split(",")] or if_none_match.strip() == "*":
+        return Response(status_code=304, headers=headers)
+    return JSONResponse(content=jsonable_encoder(content), headers=headers)
+
+
 @app.get("/api/fashion-type/questions")
-async def get_fashion_type_questions():
+async def get_fashion_type_questions(request: Request):
     """
     Get all fashion type questions from master data.
 
@@ -2096,17 +2316,14 @@ async def get_fashion_type_questions():
         list: All 10 questions with metadata (sorted by order)
     """
     try:
-        firebase_service = FirebaseService()
-        from fashion_type_service import FashionTypeService
-        fashion_type_service = FashionTypeService(firebase_service.db)
-
-        questions = fashion_type_service.get_all_questions()
+        snapshot = await _master_data_snapshot()
+        questions = snapshot.questions
 
-        return {
+        return _master_data_response(request, snapshot.etag("questions"), {
             "status": "success",
             "count": len(questions),
             "questions": questions
-        }
+        })
     except Exception as e:
         print(f"Error in get_fashion_type_questions endpoint: {e}")
         import traceback
@@ -2115,7 +2332,7 @@ async def get_fashion_type_questions():
 
 
 @app.get("/api/fashion-type/master/{type_code}")
-async def get_fashion_type_master(type_code: str):
+async def get_fashion_type_master(type_code: str, request: Request):
     """
     Get detailed master data for a specific fashion type.
 
@@ -2126,20 +2343,17 @@ async def get_fashion_type_master(type_code: str):
         dict: Master data including type_name, description, core_stance, group info, etc.
     """
     try:
-        firebase_service = FirebaseService()
-        from fashion_type_service import FashionTypeService
-        fashion_type_service = FashionTypeService(firebase_service.db)
-
-        master_data = fashion_type_service.get_type_master(type_code)
+        snapshot = await _master_data_snapshot()
+        master_data = snapshot.fashion_types.get(type_code)
 
         if not master_data:
             raise HTTPException(status_code=404, detail=f"Type code '{type_code}' not found")
 
-        return {
+        return _master_data_response(request, snapshot.etag("fashion_types", type_code), {
             "status": "success",
             "type_code": type_code,
             "data": master_data
-        }
+        })
     except HTTPException:
         raise
     except Exception as e:
@@ -2150,7 +2364,7 @@ async def get_fashion_type_master(type_code: str):
 
 
 @app.get("/api/fashion-type/groups/{group_code}")
-async def get_fashion_type_group(group_code: str):
+async def get_fashion_type_group(group_code: str, request: Request):
     """
     Get group information for a specific fashion type group.
 
@@ -2161,20 +2375,17 @@ async def get_fashion_type_group(group_code: str):
         dict: Group information including name, color, nuance, and member types
     """
     try:
-        firebase_service = FirebaseService()
-        from fashion_type_service import FashionTypeService
-        fashion_type_service = FashionTypeService(firebase_service.db)
-
-        group_info = fashion_type_service.get_group_info(group_code)
+        snapshot = await _master_data_snapshot()
+        group_info = snapshot.groups.get(group_code)
 
         if not group_info:
             raise HTTPException(status_code=404, detail=f"Group code '{group_code}' not found")
 
-        return {
+        return _master_data_response(request, snapshot.etag("groups", group_code), {
             "status": "success",
             "group_code": group_code,
             "data": group_info
-        }
+        })
     except HTTPException:
         raise
     except Exception as e:
@@ -2185,7 +2396,7 @@ async def get_fashion_type_group(group_code: str):
 
 
 @app.get("/api/fashion-type/axes")
-async def get_fashion_type_axes():
+async def get_fashion_type_axes(request: Request):
     """
     Get all axes information (calculation rules, thresholds, etc.).
 
@@ -2193,17 +2404,14 @@ async def get_fashion_type_axes():
         list: All 4 axes definitions
     """
     try:
-        firebase_service = FirebaseService()
-        from fashion_type_service import FashionTypeService
-        fashion_type_service = FashionTypeService(firebase_service.db)
-
-        axes = fashion_type_service.get_axes_info()
+        snapshot = await _master_data_snapshot()
+        axes = snapshot.axes
 
-        return {
+        return _master_data_response(request, snapshot.etag("axes"), {
             "status": "success",
             "count": len(axes),
             "axes": axes
-        }
+        })
     except Exception as e:
         print(f"Error in get_fashion_type_axes endpoint: {e}")
         import traceback
@@ -2212,12 +2420,13 @@ async def get_fashion_type_axes():
 
 
 @app.get("/api/user-insight", response_model=UserInsightResponse)
-async def get_user_insight(userid: str):
+async def get_user_insight(userid: str, background_tasks: BackgroundTasks):
     """
     Get user insight based on fashion type and animal fortune data.
 
     Args:
         userid: User ID
+        background_tasks: インサイトの保存をレスポンス送信後に実行する
 
     Returns:
         UserInsightResponse: Generated insight from Gemini 2.5-flash-lite
@@ -2227,8 +2436,10 @@ async def get_user_insight(userid: str):
         from user_insight_service import UserInsightService
         user_insight_service = UserInsightService(firebase_service.db)
 
-        # Generate insight
-        result = user_insight_service.generate_insight(userid)
+        # Generate insight（読み込みは並行して実行し、保存はレスポンス送信後に行う）
+        result, insight_data = await user_insight_service.generate_insight_async(userid)
+        if insight_data is not None:
+            background_tasks.add_task(user_insight_service.save_insight, insight_data)
 
         print(f"[UserInsight] Generated insight for user {userid}: {result['status']}")
 
@@ -2509,10 +2720,6 @@ async def register_item(
                 detail="item_type is required for user closet items"
             )
 
-        # Initialize services
-        from firebase_service import FirebaseService
-        firebase_service = FirebaseService()
-
         # Read image data
         print(f"[ItemRegistration] Processing user closet item for user: {user_id}")
         image_data = await image.read()
@@ -2525,8 +2732,7 @@ async def register_item(
 
         # Upload image to Firebase Storage
         upload_start = time.time()
-        storage_url = await asyncio.to_thread(
-            firebase_service.upload_image,
+        storage_url = await get_firebase_repository().upload_image(
             image_data,
             storage_path
         )
@@ -2534,7 +2740,7 @@ async def register_item(
         print(f"[ItemRegistration] Image uploaded in {upload_elapsed:.2f}s: {storage_url}")
 
         # Save metadata to Firestore as user closet item
-        item_data = firebase_service.save_user_closet_item(
+        item_data = await get_firebase_repository().save_user_closet_item(
             user_id=user_id,
             item_id=item_id,
             storage_url=storage_url,
@@ -2657,10 +2863,6 @@ async def register_items_bulk(
 
         print(f"[BulkRegistration] Processing {len(validated_metadata)} items for user: {user_id}")
 
-        # Initialize services
-        from firebase_service import FirebaseService
-        firebase_service = FirebaseService()
-
         # Step 1: Upload all images in parallel
         upload_start = time.time()
         upload_tasks = []
@@ -2683,8 +2885,7 @@ async def register_items_bulk(
 
             # Create upload task
             upload_tasks.append(
-                asyncio.to_thread(
-                    firebase_service.upload_image,
+                get_firebase_repository().upload_image(
                     image_data,
                     storage_path
                 )
@@ -2751,7 +2952,7 @@ async def register_items_bulk(
 
         # Step 3: Batch write to Firestore
         batch_start = time.time()
-        batch_result = firebase_service.register_items_batch(batch_items)
+        batch_result = await get_firebase_repository().register_items_batch(batch_items)
 
         if not batch_result['success']:
             raise Exception(f"Batch write failed: {batch_result['error']}")
@@ -2775,24 +2976,20 @@ async def register_items_bulk(
         # Rollback: Delete uploaded images
         if uploaded_urls:
             print(f"[Rollback] Deleting {len(uploaded_urls)} uploaded images")
-            for url in uploaded_urls:
-                try:
-                    firebase_service.delete_image_from_url(url)
-                except Exception as del_error:
-                    print(f"[Rollback Error] Failed to delete {url}: {del_error}")
+            try:
+                await get_firebase_repository().delete_images(uploaded_urls)
+            except Exception as del_error:
+                print(f"[Rollback Error] Failed to delete uploaded images: {del_error}")
         raise
 
     except Exception as e:
         # Rollback: Delete uploaded images
         if uploaded_urls:
             print(f"[Rollback] Deleting {len(uploaded_urls)} uploaded images due to error")
-            from firebase_service import FirebaseService
-            firebase_service = FirebaseService()
-            for url in uploaded_urls:
-                try:
-                    firebase_service.delete_image_from_url(url)
-                except Exception as del_error:
-                    print(f"[Rollback Error] Failed to delete {url}: {del_error}")
+            try:
+                await get_firebase_repository().delete_images(uploaded_urls)
+            except Exception as del_error:
+                print(f"[Rollback Error] Failed to delete uploaded images: {del_error}")
 
         print(f"[BulkRegistration] Error: {e}")
         import traceback
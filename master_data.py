@@ -0,0 +1,219 @@
+"""
+Master Data Snapshot
+
+ファッションタイプ診断・動物占いのマスターデータ（小さく、ほとんど変更されないコレクション）を
+プロセス全体で共有するスナップショットとして保持します。
+
+    fashion-type-master    -> fashion_types（type_code -> データ）
+    fashion-type-groups    -> groups（group_code -> データ）
+    fashion-type-questions -> questions（order 順のリスト）
+    fashion-type-axes      -> axes（リスト）
+    animal-master          -> animals（animal_number（文字列）-> データ）
+
+- 起動時に読み込み（startup）、MASTER_DATA_REFRESH_SECONDS ごと、または
+  POST /admin/master-data/refresh で再読み込みする
+- 再読み込みでは新しいスナップショットを作成して参照を差し替える（読み込み中も古いスナップショットを返す）
+  スナップショットは読み取り専用として扱い、呼び出し側で変更しないこと
+- 各セクション・各キーの ETag（内容のハッシュ）を読み込み時に計算し、API のレスポンスヘッダーに使う
+- 再読み込みに失敗した場合は古いスナップショットを使い続ける
+
+環境変数:
+    MASTER_DATA_REFRESH_SECONDS: 定期的な再読み込みの間隔（秒, デフォルト: 3600, 0 で無効）
+    MASTER_DATA_ADMIN_TOKEN: POST /admin/master-data/refresh の X-Admin-Token（未設定の場合はエンドポイントを無効化）
+"""
+
+import asyncio
+import hashlib
+import json
+import os
+import threading
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+# スナップショットのセクション -> Firestore のコレクション
+COLLECTIONS = {
+    "fashion_types": "fashion-type-master",
+    "groups": "fashion-type-groups",
+    "questions": "fashion-type-questions",
+    "axes": "fashion-type-axes",
+    "animals": "animal-master",
+}
+
+
+def _etag(value: Any) -> str:
+    payload = json.dumps(value, ensure_ascii=False, sort_keys=True, default=str)
+    return '"' + hashlib.sha256(payload.encode("utf-8")).hexdigest()[:32] + '"'
+
+
+class MasterDataSnapshot:
+    """ある時点のマスターデータ（読み取り専用）"""
+
+    def __init__(self, documents: Dict[str, Dict[str, Dict[str, Any]]]):
+        """
+        Initialize Master Data Snapshot
+
+        Args:
+            documents: セクション -> (ドキュメントID -> データ)
+        """
+        self.fashion_types: Dict[str, Dict[str, Any]] = documents["fashion_types"]
+        self.groups: Dict[str, Dict[str, Any]] = documents["groups"]
+        # order フィールドでソート
+        self.questions: List[Dict[str, Any]] = sorted(documents["questions"].values(), key=lambda x: x.get('order', 0))
+        self.axes: List[Dict[str, Any]] = list(documents["axes"].values())
+        self.animals: Dict[str, Dict[str, Any]] = documents["animals"]
+        self.loaded_at = time.time()
+
+        # (セクション, キー) -> ETag（キーが None の場合はセクション全体）
+        self._etags: Dict[Tuple[str, Optional[str]], str] = {
+            ("questions", None): _etag(self.questions),
+            ("axes", None): _etag(self.axes),
+        }
+        for section in ("fashion_types", "groups", "animals"):
+            for key, value in getattr(self, section).items():
+                self._etags[(section, key)] = _etag(value)
+        self.version = _etag({f"{section}/{key or ''}": etag for (section, key), etag in self._etags.items()})
+
+    def etag(self, section: str, key: Optional[str] = None) -> Optional[str]:
+        """セクション（またはセクション内のキー）の ETag"""
+        return self._etags.get((section, key))
+
+    def counts(self) -> Dict[str, int]:
+        return {section: len(getattr(self, section)) for section in COLLECTIONS}
+
+
+class MasterDataStore:
+    """マスターデータのスナップショットの読み込み・差し替え（スレッドセーフ）"""
+
+    # 再読み込みに失敗した場合の再試行までの秒数の上限
+    RETRY_SECONDS = 60
+
+    def __init__(self, refresh_seconds: Optional[float] = None):
+        """
+        Initialize Master Data Store
+
+        Args:
+            refresh_seconds: 定期的な再読み込みの間隔（秒, 0 で無効）
+        """
+        self.refresh_seconds = refresh_seconds if refresh_seconds is not None else float(os.getenv('MASTER_DATA_REFRESH_SECONDS', '3600'))
+        self._snapshot: Optional[MasterDataSnapshot] = None
+        self._load_lock = threading.Lock()
+        self._task: Optional[asyncio.Task] = None
+        self.loads = 0
+        self.load_errors = 0
+        self.last_error: Optional[str] = None
+        self.last_load_ms: Optional[float] = None
+
+    def get(self, db) -> MasterDataSnapshot:
+        """
+        現在のスナップショットを取得（未読み込みの場合は db から読み込む）
+
+        Args:
+            db: Firestore client instance
+
+        Returns:
+            MasterDataSnapshot: スナップショット
+        """
+        snapshot = self._snapshot
+        if snapshot is not None:
+            return snapshot
+        with self._load_lock:
+            if self._snapshot is None:
+                self._load(db)
+            return self._snapshot
+
+    def refresh(self, db) -> MasterDataSnapshot:
+        """
+        マスターデータを再読み込みしてスナップショットを差し替える（ブロッキング）
+
+        Args:
+            db: Firestore client instance
+
+        Returns:
+            MasterDataSnapshot: 新しいスナップショット（失敗した場合は例外を送出し、古いスナップショットを維持）
+        """
+        with self._load_lock:
+            self._load(db)
+            return self._snapshot
+
+    def _load(self, db):
+        start = time.perf_counter()
+        try:
+            documents = {
+                section: {doc.id: doc.to_dict() for doc in db.collection(collection).stream()}
+                for section, collection in COLLECTIONS.items()
+            }
+            snapshot = MasterDataSnapshot(documents)
+        except Exception as e:
+            self.load_errors += 1
+            self.last_error = f"{type(e).__name__}: {e}"
+            print(f"[MasterData] Failed to load master data: {e}")
+            raise
+
+        previous = self._snapshot
+        self._snapshot = snapshot
+        self.loads += 1
+        self.last_error = None
+        self.last_load_ms = (time.perf_counter() - start) * 1000
+        changed = previous is None or previous.version != snapshot.version
+        print(f"[MasterData] Loaded {snapshot.counts()} in {self.last_load_ms:.0f}ms"
+              f"{'' if changed else ' (unchanged)'}")
+
+    def start_refresh(self, db):
+        """定期的な再読み込みタスクを開始（イベントループ上で呼び出すこと）"""
+        if self.refresh_seconds <= 0 or (self._task is not None and not self._task.done()):
+            return
+        self._task = asyncio.get_running_loop().create_task(self._refresh_loop(db))
+
+    async def _refresh_loop(self, db):
+        # 起動時の読み込みに失敗した場合は短い間隔で再試行する
+        failed = self._snapshot is None
+        while True:
+            await asyncio.sleep(min(self.refresh_seconds, self.RETRY_SECONDS) if failed else self.refresh_seconds)
+            try:
+                await asyncio.to_thread(self.refresh, db)
+                failed = False
+            except Exception:
+                # 古いスナップショットを使い続ける（エラーは _load で記録済み）
+                failed = True
+
+    async def stop(self):
+        """定期的な再読み込みタスクを停止"""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def stats(self) -> Dict:
+        """スナップショットの状態を取得"""
+        snapshot = self._snapshot
+        return {
+            "loaded": snapshot is not None,
+            "version": snapshot.version if snapshot else None,
+            "loaded_at": snapshot.loaded_at if snapshot else None,
+            "counts": snapshot.counts() if snapshot else None,
+            "loads": self.loads,
+            "load_errors": self.load_errors,
+            "last_error": self.last_error,
+            "last_load_ms": round(self.last_load_ms, 1) if self.last_load_ms is not None else None,
+            "refresh_seconds": self.refresh_seconds
+        }
+
+
+# グローバルインスタンス（シングルトンパターン）
+_master_data_store = None
+
+
+def get_master_data_store() -> MasterDataStore:
+    """
+    MasterDataStoreのグローバルインスタンスを取得
+
+    Returns:
+        MasterDataStore: シングルトンインスタンス
+    """
+    global _master_data_store
+    if _master_data_store is None:
+        _master_data_store = MasterDataStore()
+    return _master_data_store
@@ -0,0 +1,360 @@
+"""
+Persistence Queue (Write-Behind)
+
+Firestore への書き込みをローカルの SQLite ジャーナルに記録し、バックグラウンドのワーカーで反映します。
+/api/fashion_review では、Gemini の解析と画像アップロードが終わった時点でレスポンスを返し、
+コーディネートとクローゼットのアイテムの書き込み（save_coordinate_with_items）をこのキューに任せます。
+
+- 永続化: ジョブは SQLite（WAL）に保存され、プロセスが再起動しても次回の start() で再実行されます
+- 冪等性: ジョブは key（例: coordinate_id）で一意になり、同じ key の enqueue は無視されます
+  ドキュメント ID は enqueue 前に決まっているため、再実行しても同じドキュメントを上書きするだけです
+- リトライ: 失敗したジョブは指数バックオフで再実行し、PERSISTENCE_QUEUE_MAX_ATTEMPTS 回失敗すると
+  "dead" として残します（/health/persistence-queue で確認）
+- 排他: ワーカーはジョブを反映する前に status を 'running' に更新して取得（リース）します
+  同じファイルを複数のプロセス（uvicorn --workers N）で共有しても、1つのジョブを反映するのは1プロセスだけです
+  リースの期限（PERSISTENCE_QUEUE_LEASE_SECONDS）が切れたジョブ（反映中にプロセスが落ちたもの）は、
+  start() と定期的なチェックで 'pending' に戻して再実行します
+- シャットダウン: stop() は PERSISTENCE_QUEUE_SHUTDOWN_TIMEOUT 秒まで、残りのジョブをバックオフなしで1回ずつ反映します
+
+反映までの間（通常は数百ミリ秒）、/api/home や一覧には新しいコーディネートが表示されません。
+
+環境変数:
+    FIRESTORE_WRITE_BEHIND: "1" で /api/fashion_review の書き込みをキュー経由にする（デフォルト: 無効）
+    PERSISTENCE_QUEUE_PATH: SQLite ファイルのパス（デフォルト: "persistence_queue.sqlite3"）
+    PERSISTENCE_QUEUE_MAX_ATTEMPTS: 最大試行回数（デフォルト: 8）
+    PERSISTENCE_QUEUE_RETRY_BASE_MS: リトライ間隔の初期値（2倍ずつ増加, 最大60秒, デフォルト: 500）
+    PERSISTENCE_QUEUE_SHUTDOWN_TIMEOUT: シャットダウン時に反映を待つ最大秒数（デフォルト: 10）
+    PERSISTENCE_QUEUE_LEASE_SECONDS: 反映中のジョブのリース期間（デフォルト: 120）
+"""
+
+import json
+import os
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, Optional
+
+
+def is_write_behind_enabled() -> bool:
+    """/api/fashion_review の書き込みをキュー経由にするかどうか"""
+    return os.getenv('FIRESTORE_WRITE_BEHIND', '0') == '1'
+
+
+class PersistenceQueue:
+    """SQLite ジャーナルを使った write-behind キュー（スレッドセーフ）"""
+
+    MAX_RETRY_DELAY_SECONDS = 60.0
+    POLL_INTERVAL_SECONDS = 1.0
+
+    def __init__(
+        self,
+        path: Optional[str] = None,
+        max_attempts: Optional[int] = None,
+        retry_base_ms: Optional[float] = None,
+        shutdown_timeout: Optional[float] = None,
+        lease_seconds: Optional[float] = None
+    ):
+        """
+        Initialize Persistence Queue
+
+        Args:
+            path: SQLite ファイルのパス
+            max_attempts: 最大試行回数（超えたジョブは "dead" になる）
+            retry_base_ms: リトライ間隔の初期値（ミリ秒）
+            shutdown_timeout: stop() で反映を待つ最大秒数
+            lease_seconds: 反映中のジョブのリース期間（秒, 期限切れのジョブは他のワーカーが再実行する）
+        """
+        self.path = path or os.getenv('PERSISTENCE_QUEUE_PATH', 'persistence_queue.sqlite3')
+        self.max_attempts = max_attempts if max_attempts is not None else int(os.getenv('PERSISTENCE_QUEUE_MAX_ATTEMPTS', '8'))
+        self.retry_base_seconds = (retry_base_ms if retry_base_ms is not None else float(os.getenv('PERSISTENCE_QUEUE_RETRY_BASE_MS', '500'))) / 1000
+        self.shutdown_timeout = shutdown_timeout if shutdown_timeout is not None else float(os.getenv('PERSISTENCE_QUEUE_SHUTDOWN_TIMEOUT', '10'))
+        self.lease_seconds = lease_seconds if lease_seconds is not None else float(os.getenv('PERSISTENCE_QUEUE_LEASE_SECONDS', '120'))
+
+        # kind -> ジョブを反映する関数（payload を受け取り、失敗時は例外を送出する）
+        self._handlers: Dict[str, Callable[[Dict[str, Any]], Any]] = {}
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stopping = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self.completed = 0
+        self.failures = 0
+        self.dead = 0
+        self.lease_conflicts = 0
+        self.leases_expired = 0
+        self.last_commit_ms: Optional[float] = None
+
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS jobs (
+                    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+                    key TEXT NOT NULL UNIQUE,
+                    kind TEXT NOT NULL,
+                    payload TEXT NOT NULL,
+                    status TEXT NOT NULL DEFAULT 'pending',
+                    attempts INTEGER NOT NULL DEFAULT 0,
+                    next_attempt_at REAL NOT NULL,
+                    last_error TEXT,
+                    created_at REAL NOT NULL,
+                    lease_until REAL
+                )
+            """)
+            # リース導入前に作成されたファイルには lease_until 列を追加する
+            columns = [row[1] for row in conn.execute("PRAGMA table_info(jobs)")]
+            if 'lease_until' not in columns:
+                conn.execute("ALTER TABLE jobs ADD COLUMN lease_until REAL")
+            conn.execute("CREATE INDEX IF NOT EXISTS jobs_pending ON jobs (status, next_attempt_at)")
+
+    @contextmanager
+    def _connect(self) -> Iterator[sqlite3.Connection]:
+        """トランザクション単位の接続（正常終了でコミットして閉じる）"""
+        conn = sqlite3.connect(self.path, timeout=5.0)
+        try:
+            # WAL + NORMAL: プロセスのクラッシュではコミット済みのジョブを失わない
+            conn.execute("PRAGMA synchronous=NORMAL")
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def register_handler(self, kind: str, handler: Callable[[Dict[str, Any]], Any]):
+        """
+        ジョブの種類ごとの反映処理を登録
+
+        Args:
+            kind: ジョブの種類
+            handler: payload を受け取って書き込む関数（失敗時は例外を送出）
+        """
+        self._handlers[kind] = handler
+
+    def enqueue(self, kind: str, key: str, payload: Dict[str, Any]) -> bool:
+        """
+        ジョブを SQLite に記録（ブロッキング, イベントループからは asyncio.to_thread で呼び出す）
+
+        Args:
+            kind: ジョブの種類（register_handler で登録したもの）
+            key: 冪等キー（同じ key のジョブは1回だけ記録される）
+            payload: JSON にシリアライズできる引数
+
+        Returns:
+            bool: 新しく記録した場合 True（同じ key が既にある場合 False）
+        """
+        if kind not in self._handlers:
+            raise ValueError(f"No handler registered for job kind: {kind}")
+        now = time.time()
+        with self._connect() as conn:
+            cursor = conn.execute(
+                "INSERT OR IGNORE INTO jobs (key, kind, payload, next_attempt_at, created_at) VALUES (?, ?, ?, ?, ?)",
+                (key, kind, json.dumps(payload, ensure_ascii=False), now, now)
+            )
+        self._wake.set()
+        return cursor.rowcount == 1
+
+    def start(self):
+        """ワーカースレッドを開始（前回のプロセスで残ったジョブも反映する）"""
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stopping.clear()
+        self._release_expired_leases()
+        self._thread = threading.Thread(target=self._run, name="persistence-queue", daemon=True)
+        self._thread.start()
+        print(f"[PersistenceQueue] Started ({self.path}, {self.pending_count()} pending)")
+
+    def stop(self):
+        """
+        残りのジョブを反映してワーカーを停止（ブロッキング, 最大 shutdown_timeout 秒）
+
+        反映できなかったジョブは SQLite に残り、次回の start() で再実行されます。
+        """
+        if self._thread is None:
+            return
+        self._stopping.set()
+        self._wake.set()
+        self._thread.join(self.shutdown_timeout)
+        remaining = self.pending_count()
+        if remaining:
+            print(f"[PersistenceQueue] Stopped with {remaining} pending jobs (will resume on next start)")
+        else:
+            print("[PersistenceQueue] Stopped (all jobs flushed)")
+        self._thread = None
+
+    def _run(self):
+        flush_deadline = None
+        flushed_seq = 0
+        next_lease_check = time.monotonic() + self.lease_seconds
+        while True:
+            if self._stopping.is_set() and flush_deadline is None:
+                flush_deadline = time.monotonic() + self.shutdown_timeout
+                flushed_seq = 0
+            if flush_deadline is not None and time.monotonic() >= flush_deadline:
+                return
+
+            self._wake.clear()
+            try:
+                if flush_deadline is None and time.monotonic() >= next_lease_check:
+                    # 他のプロセスが反映中に落ちたジョブを 'pending' に戻す
+                    self._release_expired_leases()
+                    next_lease_check = time.monotonic() + self.lease_seconds
+                if flush_deadline is None:
+                    job = self._claim_next_job()
+                else:
+                    # シャットダウン中はバックオフを待たずに、残りのジョブを1回ずつ反映する
+                    job = self._claim_next_job(after_seq=flushed_seq)
+                if job is None:
+                    if flush_deadline is not None:
+                        return
+                    self._wake.wait(self._seconds_until_next_attempt())
+                    continue
+
+                if flush_deadline is not None:
+                    flushed_seq = job[0]
+                self._process(job)
+            except Exception as e:
+                # SQLite の一時的なエラーなどでワーカーを止めない
+                print(f"[PersistenceQueue] Worker error: {type(e).__name__}: {e}")
+                self._wake.wait(self.POLL_INTERVAL_SECONDS)
+
+    def _claim_next_job(self, after_seq: Optional[int] = None) -> Optional[tuple]:
+        """
+        次に反映するジョブを取得してリースする（after_seq を指定した場合はバックオフを無視して seq の順に返す）
+
+        SELECT と UPDATE の間に他のプロセスが同じジョブを取得した場合は、UPDATE の rowcount が 0 になるので次のジョブを探す
+        """
+        while True:
+            with self._connect() as conn:
+                if after_seq is not None:
+                    job = conn.execute(
+                        "SELECT seq, key, kind, payload, attempts FROM jobs "
+                        "WHERE status = 'pending' AND seq > ? ORDER BY seq LIMIT 1",
+                        (after_seq,)
+                    ).fetchone()
+                else:
+                    job = conn.execute(
+                        "SELECT seq, key, kind, payload, attempts FROM jobs "
+                        "WHERE status = 'pending' AND next_attempt_at <= ? ORDER BY seq LIMIT 1",
+                        (time.time(),)
+                    ).fetchone()
+                if job is None:
+                    return None
+                cursor = conn.execute(
+                    "UPDATE jobs SET status = 'running', lease_until = ? WHERE seq = ? AND status = 'pending'",
+                    (time.time() + self.lease_seconds, job[0])
+                )
+            if cursor.rowcount == 1:
+                return job
+            with self._lock:
+                self.lease_conflicts += 1
+
+    def _release_expired_leases(self) -> int:
+        """
+        リースの期限が切れたジョブ（反映中にプロセスが落ちたもの）を 'pending' に戻す
+
+        試行回数に数え、max_attempts に達したジョブは "dead" にする（プロセスを落とすジョブを繰り返さない）
+
+        Returns:
+            int: 戻したジョブの数
+        """
+        with self._connect() as conn:
+            cursor = conn.execute(
+                "UPDATE jobs SET status = CASE WHEN attempts + 1 >= ? THEN 'dead' ELSE 'pending' END, "
+                "attempts = attempts + 1, next_attempt_at = ?, lease_until = NULL, last_error = 'LeaseExpired' "
+                "WHERE status = 'running' AND lease_until <= ?",
+                (self.max_attempts, time.time(), time.time())
+            )
+        released = cursor.rowcount
+        if released:
+            with self._lock:
+                self.leases_expired += released
+            print(f"[PersistenceQueue] Released {released} jobs with expired leases")
+        return released
+
+    def _seconds_until_next_attempt(self) -> float:
+        """次のリトライまでの秒数（最大 POLL_INTERVAL_SECONDS）"""
+        with self._connect() as conn:
+            next_attempt_at = conn.execute(
+                "SELECT MIN(next_attempt_at) FROM jobs WHERE status = 'pending'"
+            ).fetchone()[0]
+        if next_attempt_at is None:
+            return self.POLL_INTERVAL_SECONDS
+        return min(max(next_attempt_at - time.time(), 0.0), self.POLL_INTERVAL_SECONDS)
+
+    def _process(self, job: tuple) -> bool:
+        seq, key, kind, payload, attempts = job
+        start = time.perf_counter()
+        try:
+            self._handlers[kind](json.loads(payload))
+        except Exception as e:
+            attempts += 1
+            status = 'dead' if attempts >= self.max_attempts else 'pending'
+            delay = min(self.retry_base_seconds * (2 ** (attempts - 1)), self.MAX_RETRY_DELAY_SECONDS)
+            with self._connect() as conn:
+                conn.execute(
+                    "UPDATE jobs SET status = ?, attempts = ?, next_attempt_at = ?, last_error = ?, lease_until = NULL WHERE seq = ?",
+                    (status, attempts, time.time() + delay, f"{type(e).__name__}: {e}", seq)
+                )
+            with self._lock:
+                self.failures += 1
+                if status == 'dead':
+                    self.dead += 1
+            print(f"[PersistenceQueue] {kind} {key} failed (attempt {attempts}/{self.max_attempts}"
+                  f"{', giving up' if status == 'dead' else f', retry in {delay:.1f}s'}): {e}")
+            return False
+
+        with self._connect() as conn:
+            conn.execute("DELETE FROM jobs WHERE seq = ?", (seq,))
+        with self._lock:
+            self.completed += 1
+            self.last_commit_ms = (time.perf_counter() - start) * 1000
+        return True
+
+    def pending_count(self) -> int:
+        """未反映のジョブ数（他のワーカーが反映中のものを含む）"""
+        with self._connect() as conn:
+            return conn.execute("SELECT COUNT(*) FROM jobs WHERE status IN ('pending', 'running')").fetchone()[0]
+
+    def stats(self) -> Dict:
+        """キューの統計を取得"""
+        with self._connect() as conn:
+            pending, oldest = conn.execute(
+                "SELECT COUNT(*), MIN(created_at) FROM jobs WHERE status = 'pending'"
+            ).fetchone()
+            leased = conn.execute("SELECT COUNT(*) FROM jobs WHERE status = 'running'").fetchone()[0]
+            dead_jobs = [
+                {"key": key, "kind": kind, "attempts": attempts, "last_error": last_error}
+                for key, kind, attempts, last_error in conn.execute(
+                    "SELECT key, kind, attempts, last_error FROM jobs WHERE status = 'dead' ORDER BY seq DESC LIMIT 20"
+                )
+            ]
+        with self._lock:
+            return {
+                "path": self.path,
+                "running": self._thread is not None and self._thread.is_alive(),
+                "pending": pending,
+                "leased": leased,
+                "oldest_pending_age_seconds": round(time.time() - oldest, 1) if oldest else None,
+                "completed": self.completed,
+                "failures": self.failures,
+                "dead": self.dead,
+                "lease_conflicts": self.lease_conflicts,
+                "leases_expired": self.leases_expired,
+                "last_commit_ms": round(self.last_commit_ms, 1) if self.last_commit_ms is not None else None,
+                "dead_jobs": dead_jobs
+            }
+
+
+# グローバルインスタンス（シングルトンパターン）
+_persistence_queue = None
+
+
+def get_persistence_queue() -> PersistenceQueue:
+    """
+    PersistenceQueueのグローバルインスタンスを取得
+
+    Returns:
+        PersistenceQueue: シングルトンインスタンス
+    """
+    global _persistence_queue
+    if _persistence_queue is None:
+        _persistence_queue = PersistenceQueue()
+    return _persistence_queue
@@ -4,6 +4,7 @@ Prompt Loader Utility
 テキストファイルからプロンプトを読み込むユーティリティ
 """
 
+import hashlib
 import os
 from pathlib import Path
 from typing import Dict
@@ -80,6 +81,20 @@ class PromptLoader:
         template = self.load(prompt_name)
         return template.format(**kwargs)
 
+    def version(self, prompt_name: str) -> str:
+        """
+        プロンプトのバージョン（内容のハッシュ）を取得
+
+        プロンプトファイルを編集するとバージョンが変わるため、生成結果のキャッシュキーに使用します。
+
+        Args:
+            prompt_name: プロンプトファイル名（拡張子なし）
+
+        Returns:
+            str: プロンプト内容の SHA-256（先頭12文字）
+        """
+        return hashlib.sha256(self.load(prompt_name).encode("utf-8")).hexdigest()[:12]
+
     def clear_cache(self):
         """キャッシュをクリア"""
         self._cache.clear()
@@ -0,0 +1,250 @@
+"""
+Token Bucket Rate Limiter
+
+外部API呼び出しのレート制限を行うトークンバケット実装です。
+
+- TokenBucket: プロセス内で共有するバケット
+- FileLockTokenBucket: 同一ホストの複数ワーカープロセスで共有するバケット（ファイルロック）
+
+環境変数（Yahoo Shopping API用）:
+    YAHOO_RATE_LIMIT_QPS: 1秒あたりの最大リクエスト数（0 または未設定で無効）
+    YAHOO_RATE_LIMIT_BURST: バケット容量（デフォルト: QPSと同じ）
+    YAHOO_RATE_LIMIT_MODE: "process"（プロセス単位）または "host"（ホスト内の全ワーカーで共有）
+    YAHOO_RATE_LIMIT_STATE_FILE: host モードの状態ファイル（デフォルト: /tmp/irodori_yahoo_rate_limit.state）
+"""
+
+import asyncio
+import fcntl
+import os
+import struct
+import threading
+import time
+from typing import Optional
+
+
+class BaseTokenBucket:
+    """トークンバケットの共通処理（待機・非同期待機）"""
+
+    # _take / drain がブロッキングする（ファイルロック等）場合 True: 非同期版はスレッドで実行する
+    BLOCKING_IO = False
+
+    def __init__(self, rate: float, capacity: Optional[float] = None):
+        """
+        Initialize Token Bucket
+
+        Args:
+            rate: 1秒あたりに補充されるトークン数
+            capacity: バケット容量（バースト許容量）
+        """
+        if rate <= 0:
+            raise ValueError("rate must be positive")
+        self.rate = float(rate)
+        self.capacity = float(capacity) if capacity else max(1.0, float(rate))
+
+    def _take(self, tokens: float) -> float:
+        """
+        トークンを取得する
+
+        Returns:
+            float: 0.0 なら取得成功、正の値ならトークンが溜まるまでの待機秒数
+        """
+        raise NotImplementedError
+
+    async def _take_async(self, tokens: float) -> float:
+        if self.BLOCKING_IO:
+            return await asyncio.to_thread(self._take, tokens)
+        return self._take(tokens)
+
+    def _refill(self, current: float, last: float, now: float) -> float:
+        return min(self.capacity, current + max(0.0, now - last) * self.rate)
+
+    def try_acquire(self, tokens: float = 1.0) -> bool:
+        """待機せずにトークンを取得（取得できなければ False）"""
+        return self._take(tokens) == 0.0
+
+    async def try_acquire_async(self, tokens: float = 1.0) -> bool:
+        """try_acquire の非同期版（イベントループをブロックしない）"""
+        return await self._take_async(tokens) == 0.0
+
+    def acquire(self, tokens: float = 1.0, timeout: Optional[float] = None) -> bool:
+        """
+        トークンが取得できるまで待機（ブロッキング）
+
+        Args:
+            tokens: 必要なトークン数
+            timeout: 最大待機秒数（None で無制限）
+
+        Returns:
+            bool: 取得できた場合 True、タイムアウトした場合 False
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            wait = self._take(tokens)
+            if wait == 0.0:
+                return True
+            if deadline is not None:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0 or wait > remaining:
+                    return False
+            time.sleep(wait)
+
+    async def acquire_async(self, tokens: float = 1.0, timeout: Optional[float] = None) -> bool:
+        """
+        トークンが取得できるまで待機（イベントループをブロックしない）
+
+        Args:
+            tokens: 必要なトークン数
+            timeout: 最大待機秒数（None で無制限）
+
+        Returns:
+            bool: 取得できた場合 True、タイムアウトした場合 False
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            wait = await self._take_async(tokens)
+            if wait == 0.0:
+                return True
+            if deadline is not None:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0 or wait > remaining:
+                    return False
+            await asyncio.sleep(wait)
+
+    def drain(self):
+        """バケットを空にする（上流から 429 を受けた場合など）"""
+        raise NotImplementedError
+
+    async def drain_async(self):
+        """drain の非同期版（イベントループをブロックしない）"""
+        if self.BLOCKING_IO:
+            await asyncio.to_thread(self.drain)
+        else:
+            self.drain()
+
+
+class TokenBucket(BaseTokenBucket):
+    """プロセス内で共有するトークンバケット（スレッドセーフ）"""
+
+    def __init__(self, rate: float, capacity: Optional[float] = None):
+        super().__init__(rate, capacity)
+        self._lock = threading.Lock()
+        self._tokens = self.capacity
+        self._last = time.monotonic()
+
+    def _take(self, tokens: float) -> float:
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = self._refill(self._tokens, self._last, now)
+            self._last = now
+            if self._tokens >= tokens:
+                self._tokens -= tokens
+                return 0.0
+            return (tokens - self._tokens) / self.rate
+
+    def drain(self):
+        with self._lock:
+            self._tokens = 0.0
+            self._last = time.monotonic()
+
+
+class FileLockTokenBucket(BaseTokenBucket):
+    """
+    同一ホストの複数ワーカープロセスで共有するトークンバケット
+
+    状態（残トークン数, 最終更新時刻）を小さなファイルに保存し、fcntl.flock で排他制御します。
+    flock とファイル I/O はブロッキングのため、非同期版（acquire_async 等）はスレッドで実行します。
+    """
+
+    BLOCKING_IO = True
+    _STATE_FORMAT = "dd"  # tokens, last (wall clock)
+
+    def __init__(self, rate: float, capacity: Optional[float] = None, state_file: str = "/tmp/irodori_rate_limit.state"):
+        super().__init__(rate, capacity)
+        self.state_file = state_file
+        # プロセス内のスレッド間は threading.Lock、プロセス間は flock で保護
+        self._thread_lock = threading.Lock()
+
+    def _update(self, tokens: float, drain: bool = False) -> float:
+        size = struct.calcsize(self._STATE_FORMAT)
+        with self._thread_lock:
+            fd = os.open(self.state_file, os.O_RDWR | os.O_CREAT, 0o644)
+            try:
+                fcntl.flock(fd, fcntl.LOCK_EX)
+                raw = os.pread(fd, size, 0)
+                now = time.time()
+                if len(raw) == size:
+                    current, last = struct.unpack(self._STATE_FORMAT, raw)
+                    current = self._refill(current, last, now)
+                else:
+                    current = self.capacity
+
+                if drain:
+                    current = 0.0
+                    wait = 0.0
+                elif current >= tokens:
+                    current -= tokens
+                    wait = 0.0
+                else:
+                    wait = (tokens - current) / self.rate
+
+                os.pwrite(fd, struct.pack(self._STATE_FORMAT, current, now), 0)
+                return wait
+            finally:
+                fcntl.flock(fd, fcntl.LOCK_UN)
+                os.close(fd)
+
+    def _take(self, tokens: float) -> float:
+        return self._update(tokens)
+
+    def drain(self):
+        self._update(0.0, drain=True)
+
+
+def create_token_bucket(
+    rate: float,
+    capacity: Optional[float] = None,
+    mode: str = "process",
+    state_file: Optional[str] = None
+) -> BaseTokenBucket:
+    """
+    モードに応じたトークンバケットを生成
+
+    Args:
+        rate: 1秒あたりのトークン補充数
+        capacity: バケット容量
+        mode: "process" または "host"
+        state_file: host モードの状態ファイル
+
+    Returns:
+        BaseTokenBucket: トークンバケット
+    """
+    if mode == "host":
+        return FileLockTokenBucket(rate, capacity, state_file or "/tmp/irodori_rate_limit.state")
+    if mode != "process":
+        print(f"[RateLimiter] Unknown mode '{mode}', falling back to per-process bucket")
+    return TokenBucket(rate, capacity)
+
+
+# グローバルインスタンス（シングルトンパターン）
+_yahoo_rate_limiter = None
+_yahoo_rate_limiter_loaded = False
+
+
+def get_yahoo_rate_limiter() -> Optional[BaseTokenBucket]:
+    """
+    Yahoo Shopping API 用のトークンバケットを取得
+
+    Returns:
+        BaseTokenBucket or None: レート制限が無効な場合は None
+    """
+    global _yahoo_rate_limiter, _yahoo_rate_limiter_loaded
+    if not _yahoo_rate_limiter_loaded:
+        qps = float(os.getenv('YAHOO_RATE_LIMIT_QPS', '0') or 0)
+        if qps > 0:
+            burst = float(os.getenv('YAHOO_RATE_LIMIT_BURST', '0') or 0) or None
+            mode = os.getenv('YAHOO_RATE_LIMIT_MODE', 'process')
+            state_file = os.getenv('YAHOO_RATE_LIMIT_STATE_FILE', '/tmp/irodori_yahoo_rate_limit.state')
+            _yahoo_rate_limiter = create_token_bucket(qps, burst, mode, state_file)
+            print(f"[RateLimiter] Yahoo Shopping API limited to {qps} req/s (burst: {_yahoo_rate_limiter.capacity}, mode: {mode})")
+        _yahoo_rate_limiter_loaded = True
+    return _yahoo_rate_limiter
@@ -0,0 +1,113 @@
+"""
+Recommend Reasons Cache
+
+/recommend-coordinates のレコメンド理由（Gemini 生成）を、コーディネートの組み合わせごとにキャッシュします。
+入力はカタログ（静的な CSV）の coordinate_review のみなので、同じ組み合わせであれば結果を再利用できます。
+
+キー: (ソート済みの (コーディネートID, レビュー本文のハッシュ) タプル, プロンプトのバージョン)
+  - 並び順に依存しない
+  - men / women の CSV で ID が重複しても、レビュー本文で区別される
+  - プロンプトファイルやカタログを編集すると別のキーになる
+
+環境変数:
+    RECOMMEND_REASONS_CACHE_MAX_ENTRIES: 最大エントリ数（デフォルト: 5000, 0 で無効）
+"""
+
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+from typing import Dict, List, Optional
+
+from models import CoordinateItem
+from prompt_loader import get_prompt_loader
+
+
+class RecommendReasonsCache:
+    """コーディネートの組み合わせ → レコメンド理由 のキャッシュ（LRU, スレッドセーフ）"""
+
+    PROMPT_NAME = "generate_recommend_reasons"
+
+    def __init__(self, max_entries: Optional[int] = None):
+        """
+        Initialize Recommend Reasons Cache
+
+        Args:
+            max_entries: 最大エントリ数
+        """
+        self.max_entries = max_entries if max_entries is not None else int(os.getenv('RECOMMEND_REASONS_CACHE_MAX_ENTRIES', '5000'))
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[tuple, str]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def key(self, coordinates: List[CoordinateItem]) -> tuple:
+        """
+        キャッシュキーを作成
+
+        Args:
+            coordinates: コーディネートのリスト（最大3件が生成に使われる）
+
+        Returns:
+            tuple: キャッシュキー
+        """
+        members = tuple(sorted(
+            (coord.id, hashlib.sha1((coord.coordinate_review or "").encode("utf-8")).hexdigest()[:10])
+            for coord in coordinates[:3]
+        ))
+        return (members, get_prompt_loader().version(self.PROMPT_NAME))
+
+    def get(self, coordinates: List[CoordinateItem]) -> Optional[str]:
+        """キャッシュ済みのレコメンド理由を取得（なければ None）"""
+        key = self.key(coordinates)
+        with self._lock:
+            reasons = self._entries.get(key)
+            if reasons is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return reasons
+
+    def set(self, coordinates: List[CoordinateItem], reasons: str):
+        """生成に成功したレコメンド理由を保存"""
+        if not reasons or self.max_entries <= 0:
+            return
+        key = self.key(coordinates)
+        with self._lock:
+            self._entries[key] = reasons
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def contains(self, coordinates: List[CoordinateItem]) -> bool:
+        """キャッシュ済みかどうか（統計には含めない）"""
+        key = self.key(coordinates)
+        with self._lock:
+            return key in self._entries
+
+    def stats(self) -> Dict:
+        """キャッシュ統計を取得"""
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "hits": self.hits,
+                "misses": self.misses
+            }
+
+
+# グローバルインスタンス（シングルトンパターン）
+_recommend_reasons_cache = None
+
+
+def get_recommend_reasons_cache() -> RecommendReasonsCache:
+    """
+    RecommendReasonsCacheのグローバルインスタンスを取得
+
+    Returns:
+        RecommendReasonsCache: キャッシュインスタンス
+    """
+    global _recommend_reasons_cache
+    if _recommend_reasons_cache is None:
+        _recommend_reasons_cache = RecommendReasonsCache()
+    return _recommend_reasons_cache
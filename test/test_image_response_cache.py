@@ -0,0 +1,77 @@
+#!/usr/bin/env python3
+"""
+画像レスポンスキャッシュのキーの確認
+
+同じ構図で色だけが違うコーディネート（dHash が一致する）や、他のユーザーの同じ写真で
+キャッシュ済みの結果が返らないことを確認します。
+
+使用方法:
+    python3 test/test_image_response_cache.py
+    python -m pytest test/test_image_response_cache.py
+"""
+
+import os
+import sys
+from io import BytesIO
+
+# プロジェクトルートをパスに追加
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(project_root)
+
+from PIL import Image, ImageDraw
+
+from gemini_service import GeminiService
+from image_pipeline import ImagePipeline
+from image_response_cache import ImageResponseCache
+
+
+def draw_outfit(top_color: tuple, bottom_color: tuple) -> bytes:
+    """同じ構図（トップス・ボトムス）のコーディネート画像を作成"""
+    image = Image.new("RGB", (360, 640), (235, 235, 235))
+    draw = ImageDraw.Draw(image)
+    draw.rectangle((90, 80, 270, 330), fill=top_color)
+    draw.rectangle((120, 330, 240, 600), fill=bottom_color)
+    buffer = BytesIO()
+    image.save(buffer, format="JPEG", quality=90)
+    return buffer.getvalue()
+
+
+def cache_get(cache: ImageResponseCache, prompt_name: str, image) -> dict:
+    return cache.get(GeminiService._image_cache_namespace(prompt_name, image), image.perceptual_hash)
+
+
+def cache_set(cache: ImageResponseCache, prompt_name: str, image, value: dict):
+    cache.set(GeminiService._image_cache_namespace(prompt_name, image), image.perceptual_hash, value)
+
+
+def test_same_layout_different_colors_do_not_collide():
+    """赤トップス/ネイビーボトムスと緑トップス/ブラウンボトムスは dHash が一致しても別のエントリになる"""
+    pipeline = ImagePipeline()
+    red_navy = pipeline.prepare(draw_outfit((200, 30, 30), (20, 30, 90)), cache_scope="user-a")
+    green_brown = pipeline.prepare(draw_outfit((30, 140, 40), (110, 70, 30)), cache_scope="user-a")
+    print(f"dHash distance: {ImageResponseCache.hamming_distance(red_navy.perceptual_hash, green_brown.perceptual_hash)}")
+
+    for max_distance in (0, 4):
+        cache = ImageResponseCache(ttl_seconds=60, max_distance=max_distance, max_entries=10)
+        cache_set(cache, "extract_coordinate_items", red_navy, {"items": [{"color": "red"}, {"color": "navy"}]})
+        assert cache_get(cache, "extract_coordinate_items", green_brown) is None
+        assert cache_get(cache, "extract_coordinate_items", red_navy) is not None
+
+
+def test_same_image_is_not_shared_across_users():
+    """同じ写真でも他のユーザーのキャッシュは返さない"""
+    pipeline = ImagePipeline()
+    image_data = draw_outfit((200, 30, 30), (20, 30, 90))
+    user_a = pipeline.prepare(image_data, cache_scope="user-a")
+    user_b = pipeline.prepare(image_data, cache_scope="user-b")
+
+    cache = ImageResponseCache(ttl_seconds=60, max_distance=0, max_entries=10)
+    cache_set(cache, "generate_fashion_review_combined", user_a, {"ai_catchphrase": "user-a"})
+    assert cache_get(cache, "generate_fashion_review_combined", user_b) is None
+    assert cache_get(cache, "generate_fashion_review_combined", pipeline.prepare(image_data, cache_scope="user-a")) == {"ai_catchphrase": "user-a"}
+
+
+if __name__ == "__main__":
+    test_same_layout_different_colors_do_not_collide()
+    test_same_image_is_not_shared_across_users()
+    print("=== Image response cache test passed ===")
@@ -129,13 +129,16 @@ def test_service():
     print(f"    自己スコア: {result['self_score']}")
     print(f"    社会スコア: {result['social_score']}")
 
-    # テスト7: キャッシュの確認
+    # テスト7: マスターデータのスナップショットの確認
     print("\n" + "=" * 70)
-    print("[テスト7] キャッシュ機能の確認")
+    print("[テスト7] マスターデータのスナップショットの確認")
     print("=" * 70)
 
-    print(f"  キャッシュされているタイプコード: {list(service._master_cache.keys())}")
-    print(f"  ✅ 2回目以降のget_type_name呼び出しはキャッシュから取得されます")
+    from master_data import get_master_data_store
+    master_data_stats = get_master_data_store().stats()
+    print(f"  読み込み済みの件数: {master_data_stats['counts']}")
+    print(f"  バージョン: {master_data_stats['version']}")
+    print(f"  ✅ get_type_name 等はプロセス全体で共有するスナップショットから取得されます（Firestoreは読み込み時のみ）")
 
     # 結果サマリー
     print("\n" + "=" * 70)
@@ -146,7 +149,7 @@ def test_service():
     print("  1. TYPE_NAMES ハードコーディングを削除")
     print("  2. get_type_name が Firestore マスターから取得")
     print("  3. get_type_master, get_group_info, get_all_questions, get_axes_info メソッドを追加")
-    print("  4. マスターデータのキャッシュ機能を実装")
+    print("  4. マスターデータをプロセス全体のスナップショット（master_data.py）から参照")
     print("\nこれにより、APIから動的にマスターデータを参照できるようになりました。")
 
 
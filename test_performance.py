@@ -1,40 +1,59 @@
+"""
+/recommend-coordinates のパフォーマンス計測スクリプト
+
+Yahoo Shopping API を使わずに再現性のある計測を行う場合は、fake_yahoo_server.py を起動し、
+APIサーバーを YAHOO_SHOPPING_BASE_URL で擬似サーバーに向けてから実行してください。
+
+使用方法:
+    python fake_yahoo_server.py --port 8090 --latency lognormal:80:0.5 --seed 1
+    YAHOO_SHOPPING_BASE_URL=http://localhost:8090/ShoppingWebService/V3/itemSearch uvicorn main:app --port 8000
+    python test_performance.py --requests 50 --concurrency 10
+"""
+
+import argparse
 import asyncio
 import aiohttp
 import time
 import json
 
-async def test_recommend_coordinates():
-    url = "http://localhost:8000/recommend-coordinates"
+async def test_recommend_coordinates(url="http://localhost:8000/recommend-coordinates", session=None, verbose=True):
     headers = {"Content-Type": "application/json"}
     data = {"gender": "men"}
     
     start_time = time.time()
     
-    async with aiohttp.ClientSession() as session:
+    own_session = session is None
+    if own_session:
+        session = aiohttp.ClientSession()
+    try:
         async with session.post(url, json=data, headers=headers) as response:
             result = await response.json()
             elapsed_time = time.time() - start_time
-            
-            print(f"\n=== Performance Test Result ===")
-            print(f"Status Code: {response.status}")
-            print(f"Response Time: {elapsed_time:.2f} seconds")
-            print(f"Number of coordinates: {len(result.get('coordinates', []))}")
-            
-            # 各コーディネートのアフィリエイト商品数を確認
-            for i, coord in enumerate(result.get('coordinates', [])):
-                tops_count = len(coord.get('affiliate_tops', []))
-                bottoms_count = len(coord.get('affiliate_bottoms', []))
-                print(f"Coordinate {i+1}: {tops_count} tops, {bottoms_count} bottoms")
-            
+
+            if verbose:
+                print(f"\n=== Performance Test Result ===")
+                print(f"Status Code: {response.status}")
+                print(f"Response Time: {elapsed_time:.2f} seconds")
+                print(f"Number of coordinates: {len(result.get('coordinates', []))}")
+
+                # 各コーディネートのアフィリエイト商品数を確認
+                for i, coord in enumerate(result.get('coordinates', [])):
+                    tops_count = len(coord.get('affiliate_tops', []))
+                    bottoms_count = len(coord.get('affiliate_bottoms', []))
+                    print(f"Coordinate {i+1}: {tops_count} tops, {bottoms_count} bottoms")
+
             return elapsed_time
+    finally:
+        if own_session:
+            await session.close()
 
-async def run_multiple_tests(n=3):
+async def run_multiple_tests(n=3, url="http://localhost:8000/recommend-coordinates"):
     print(f"Running {n} tests...")
     times = []
     
     for i in range(n):
         print(f"\nTest {i+1}:")
-        elapsed = await test_recommend_coordinates()
+        elapsed = await test_recommend_coordinates(url)
         times.append(elapsed)
         
         # 次のテストまで少し待つ
@@ -46,11 +65,49 @@ async def run_multiple_tests(n=3):
     print(f"Min response time: {min(times):.2f} seconds")
     print(f"Max response time: {max(times):.2f} seconds")
 
+async def run_load_test(total, concurrency, url="http://localhost:8000/recommend-coordinates"):
+    print(f"Running load test: {total} requests, concurrency {concurrency}...")
+    semaphore = asyncio.Semaphore(concurrency)
+    times = []
+    errors = 0
+
+    async with aiohttp.ClientSession() as session:
+        async def one():
+            nonlocal errors
+            async with semaphore:
+                try:
+                    times.append(await test_recommend_coordinates(url, session=session, verbose=False))
+                except Exception as e:
+                    errors += 1
+                    print(f"Request failed: {e}")
+
+        start_time = time.time()
+        await asyncio.gather(*[one() for _ in range(total)])
+        wall_time = time.time() - start_time
+
+    times.sort()
+    def percentile(p):
+        return times[min(len(times) - 1, int(len(times) * p))] if times else 0.0
+
+    print(f"\n=== Load Test Summary ===")
+    print(f"Completed: {len(times)}, Errors: {errors}")
+    print(f"Throughput: {len(times) / wall_time:.2f} req/s")
+    print(f"p50: {percentile(0.50):.3f}s, p95: {percentile(0.95):.3f}s, p99: {percentile(0.99):.3f}s, max: {times[-1] if times else 0:.3f}s")
+
 if __name__ == "__main__":
-    # 単一テスト
-    print("Testing /recommend-coordinates endpoint...")
-    asyncio.run(test_recommend_coordinates())
-    
-    # 複数回テスト
-    print("\n" + "="*50 + "\n")
-    asyncio.run(run_multiple_tests(3))
\ No newline at end of file
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--url", default="http://localhost:8000/recommend-coordinates")
+    parser.add_argument("--requests", type=int, default=0, help="負荷試験のリクエスト数（0の場合は従来の逐次テスト）")
+    parser.add_argument("--concurrency", type=int, default=10)
+    args = parser.parse_args()
+
+    if args.requests > 0:
+        asyncio.run(run_load_test(args.requests, args.concurrency, args.url))
+    else:
+        # 単一テスト
+        print("Testing /recommend-coordinates endpoint...")
+        asyncio.run(test_recommend_coordinates(args.url))
+
+        # 複数回テスト
+        print("\n" + "="*50 + "\n")
+        asyncio.run(run_multiple_tests(3, args.url))
@@ -2,20 +2,45 @@
 User Insight Service
 
 ユーザーのファッションタイプと動物占い結果からインサイトを生成します。
+
+最新のファッションタイプ・動物占いは users/{user_id}/latest/{kind}（latest_pointer.py）から1回の get で取得し、
+インサイト履歴・ファッションレビューは order_by + limit のクエリで必要な件数のみ読み込みます。
+generate_insight_async は3つの読み込みを並行して実行し、インサイトの保存は呼び出し側に任せます
+（/api/user-insight ではレスポンス送信後の BackgroundTasks で保存する）。
+以下の複合インデックスが必要です（未作成の場合はユーザーの全ドキュメントを読み込んでソートする）:
+    - user-insights: user_id (Ascending), generated_at (Descending)
+    - fashion-review: user_id (Ascending), created_at (Descending)
 """
 
 from datetime import datetime
-from typing import Dict, Optional
-import json
+from typing import Dict, Optional, Tuple
+import asyncio
 import uuid
 from firebase_admin import firestore
-from gemini_service import GeminiService
+from google.api_core.exceptions import FailedPrecondition
+from gemini_service import get_gemini_service
+from latest_pointer import LATEST_ANIMAL_FORTUNE, LATEST_FASHION_TYPE, get_latest
+from llm_metrics import get_llm_metrics
+from master_data import get_master_data_store
 from prompt_loader import get_prompt_loader
 
 
+# インサイト生成のレスポンススキーマ
+INSIGHT_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "insight": {"type": "string"}
+    },
+    "required": ["insight"]
+}
+
+
 class UserInsightService:
     """ユーザーインサイト生成サービス"""
 
+    # get_recent_fashion_reviews で読み込むフィールド
+    FASHION_REVIEW_FIELDS = ['id', 'date', 'ai_catchphrase', 'ai_review_comment', 'tags', 'item_types', 'created_at']
+
     def __init__(self, db):
         """
         Initialize User Insight Service
@@ -24,7 +49,7 @@ class UserInsightService:
             db: Firestore client instance
         """
         self.db = db
-        self.gemini_service = GeminiService()
+        self.gemini_service = get_gemini_service()
 
     def get_latest_fashion_type(self, user_id: str) -> Optional[Dict]:
         """
@@ -37,33 +62,16 @@ class UserInsightService:
             dict: ファッションタイプ診断結果 or None
         """
         try:
-            # fashion-typesコレクションからドキュメントを取得（インデックス不要）
-            docs = (
-                self.db.collection('fashion-types')
-                .where('user_id', '==', user_id)
-                .stream()
-            )
-
-            # Pythonでソートして最新を取得
-            all_docs = []
-            for doc in docs:
-                data = doc.to_dict()
-                data['doc_id'] = doc.id
-                all_docs.append(data)
-
-            if not all_docs:
+            # users/{user_id}/latest/fashion-type から最新の診断結果を取得
+            latest_data = get_latest(self.db, user_id, LATEST_FASHION_TYPE)
+            if latest_data is None:
                 return None
 
-            # created_atでソート（降順）
-            all_docs.sort(key=lambda x: x.get('created_at', ''), reverse=True)
-            latest_data = all_docs[0]
-
             # type_codeからマスターデータを取得
             type_code = latest_data.get('type_code')
             if type_code:
-                master_doc = self.db.collection('fashion-type-master').document(type_code).get()
-                if master_doc.exists:
-                    master_data = master_doc.to_dict()
+                master_data = get_master_data_store().get(self.db).fashion_types.get(type_code)
+                if master_data is not None:
                     return {
                         'type_code': type_code,
                         'type_name': master_data.get('type_name'),
@@ -95,33 +103,16 @@ class UserInsightService:
             dict: 動物占い結果 or None
         """
         try:
-            # animal-fortunesコレクションからドキュメントを取得（インデックス不要）
-            docs = (
-                self.db.collection('animal-fortunes')
-                .where('user_id', '==', user_id)
-                .stream()
-            )
-
-            # Pythonでソートして最新を取得
-            all_docs = []
-            for doc in docs:
-                data = doc.to_dict()
-                data['doc_id'] = doc.id
-                all_docs.append(data)
-
-            if not all_docs:
+            # users/{user_id}/latest/animal-fortune から最新の占い結果を取得
+            latest_data = get_latest(self.db, user_id, LATEST_ANIMAL_FORTUNE)
+            if latest_data is None:
                 return None
 
-            # created_atでソート（降順）
-            all_docs.sort(key=lambda x: x.get('created_at', ''), reverse=True)
-            latest_data = all_docs[0]
-
             # animal_numberからマスターデータを取得
             animal_number = latest_data.get('animal_number')
             if animal_number:
-                master_doc = self.db.collection('animal-master').document(str(animal_number)).get()
-                if master_doc.exists:
-                    master_data = master_doc.to_dict()
+                master_data = get_master_data_store().get(self.db).animals.get(str(animal_number))
+                if master_data is not None:
                     return {
                         'animal_number': animal_number,
                         'animal': master_data.get('animal'),
@@ -173,15 +164,7 @@ class UserInsightService:
 
         # データが存在しない場合
         if not fashion_type and not animal_fortune:
-            return {
-                "status": "no_data",
-                "user_id": user_id,
-                "insight_id": None,
-                "fashion_type": None,
-                "animal_fortune": None,
-                "insight": "ファッションタイプ診断または動物占いを実施してください。",
-                "generated_at": datetime.now().isoformat()
-            }
+            return self._no_data_result(user_id)
 
         # 最近のファッションレビュー（過去7件）を取得
         fashion_reviews = self.get_recent_fashion_reviews(user_id, limit=7)
@@ -195,34 +178,85 @@ class UserInsightService:
             insight_text = self._generate_insight_with_gemini(prompt)
         except Exception as e:
             print(f"[UserInsight] Error generating insight: {e}")
+            get_llm_metrics().record_fallback("user_insight", e)
             insight_text = "インサイトの生成に失敗しました。もう一度お試しください。"
 
-        # インサイトIDを生成
-        insight_id = str(uuid.uuid4())
-        generated_at = datetime.now().isoformat()
+        result, insight_data = self._build_insight(user_id, fashion_type, animal_fortune, insight_text)
 
         # Firestoreに保存
-        try:
-            insight_data = {
-                "id": insight_id,
-                "user_id": user_id,
-                "fashion_type_code": fashion_type.get('type_code') if fashion_type else None,
-                "animal_number": animal_fortune.get('animal_number') if animal_fortune else None,
-                "insight": insight_text,
-                "generated_at": generated_at,
-                "created_at": firestore.SERVER_TIMESTAMP
-            }
+        self.save_insight(insight_data)
 
-            doc_ref = self.db.collection('user-insights').document(insight_id)
-            doc_ref.set(insight_data)
+        return result
+
+    async def generate_insight_async(self, user_id: str) -> Tuple[Dict, Optional[Dict]]:
+        """
+        ユーザーのインサイトを生成（保存は呼び出し側で行う）
+
+        ファッションタイプ・動物占い・最近のファッションレビューの読み込みを並行して実行し、
+        Gemini は非同期クライアントで呼び出します。
+
+        Args:
+            user_id: ユーザーID
+
+        Returns:
+            tuple: (generate_insight と同じ結果, save_insight に渡す保存用データ（データがない場合は None）)
+        """
+        # 3つの読み込みを並行して実行（レビューはデータがない場合は使わない）
+        fashion_type, animal_fortune, fashion_reviews = await asyncio.gather(
+            asyncio.to_thread(self.get_latest_fashion_type, user_id),
+            asyncio.to_thread(self.get_latest_animal_fortune, user_id),
+            asyncio.to_thread(self.get_recent_fashion_reviews, user_id, 7)
+        )
+
+        # データが存在しない場合
+        if not fashion_type and not animal_fortune:
+            return self._no_data_result(user_id), None
 
-            print(f"[UserInsight] Saved insight {insight_id} for user {user_id}")
+        print(f"[UserInsight] Retrieved {len(fashion_reviews)} fashion reviews for user {user_id}")
 
+        # Geminiプロンプト構築
+        prompt = self._build_insight_prompt(fashion_type, animal_fortune, fashion_reviews)
+
+        # Gemini APIでインサイト生成
+        try:
+            insight_text = await self._generate_insight_with_gemini_async(prompt)
         except Exception as e:
-            print(f"[UserInsight] Error saving insight to Firestore: {e}")
-            # 保存に失敗してもインサイトは返す
+            print(f"[UserInsight] Error generating insight: {e}")
+            get_llm_metrics().record_fallback("user_insight", e)
+            insight_text = "インサイトの生成に失敗しました。もう一度お試しください。"
 
+        return self._build_insight(user_id, fashion_type, animal_fortune, insight_text)
+
+    @staticmethod
+    def _no_data_result(user_id: str) -> Dict:
         return {
+            "status": "no_data",
+            "user_id": user_id,
+            "insight_id": None,
+            "fashion_type": None,
+            "animal_fortune": None,
+            "insight": "ファッションタイプ診断または動物占いを実施してください。",
+            "generated_at": datetime.now().isoformat()
+        }
+
+    @staticmethod
+    def _build_insight(user_id: str, fashion_type: Optional[Dict], animal_fortune: Optional[Dict], insight_text: str) -> Tuple[Dict, Dict]:
+        """レスポンス用の結果と Firestore 保存用データを作成"""
+        # インサイトIDを生成
+        insight_id = str(uuid.uuid4())
+        generated_at = datetime.now().isoformat()
+
+        insight_data = {
+            "id": insight_id,
+            "user_id": user_id,
+            "fashion_type_code": fashion_type.get('type_code') if fashion_type else None,
+            "animal_number": animal_fortune.get('animal_number') if animal_fortune else None,
+            "insight": insight_text,
+            "generated_at": generated_at,
+            "created_at": firestore.SERVER_TIMESTAMP
+        }
+
+        result = {
             "status": "success",
             "user_id": user_id,
             "insight_id": insight_id,
@@ -231,6 +265,23 @@ class UserInsightService:
             "insight": insight_text,
             "generated_at": generated_at
         }
+        return result, insight_data
+
+    def save_insight(self, insight_data: Dict):
+        """
+        インサイトを user-insights コレクションに保存（失敗してもインサイトは返すため例外は送出しない）
+
+        Args:
+            insight_data: _build_insight で作成した保存用データ
+        """
+        try:
+            doc_ref = self.db.collection('user-insights').document(insight_data['id'])
+            doc_ref.set(insight_data)
+
+            print(f"[UserInsight] Saved insight {insight_data['id']} for user {insight_data['user_id']}")
+
+        except Exception as e:
+            print(f"[UserInsight] Error saving insight to Firestore: {e}")
 
     def get_insight_history(self, user_id: str, limit: int = 10) -> list:
         """
@@ -244,14 +295,19 @@ class UserInsightService:
             list: インサイト履歴（新しい順）
         """
         try:
-            # user-insightsコレクションからユーザーのドキュメントを取得
-            docs = (
-                self.db.collection('user-insights')
-                .where('user_id', '==', user_id)
-                .stream()
-            )
+            # user-insightsコレクションから新しい順に limit 件のみ取得
+            query = self.db.collection('user-insights').where('user_id', '==', user_id)
+            try:
+                docs = list(
+                    query
+                    .order_by('generated_at', direction=firestore.Query.DESCENDING)
+                    .limit(limit)
+                    .stream()
+                )
+            except FailedPrecondition as e:
+                print(f"[UserInsight] Index (user_id, generated_at) for user-insights is missing, scanning all insights: {e}")
+                docs = sorted(query.stream(), key=lambda doc: doc.to_dict().get('generated_at') or '', reverse=True)[:limit]
 
-            # Pythonでソートして最新N件を取得
             all_docs = []
             for doc in docs:
                 data = doc.to_dict()
@@ -264,10 +320,7 @@ class UserInsightService:
                     "generated_at": data.get('generated_at')
                 })
 
-            # generated_atでソート（降順）
-            all_docs.sort(key=lambda x: x.get('generated_at', ''), reverse=True)
-
-            return all_docs[:limit]
+            return all_docs
 
         except Exception as e:
             print(f"[UserInsight] Error fetching insight history: {e}")
@@ -285,14 +338,23 @@ class UserInsightService:
             list: ファッションレビュー（新しい順）
         """
         try:
-            # fashion-reviewコレクションからユーザーのドキュメントを取得
-            docs = (
+            # fashion-reviewコレクションから新しい順に limit 件のみ取得（プロンプトに使うフィールドのみ）
+            query = (
                 self.db.collection('fashion-review')
                 .where('user_id', '==', user_id)
-                .stream()
+                .select(self.FASHION_REVIEW_FIELDS)
             )
+            try:
+                docs = list(
+                    query
+                    .order_by('created_at', direction=firestore.Query.DESCENDING)
+                    .limit(limit)
+                    .stream()
+                )
+            except FailedPrecondition as e:
+                print(f"[UserInsight] Index (user_id, created_at) for fashion-review is missing, scanning all reviews: {e}")
+                docs = list(query.stream())
 
-            # Pythonでソートして最新N件を取得
             all_docs = []
             for doc in docs:
                 data = doc.to_dict()
@@ -306,8 +368,8 @@ class UserInsightService:
                     "created_at": data.get('created_at')
                 })
 
-            # created_atでソート（降順）
-            all_docs.sort(key=lambda x: x.get('created_at', ''), reverse=True)
+            # created_atでソート（降順, インデックスがない場合のみ必要）
+            all_docs.sort(key=lambda x: (x.get('created_at') is not None, x.get('created_at') or 0), reverse=True)
 
             return all_docs[:limit]
 
@@ -325,13 +387,12 @@ class UserInsightService:
             fashion_reviews: ファッションレビュー履歴（最大7件）
 
         Returns:
-            str: Geminiプロンプト
+            str: Geminiプロンプト（ユーザー固有の部分。冒頭の user_insight_intro は
+                _generate_insight_with_gemini で静的プロンプトとして付与する）
         """
-        # Load intro from file
         prompt_loader = get_prompt_loader()
-        intro = prompt_loader.load("user_insight_intro")
 
-        prompt_parts = [intro, ""]
+        prompt_parts = [""]
 
         # ファッションタイプ情報
         if fashion_type:
@@ -404,6 +465,29 @@ class UserInsightService:
 
         return "\n".join(prompt_parts)
 
+    @staticmethod
+    def _insight_request(prompt: str) -> dict:
+        """インサイト生成の Gemini リクエスト"""
+        from google.genai import types
+        from gemini_service import METHOD_KEY, STATIC_PROMPT_KEY
+
+        # Load intro from file（静的プロンプト: Context Caching 有効時はキャッシュを参照）
+        intro = get_prompt_loader().load("user_insight_intro")
+
+        return {
+            "model": "gemini-2.5-flash-lite",
+            STATIC_PROMPT_KEY: "user_insight_intro",
+            METHOD_KEY: "user_insight",
+            "contents": [types.Part.from_text(text=intro), types.Part.from_text(text=prompt)],
+            "config": types.GenerateContentConfig(
+                response_mime_type="application/json",
+                response_schema=INSIGHT_SCHEMA,
+                temperature=0.7,
+                max_output_tokens=1000,
+                thinking_config=types.ThinkingConfig(thinking_budget=0, include_thoughts=False)
+            ),
+        }
+
     def _generate_insight_with_gemini(self, prompt: str) -> str:
         """
         Gemini APIでインサイトを生成
@@ -414,34 +498,32 @@ class UserInsightService:
         Returns:
             str: 生成されたインサイトテキスト
         """
-        from google.genai import types
+        from gemini_bulkhead import PRIORITY_BATCH
 
         try:
-            # GeminiServiceのclientを使用（既存のfashion-review実装と同じ）
-            response = self.gemini_service.client.models.generate_content(
-                model="gemini-2.5-flash-lite",
-                contents=prompt,
-                config=types.GenerateContentConfig(
-                    response_mime_type="application/json",
-                    response_schema={
-                        "type": "object",
-                        "properties": {
-                            "insight": {"type": "string"}
-                        },
-                        "required": ["insight"]
-                    },
-                    temperature=0.7,
-                    max_output_tokens=1000,
-                    thinking_config=types.ThinkingConfig(thinking_budget=0, include_thoughts=False)
-                ),
-            )
+            # GeminiService 経由で呼び出す（バルクヘッドでは batch レーン）
+            result = self.gemini_service.generate_json(self._insight_request(prompt), PRIORITY_BATCH)
+            return self._insight_text(result)
 
-            result = json.loads(response.text)
-            insight_text = result.get("insight", "インサイトの生成に失敗しました。")
+        except Exception as e:
+            print(f"[UserInsight] Gemini API error: {e}")
+            raise
+
+    async def _generate_insight_with_gemini_async(self, prompt: str) -> str:
+        """_generate_insight_with_gemini の非同期版"""
+        from gemini_bulkhead import PRIORITY_BATCH
 
-            print(f"[UserInsight] Gemini generated insight ({len(insight_text)} chars)")
-            return insight_text
+        try:
+            result = await self.gemini_service.generate_json_async(self._insight_request(prompt), PRIORITY_BATCH)
+            return self._insight_text(result)
 
         except Exception as e:
             print(f"[UserInsight] Gemini API error: {e}")
             raise
+
+    @staticmethod
+    def _insight_text(result: dict) -> str:
+        insight_text = result.get("insight", "インサイトの生成に失敗しました。")
+
+        print(f"[UserInsight] Gemini generated insight ({len(insight_text)} chars)")
+        return insight_text
@@ -1,20 +1,41 @@
 import requests
 import os
+import time
+import threading
 import aiohttp
 import asyncio
-from typing import List, Dict, Optional
+from typing import List, Dict, Optional, Tuple
+from rate_limiter import get_yahoo_rate_limiter
 
 
 class YahooShoppingClient:
-    def __init__(self):
+    # 検索結果のキャッシュ（レート制限時のフォールバック用, プロセス内で共有）
+    # key: (query, limit) -> (保存時刻, products)
+    _cache: Dict[Tuple[str, int], Tuple[float, List[Dict]]] = {}
+    _cache_lock = threading.Lock()
+    _CACHE_MAX_ENTRIES = 2000
+
+    DEFAULT_BASE_URL = "https://shopping.yahooapis.jp/ShoppingWebService/V3/itemSearch"
+
+    def __init__(self, on_rate_limited: Optional[str] = None, base_url: Optional[str] = None):
+        """
+        Args:
+            base_url: itemSearch のURL（未指定の場合は環境変数 YAHOO_SHOPPING_BASE_URL、
+                それもなければ本番API）。fake_yahoo_server.py に向けるとオフラインで計測できる
+            on_rate_limited: レート上限到達時の動作
+                "wait": トークンが補充されるまで待機（YAHOO_RATE_LIMIT_MAX_WAIT秒まで）
+                "cache": 待機せず、キャッシュ済みの検索結果（なければ空リスト）を返す
+                未指定の場合は環境変数 YAHOO_RATE_LIMIT_ON_EXHAUSTED（デフォルト: wait）
+        """
         self.app_id = os.getenv("YAHOO_APP_ID")
         self.pid = os.getenv("YAHOO_PID")
         self.sid = os.getenv("YAHOO_SID")
-        self.base_url = "https://shopping.yahooapis.jp/ShoppingWebService/V3/itemSearch"
-    
-    def search_products(self, query: str, gender: str = "メンズ", limit: int = 10) -> List[Dict]:
-        search_query = f"{query} {gender}"
-        
+        self.base_url = base_url or os.getenv("YAHOO_SHOPPING_BASE_URL") or self.DEFAULT_BASE_URL
+        self.rate_limiter = get_yahoo_rate_limiter()
+        self.on_rate_limited = on_rate_limited or os.getenv("YAHOO_RATE_LIMIT_ON_EXHAUSTED", "wait")
+        self.max_wait = float(os.getenv("YAHOO_RATE_LIMIT_MAX_WAIT", "5"))
+
+    def _build_params(self, search_query: str, limit: int) -> Dict:
         params = {
             "appid": self.app_id,
             "query": search_query,
@@ -22,80 +43,126 @@ class YahooShoppingClient:
             "sort": "-score",
             "in_stock": "true"
         }
-        
+
         if self.pid:
             params["affiliate_type"] = "vc"
             if self.sid:
                 params["affiliate_id"] = f"http://ck.jp.ap.valuecommerce.com/servlet/referral?sid={self.sid}&pid={self.pid}&vc_url="
             else:
                 params["affiliate_id"] = f"http://ck.jp.ap.valuecommerce.com/servlet/referral?pid={self.pid}&vc_url="
-        
+
+        # requests と同様に None の値は送らない（aiohttp は None を受け付けない）
+        return {key: value for key, value in params.items() if value is not None}
+
+    @staticmethod
+    def _parse_products(data: Dict, limit: int) -> List[Dict]:
+        products = []
+        if data.get("hits"):
+            for item in data["hits"]:
+                product = {
+                    "name": item["name"],
+                    "price": item["price"],
+                    "url": item["url"],
+                    "image_url": item.get("image", {}).get("medium", ""),
+                    "store_name": item.get("seller", {}).get("name", "")
+                }
+                products.append(product)
+
+        return products[:limit]
+
+    @classmethod
+    def _store_cache(cls, search_query: str, limit: int, products: List[Dict]):
+        if not products:
+            return
+        with cls._cache_lock:
+            if len(cls._cache) >= cls._CACHE_MAX_ENTRIES:
+                # 最も古いエントリを削除
+                oldest = min(cls._cache, key=lambda k: cls._cache[k][0])
+                cls._cache.pop(oldest, None)
+            cls._cache[(search_query, limit)] = (time.time(), products)
+
+    @classmethod
+    def _cached_products(cls, search_query: str, limit: int) -> List[Dict]:
+        with cls._cache_lock:
+            entry = cls._cache.get((search_query, limit))
+        return list(entry[1]) if entry else []
+
+    def _degrade(self, search_query: str, limit: int, reason: str) -> List[Dict]:
+        products = self._cached_products(search_query, limit)
+        print(f"Yahoo Shopping API {reason} for query: {search_query}, serving {len(products)} cached products")
+        return products
+
+    def _acquire(self) -> bool:
+        if self.rate_limiter is None:
+            return True
+        if self.on_rate_limited == "cache":
+            return self.rate_limiter.try_acquire()
+        return self.rate_limiter.acquire(timeout=self.max_wait)
+
+    async def _acquire_async(self) -> bool:
+        if self.rate_limiter is None:
+            return True
+        if self.on_rate_limited == "cache":
+            return await self.rate_limiter.try_acquire_async()
+        return await self.rate_limiter.acquire_async(timeout=self.max_wait)
+
+    def _on_throttled(self):
+        # 上流に 429 を返された場合はバケットを空にして後続リクエストを抑制
+        if self.rate_limiter is not None:
+            self.rate_limiter.drain()
+
+    async def _on_throttled_async(self):
+        if self.rate_limiter is not None:
+            await self.rate_limiter.drain_async()
+
+    def search_products(self, query: str, gender: str = "メンズ", limit: int = 10) -> List[Dict]:
+        search_query = f"{query} {gender}"
+        params = self._build_params(search_query, limit)
+
+        if not self._acquire():
+            return self._degrade(search_query, limit, "rate limit reached")
+
         try:
             response = requests.get(self.base_url, params=params, timeout=10)
+            if response.status_code == 429:
+                self._on_throttled()
+                return self._degrade(search_query, limit, "throttled (429)")
+
             data = response.json()
-            
-            products = []
-            if data.get("hits"):
-                for item in data["hits"]:
-                    product = {
-                        "name": item["name"],
-                        "price": item["price"],
-                        "url": item["url"],
-                        "image_url": item.get("image", {}).get("medium", ""),
-                        "store_name": item.get("seller", {}).get("name", "")
-                    }
-                    products.append(product)
-            
-            return products[:limit]
-        
+            products = self._parse_products(data, limit)
+            self._store_cache(search_query, limit, products)
+            return products
+
         except Exception as e:
             print(f"Yahoo Shopping API error: {e}")
             return []
-    
+
     async def search_products_async(self, query: str, gender: str = "メンズ", limit: int = 10) -> List[Dict]:
         search_query = f"{query} {gender}"
-        
-        params = {
-            "appid": self.app_id,
-            "query": search_query,
-            "results": limit,
-            "sort": "-score",
-            "in_stock": "true"
-        }
-        
-        if self.pid:
-            params["affiliate_type"] = "vc"
-            if self.sid:
-                params["affiliate_id"] = f"http://ck.jp.ap.valuecommerce.com/servlet/referral?sid={self.sid}&pid={self.pid}&vc_url="
-            else:
-                params["affiliate_id"] = f"http://ck.jp.ap.valuecommerce.com/servlet/referral?pid={self.pid}&vc_url="
-        
+        params = self._build_params(search_query, limit)
+
+        if not await self._acquire_async():
+            return self._degrade(search_query, limit, "rate limit reached")
+
         try:
             async with aiohttp.ClientSession() as session:
                 async with session.get(self.base_url, params=params, timeout=aiohttp.ClientTimeout(total=5)) as response:
+                    if response.status == 429:
+                        await self._on_throttled_async()
+                        return self._degrade(search_query, limit, "throttled (429)")
+
                     data = await response.json()
-                    
-                    products = []
-                    if data.get("hits"):
-                        for item in data["hits"]:
-                            product = {
-                                "name": item["name"],
-                                "price": item["price"],
-                                "url": item["url"],
-                                "image_url": item.get("image", {}).get("medium", ""),
-                                "store_name": item.get("seller", {}).get("name", "")
-                            }
-                            products.append(product)
-                    
-                    return products[:limit]
-        
+                    products = self._parse_products(data, limit)
+                    self._store_cache(search_query, limit, products)
+                    return products
+
         except asyncio.TimeoutError:
             print(f"Yahoo Shopping API timeout for query: {search_query}")
             return []
         except Exception as e:
             print(f"Yahoo Shopping API error: {e}")
             return []
-    
+
     def extract_search_keywords(self, categorize_text: str) -> str:
         parts = categorize_text.split()
         if len(parts) >= 3: